@@ -0,0 +1,53 @@
+import asyncio
+
+
+class AsyncBatchCoalescer:
+    # BatchCoalescer for coroutines: items submitted by concurrent tasks are
+    # passed to the sendBatch coroutine together, window seconds after the first
+    # item of a batch arrives or as soon as maxItems are waiting
+    def __init__(self, sendBatch, window: float = 0.005, maxItems: int = 50) -> None:
+        self.__SendBatch = sendBatch
+        self.__Window = window
+        self.__MaxItems = maxItems
+        self.__Batch = None  # (item, future) pairs of the batch still open
+        self.__Timer = None
+        self.__Stats = {"items": 0, "batches": 0}
+
+    async def Submit(self, item):
+        loop = asyncio.get_running_loop()
+
+        if self.__Batch is None:
+            self.__Batch = list()
+            self.__Timer = loop.call_later(self.__Window, self.__Close)
+
+        future = loop.create_future()
+        self.__Batch.append((item, future))
+        self.__Stats["items"] += 1
+
+        if len(self.__Batch) >= self.__MaxItems:
+            self.__Timer.cancel()
+            self.__Close()
+
+        return await future
+
+    def __Close(self) -> None:
+        batch, self.__Batch = self.__Batch, None
+        self.__Stats["batches"] += 1
+        # flushed in its own task, so a cancelled caller does not stall the others
+        asyncio.ensure_future(self.__Flush(batch))
+
+    async def __Flush(self, batch: list) -> None:
+        try:
+            results = await self.__SendBatch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def GetStats(self) -> dict:
+        return dict(self.__Stats)
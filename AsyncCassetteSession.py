@@ -0,0 +1,129 @@
+import asyncio
+import aiohttp
+from time import monotonic
+from AsyncHTTPSession import AsyncHTTPSession, AsyncHTTPResponse
+from CassetteSession import Cassette, CassettePlayer, CassetteResponse, CassetteMissError
+from CassetteSession import SECRET_FIELDS
+
+
+class AsyncCassetteMissError(aiohttp.ClientConnectionError):
+    pass
+
+
+class AsyncRecordingSession:
+    # AsyncHTTPSession that writes every exchange to a cassette, as RecordingSession
+    def __init__(
+        self,
+        path: str,
+        session: AsyncHTTPSession = None,
+        meta: dict = None,
+        secretFields: tuple = SECRET_FIELDS,
+    ) -> None:
+        self.__Session = session if session else AsyncHTTPSession()
+        self.__Cassette = Cassette(path, secretFields)
+        self.__Meta = meta
+
+    async def __Record(self, method: str, url: str, data, send) -> AsyncHTTPResponse:
+        key = self.__Cassette.Key(method, url, data)
+        started = monotonic()
+        try:
+            response = await send
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.__Cassette.Append(
+                self.__Cassette.NewExchange(key, None, monotonic() - started, e),
+                self.__Meta,
+            )
+            raise
+
+        # a streamed body is read whole to be written
+        if isinstance(response, AsyncHTTPResponse):
+            await response.Read()
+        self.__Cassette.Append(
+            self.__Cassette.NewExchange(key, response, monotonic() - started), self.__Meta
+        )
+        return response
+
+    async def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> AsyncHTTPResponse:
+        return await self.__Record(
+            "POST",
+            url,
+            data,
+            self.__Session.Post(url, data, cookies, stream, timeout, idempotent),
+        )
+
+    async def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> AsyncHTTPResponse:
+        return await self.__Record(
+            "GET", url, None, self.__Session.Get(url, cookies, timeout)
+        )
+
+    def GetStats(self) -> dict:
+        return self.__Session.GetStats()
+
+    def GetResilienceStats(self) -> dict:
+        return self.__Session.GetResilienceStats()
+
+    async def Close(self) -> None:
+        await self.__Session.Close()
+
+
+class AsyncReplaySession:
+    # AsyncHTTPSession answering from a cassette, as ReplaySession
+    def __init__(
+        self, path: str, timing: str = "none", secretFields: tuple = SECRET_FIELDS
+    ) -> None:
+        self.__Player = CassettePlayer(path, timing, secretFields)
+
+    async def __Replay(self, method: str, url: str, data) -> CassetteResponse:
+        try:
+            exchange = self.__Player.Next(method, url, data)
+        except CassetteMissError as e:
+            raise AsyncCassetteMissError(str(e))
+
+        delay = self.__Player.GetDelay(exchange)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if "error" in exchange:
+            if exchange["timeout"]:
+                raise asyncio.TimeoutError(exchange["error"])
+            raise aiohttp.ClientConnectionError(exchange["error"])
+        return CassetteResponse(exchange)
+
+    def GetMeta(self) -> dict:
+        return self.__Player.GetMeta()
+
+    async def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> CassetteResponse:
+        return await self.__Replay("POST", url, data)
+
+    async def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> CassetteResponse:
+        return await self.__Replay("GET", url, None)
+
+    def GetStats(self) -> dict:
+        stats = self.__Player.GetStats()
+        return {"connections": 0, "requests": stats["replayed"], "reused": 0}
+
+    def GetResilienceStats(self) -> dict:
+        return self.__Player.GetStats()
+
+    async def Close(self) -> None:
+        pass
@@ -0,0 +1,238 @@
+import asyncio
+import aiohttp
+import random
+from CircuitBreaker import CircuitBreaker
+from HTTPSession import UPSTREAM_FAILURE_CODES
+
+
+class AsyncCircuitOpenError(aiohttp.ClientConnectionError):
+    pass
+
+
+class AsyncHTTPResponse:
+    def __init__(
+        self,
+        status_code: int,
+        text: str,
+        headers,
+        cookies: dict,
+        content: bytes = None,
+        stream: aiohttp.ClientResponse = None,
+    ) -> None:
+        # A streamed response leaves text unset. Its body stays unread in stream
+        # until iter_content, called from a thread other than the event loop's,
+        # reads it chunk by chunk, or Read() keeps it whole in content
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.cookies = cookies
+        self.content = content
+        self.__Stream = stream
+        self.__Loop = asyncio.get_running_loop() if stream is not None else None
+
+    def IsStreaming(self) -> bool:
+        return self.__Stream is not None
+
+    async def Read(self) -> None:
+        if self.__Stream is not None:
+            try:
+                self.content = await self.__Stream.read()
+            finally:
+                self.__Stream.release()
+                self.__Stream = None
+
+    def iter_content(self, chunkSize: int):
+        if self.__Stream is not None:
+            # each chunk is awaited on the event loop while this thread waits
+            chunks = self.__Stream.content.iter_chunked(chunkSize)
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(
+                        chunks.__anext__(), self.__Loop
+                    ).result()
+                except StopAsyncIteration:
+                    return
+
+        content = self.content if self.content is not None else self.text.encode()
+        view = memoryview(content)
+        for i in range(0, len(view), chunkSize):
+            yield view[i : i + chunkSize]
+
+    def close(self) -> None:
+        # from any thread, an unread rest of the body closes the connection
+        if self.__Stream is not None:
+            self.__Loop.call_soon_threadsafe(self.__Stream.release)
+            self.__Stream = None
+        self.content = None
+
+
+class AsyncHTTPSession:
+    def __init__(
+        self,
+        poolMaxSize: int = 100,
+        poolMaxSizePerHost: int = 32,
+        maxConcurrency: int = 64,
+        keepAlive: float = 30,
+        connectTimeout: float = 5,
+        readTimeout: float = 60,
+        retries: int = 2,
+        backoffBase: float = 0.1,
+        backoffMax: float = 2,
+        failureThreshold: int = 5,
+        resetTimeout: float = 30,
+    ) -> None:
+        # poolMaxSize        - total open connections
+        # poolMaxSizePerHost - open connections per host
+        # maxConcurrency     - requests in flight, the rest wait for a free slot
+        # keepAlive          - seconds an idle connection is kept open
+        # retries, backoffBase, backoffMax, failureThreshold, resetTimeout - as in
+        #                      HTTPSession, AsyncCircuitOpenError while the circuit is open
+        self.__PoolMaxSize = poolMaxSize
+        self.__PoolMaxSizePerHost = poolMaxSizePerHost
+        self.__KeepAlive = keepAlive
+        self.__Timeout = aiohttp.ClientTimeout(
+            sock_connect=connectTimeout, sock_read=readTimeout
+        )
+        self.__Semaphore = asyncio.Semaphore(maxConcurrency)
+        self.__Session = None
+        self.__Stats = {"connections": 0, "requests": 0, "reused": 0}
+        self.__Retries = retries
+        self.__BackoffBase = backoffBase
+        self.__BackoffMax = backoffMax
+        self.__Breaker = CircuitBreaker(failureThreshold, resetTimeout)
+        self.__ResilienceStats = {"retries": 0, "timeouts": 0}
+
+    def __GetSession(self) -> aiohttp.ClientSession:
+        # aiohttp sessions must be created inside the running event loop
+        if self.__Session is None or self.__Session.closed:
+            traceConfig = aiohttp.TraceConfig()
+            traceConfig.on_connection_create_end.append(self.__OnConnectionCreate)
+            traceConfig.on_connection_reuseconn.append(self.__OnConnectionReuse)
+
+            self.__Session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.__PoolMaxSize,
+                    limit_per_host=self.__PoolMaxSizePerHost,
+                    keepalive_timeout=self.__KeepAlive,
+                    ssl=False,
+                ),
+                timeout=self.__Timeout,
+                # auth cookies are passed explicitly, the session must not collect them
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[traceConfig],
+            )
+
+        return self.__Session
+
+    async def __OnConnectionCreate(self, session, context, params) -> None:
+        self.__Stats["connections"] += 1
+
+    async def __OnConnectionReuse(self, session, context, params) -> None:
+        self.__Stats["reused"] += 1
+
+    async def __Send(
+        self,
+        method: str,
+        url: str,
+        data: str = None,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+    ) -> AsyncHTTPResponse:
+        headers = None
+        if cookies:
+            headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())}
+
+        clientTimeout = self.__Timeout
+        if timeout:
+            clientTimeout = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1]
+            )
+
+        async with self.__Semaphore:
+            self.__Stats["requests"] += 1
+            response = await self.__GetSession().request(
+                method, url, data=data, headers=headers, timeout=clientTimeout
+            )
+            cookies = {name: morsel.value for name, morsel in response.cookies.items()}
+
+            # the body of a successful streamed response is left open, it is
+            # parsed from chunks as they arrive and never held whole. Its
+            # maxConcurrency slot is freed once the headers are in
+            if stream and response.status == 200:
+                return AsyncHTTPResponse(
+                    response.status, None, response.headers, cookies, stream=response
+                )
+
+            try:
+                return AsyncHTTPResponse(
+                    response.status, await response.text(), response.headers, cookies
+                )
+            finally:
+                response.release()
+
+    async def __Request(
+        self, method: str, url: str, idempotent: bool, **kwargs
+    ) -> AsyncHTTPResponse:
+        # Every attempt passes the circuit breaker and reports to it. A failed
+        # idempotent request is repeated, the last failure is returned or raised
+        attempts = self.__Retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            if not self.__Breaker.Allow():
+                raise AsyncCircuitOpenError(f"Circuit open, {url} not requested")
+
+            success = None
+            try:
+                response = await self.__Send(method, url, **kwargs)
+                success = response.status_code not in UPSTREAM_FAILURE_CODES
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                success = False
+                if isinstance(e, asyncio.TimeoutError):
+                    self.__ResilienceStats["timeouts"] += 1
+                if attempt + 1 == attempts:
+                    raise
+            finally:
+                self.__Breaker.Record(success)
+
+            if success or attempt + 1 == attempts:
+                return response
+
+            self.__ResilienceStats["retries"] += 1
+            await asyncio.sleep(
+                random.uniform(0, min(self.__BackoffMax, self.__BackoffBase * 2**attempt))
+            )
+
+    async def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> AsyncHTTPResponse:
+        return await self.__Request(
+            "POST",
+            url,
+            idempotent,
+            data=data,
+            cookies=cookies,
+            stream=stream,
+            timeout=timeout,
+        )
+
+    async def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> AsyncHTTPResponse:
+        return await self.__Request("GET", url, True, cookies=cookies, timeout=timeout)
+
+    def GetStats(self) -> dict:
+        return dict(self.__Stats)
+
+    def GetResilienceStats(self) -> dict:
+        return {**self.__Breaker.GetStats(), **self.__ResilienceStats}
+
+    async def Close(self) -> None:
+        if self.__Session is not None:
+            await self.__Session.close()
+            self.__Session = None
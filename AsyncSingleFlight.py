@@ -0,0 +1,25 @@
+import asyncio
+
+
+class AsyncSingleFlight:
+    # SingleFlight for coroutines: concurrent calls with the same key await one
+    # task running fn(). The task is shielded, so a cancelled caller does not
+    # cancel it for the others
+    def __init__(self) -> None:
+        self.__Flights = dict()  # key -> task of the call in flight
+        self.__Stats = {"calls": 0, "collapsed": 0}
+
+    async def Do(self, key, fn):
+        self.__Stats["calls"] += 1
+
+        task = self.__Flights.get(key)
+        if task is None:
+            task = self.__Flights[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self.__Flights.pop(key, None))
+        else:
+            self.__Stats["collapsed"] += 1
+
+        return await asyncio.shield(task)
+
+    def GetStats(self) -> dict:
+        return dict(self.__Stats)
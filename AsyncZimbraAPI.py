@@ -0,0 +1,583 @@
+import asyncio
+import aiohttp
+from time import monotonic
+from typing import AsyncIterator, Iterable
+from ResponseData import ResponseData
+from AuthData import AuthData
+from AsyncHTTPSession import AsyncHTTPSession, AsyncHTTPResponse
+from AsyncBatchCoalescer import AsyncBatchCoalescer
+from AsyncSingleFlight import AsyncSingleFlight
+from ResponseCache import ResponseCache
+from ZimbraAPI import ZimbraOperations, Operation, SoapRequest, CacheCall
+from Tracing import Trace
+from ZimbraAPI import MEMBERS_PAGE_SIZE, MEMBERS_CHUNK_SIZE, MEMBERS_IN_FLIGHT
+
+
+class AsyncZimbraAPI(ZimbraOperations):
+    def __init__(
+        self,
+        host,
+        adminUsername,
+        adminPassword,
+        session: AsyncHTTPSession = None,
+        nameCacheSize: int = 10000,
+        nameCacheTTL: float = 300,
+        batchWindow: float = 0,
+        batchMaxItems: int = 50,
+        transport: str = "xml",
+        cache=None,
+        cacheTTL: dict = None,
+        singleFlight: bool = True,
+        authStore=None,
+        timeouts: dict = None,
+        metrics=None,
+    ) -> None:
+        super().__init__(
+            host,
+            nameCacheSize,
+            nameCacheTTL,
+            transport,
+            cache,
+            cacheTTL,
+            timeouts,
+            metrics,
+        )
+        self.__AdminHost = self._GetAdminHost()
+        self.__Session = session if session else AsyncHTTPSession()
+        self.__AuthData = AuthData(
+            self.__AdminHost,
+            adminUsername,
+            adminPassword,
+            Store=authStore,
+            Metrics=metrics,
+        )
+        self.__AuthLock = asyncio.Lock()
+        self.__Coalescer = None
+        if batchWindow > 0:
+            self.__Coalescer = AsyncBatchCoalescer(
+                self.__SendBatch, batchWindow, batchMaxItems
+            )
+        self.__SingleFlight = AsyncSingleFlight() if singleFlight else None
+        # calls on a cache kept outside the process, e.g. SQLiteResponseCache,
+        # block on its file and run in a thread
+        self.__CacheInThread = cache is not None and not isinstance(cache, ResponseCache)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.Close()
+
+    async def Close(self) -> None:
+        await self.__Session.Close()
+
+    async def __NeedsUpdate(self, expiredToken: str = None) -> bool:
+        # the tokens of other processes are read from the shared store's file
+        if not self.__AuthData.IsStale(expiredToken):
+            return False
+        return not await asyncio.to_thread(self.__AuthData.LoadShared, expiredToken)
+
+    async def __UpdateAuthData(self, expiredToken: str = None) -> ResponseData:
+        if not await self.__NeedsUpdate(expiredToken):
+            return ResponseData()
+
+        async with self.__AuthLock:
+            # the lock shared with other processes is waited for off the event loop
+            sharedLock = self.__AuthData.GetSharedLock()
+            if sharedLock is not None:
+                await asyncio.to_thread(sharedLock.Acquire)
+
+            try:
+                if not await self.__NeedsUpdate(expiredToken):
+                    return ResponseData()
+
+                result = ResponseData()
+
+                requestTime = monotonic()
+                try:
+                    AuthResponse = await self.__Session.Post(
+                        self.__AuthData.GetAuthURL(),
+                        self.__AuthData.GetAuthRequestData(),
+                        idempotent=True,
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self.__AuthData.RecordRefresh(requestTime, False)
+                    result.SetErrorCode(str(type(e)))
+                    result.SetErrorText(str(e))
+                    return result
+
+                # parses the answer and saves the tokens to the shared store
+                return await asyncio.to_thread(
+                    self.__AuthData.ApplyAuthResponse,
+                    AuthResponse.cookies.get("ZM_ADMIN_AUTH_TOKEN"),
+                    AuthResponse.headers.get("X-Zimbra-Csrf-Token"),
+                    AuthResponse.text,
+                    requestTime,
+                    AuthResponse.status_code,
+                )
+            finally:
+                if sharedLock is not None:
+                    sharedLock.Release()
+
+    async def __Send(
+        self, request: SoapRequest, AuthToken: str, CSRFToken: str
+    ) -> AsyncHTTPResponse:
+        with Trace.Span("build"):
+            body = self._GetRequestBody(request, CSRFToken)
+        response = None
+        started = monotonic()
+        try:
+            response = await self.__Session.Post(
+                self._GetRequestURL(request),
+                body,
+                cookies={"ZM_ADMIN_AUTH_TOKEN": AuthToken},
+                stream=request.Stream,
+                timeout=self._GetTimeout(request),
+                idempotent=self._IsIdempotent(request),
+            )
+            return response
+        finally:
+            self._RecordSoapRequest(request, body, response, monotonic() - started)
+
+    async def __SendWithAuthRetry(self, request: SoapRequest) -> AsyncHTTPResponse:
+        # If Zimbra rejects the token, it is refreshed once and the request repeated
+        expiredToken, CSRFToken = self.__AuthData.GetTokens()
+        response = await self.__Send(request, expiredToken, CSRFToken)
+
+        if self._IsAuthFault(request, response):
+            if not (await self.__UpdateAuthData(expiredToken)).IsError():
+                response = await self.__Send(request, *self.__AuthData.GetTokens())
+
+        return self._AsSoapFault(response)
+
+    async def __SendAll(self, requestList: list) -> list:
+        return list(
+            await asyncio.gather(*map(self.__SendWithAuthRetry, requestList))
+        )
+
+    async def __SendBatch(self, requestList: list) -> list:
+        if len(requestList) == 1:
+            return [await self.__SendWithAuthRetry(requestList[0])]
+
+        response = await self.__SendWithAuthRetry(self._BuildBatchRequest(requestList))
+        return self._SplitBatchResponse(response, len(requestList))
+
+    async def __Dispatch(self, request):
+        if isinstance(request, CacheCall):
+            if self.__CacheInThread:
+                return await asyncio.to_thread(self._CallCache, request)
+            return self._CallCache(request)
+        if isinstance(request, list):
+            return await self.__SendAll(request)
+        if request.Batchable and self.__Coalescer is not None:
+            return await self.__Coalescer.Submit(request)
+        return await self.__SendWithAuthRetry(request)
+
+    @staticmethod
+    def __SendStreamed(operation: Operation, response: AsyncHTTPResponse) -> tuple:
+        # StopIteration cannot be set on the future of a thread, it is returned
+        try:
+            return operation.send(response), None
+        except StopIteration as stop:
+            return None, stop
+
+    async def __Run(self, operation: Operation) -> ResponseData:
+        with Trace.Span("auth"):
+            UpdateAuthDataStatus = await self.__UpdateAuthData()
+        if UpdateAuthDataStatus.IsError():
+            operation.close()
+            return UpdateAuthDataStatus
+
+        # parse - the operation reading a response and building the next request.
+        # A streamed body is parsed in a thread, which awaits its chunks on the
+        # event loop as the parser asks for them
+        try:
+            with Trace.Span("parse"):
+                request = next(operation)
+            while True:
+                with self._UpstreamSpan(request):
+                    response = await self.__Dispatch(request)
+                with Trace.Span("parse"):
+                    if isinstance(response, AsyncHTTPResponse) and response.IsStreaming():
+                        try:
+                            request, stop = await asyncio.to_thread(
+                                self.__SendStreamed, operation, response
+                            )
+                        finally:
+                            response.close()
+                        if stop is not None:
+                            raise stop
+                    else:
+                        request = operation.send(response)
+        except StopIteration as stop:
+            return stop.value
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # timeouts, connection errors and an open circuit fail the operation
+            operation.close()
+            result = ResponseData()
+            result.SetErrorCode(str(type(e)))
+            result.SetErrorText(str(e))
+            return result
+
+    async def __Read(self, operationName: str, args: tuple, operation) -> ResponseData:
+        # Identical concurrent reads share one upstream request and one
+        # ResponseData, operation(*args) only runs for the first of them
+        async def run():
+            return await self.__Run(self._Cached(operationName, args, operation(*args)))
+
+        if self.__SingleFlight is None:
+            return await run()
+        return await self.__SingleFlight.Do(
+            self._ReadKey(operationName, args), run
+        )
+
+    ################################################## ACCOUNT MANAGEMENT ##################################################
+
+    async def CreateAccount(
+        self,
+        accountName: str,
+        password: str,
+        name: str,
+        surname: str,
+        patronymic: str = "",
+        extraParams: dict = None,
+    ) -> ResponseData:
+        return await self.__Run(
+            self._CreateAccount(
+                accountName, password, name, surname, patronymic, extraParams
+            )
+        )
+
+    async def DeleteAccount(
+        self, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(self._DeleteAccount(accountID, accountName))
+
+    async def ModifyAccount(
+        self, params: dict, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(self._ModifyAccount(params, accountID, accountName))
+
+    async def RenameAccount(
+        self, newName: str, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(self._RenameAccount(newName, accountID, accountName))
+
+    async def SetPassword(
+        self, newPassword: str, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(self._SetPassword(newPassword, accountID, accountName))
+
+    async def GetAccount(
+        self, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetAccount", (accountID, accountName), self._GetAccount
+        )
+
+    async def GetAccounts(
+        self, offset: int = 0, limit: int = 0, attrs: list = None
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetAccounts", (offset, limit, attrs), self._GetAccounts
+        )
+
+    async def IterAccounts(
+        self, pageSize: int = 1000, attrs: list = None
+    ) -> AsyncIterator[ResponseData]:
+        # Yields one ResponseData per page, stops after the first error
+        offset = 0
+        while True:
+            page = await self.__Run(self._GetAccounts(offset, pageSize, attrs))
+            yield page
+
+            if page.IsError() or len(page.GetData()) < pageSize:
+                return
+            offset += pageSize
+
+    async def GetAccountMembership(
+        self, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetAccountMembership", (accountID, accountName), self._GetAccountMembership
+        )
+
+    async def __RunBulkItem(
+        self, item: dict, defaultParams: dict = None
+    ) -> ResponseData:
+        try:
+            return await self.__Run(self._BulkCreateAccount(item, defaultParams))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result = ResponseData()
+            result.SetErrorCode(str(type(e)))
+            result.SetErrorText(str(e))
+            return result
+
+    async def BulkCreateAccounts(
+        self, accounts: Iterable[dict], workers: int = 8, defaultParams: dict = None
+    ) -> AsyncIterator[ResponseData]:
+        # Same output as ZimbraAPI.BulkCreateAccounts, workers creations run as
+        # concurrent tasks
+        startTime = monotonic()
+        summary = self._NewBulkSummary()
+        pending = dict()  # task -> (index, item)
+
+        try:
+            for index, item in enumerate(accounts):
+                task = asyncio.ensure_future(self.__RunBulkItem(item, defaultParams))
+                pending[task] = (index, item)
+
+                if len(pending) >= workers:
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield self._BulkItem(*pending.pop(task), task.result(), summary)
+
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield self._BulkItem(*pending.pop(task), task.result(), summary)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        yield self._BulkSummary(summary, monotonic() - startTime)
+
+    ################################################## MAILBOX MANAGEMENT ##################################################
+
+    async def GetMessages(
+        self,
+        accountName: str,
+        unreadOnly: bool = True,
+        limit: int = 10,
+        offset: int = 0,
+        countOnly: bool = False,
+        incremental: bool = False,
+        token: str = None,
+    ) -> ResponseData:
+        return await self.__Run(
+            self._GetMessages(
+                accountName, unreadOnly, limit, offset, countOnly, incremental, token
+            )
+        )
+
+    async def DelegateAuth(
+        self, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(self._DelegateAuth(accountID, accountName))
+
+    async def SendMessage(
+        self,
+        senderAccountName: str,
+        receiverAccountName: str,
+        subject: str = "",
+        content: str = "",
+        senderPseudonym: str = "",
+        receiverPseudonym: str = "",
+    ) -> ResponseData:
+        return await self.__Run(
+            self._SendMessage(
+                senderAccountName,
+                receiverAccountName,
+                subject,
+                content,
+                senderPseudonym,
+                receiverPseudonym,
+            )
+        )
+
+    async def CreateWaitSet(self, accountIDs: list, types: str = "m") -> ResponseData:
+        return await self.__Run(self._CreateWaitSet(accountIDs, types))
+
+    async def WaitSet(
+        self,
+        waitSetID: str,
+        seq: str,
+        addAccountIDs: list = None,
+        removeAccountIDs: list = None,
+        timeout: int = 0,
+        types: str = "m",
+    ) -> ResponseData:
+        return await self.__Run(
+            self._WaitSet(
+                waitSetID, seq, addAccountIDs, removeAccountIDs, timeout, types
+            )
+        )
+
+    async def DestroyWaitSet(self, waitSetID: str) -> ResponseData:
+        return await self.__Run(self._DestroyWaitSet(waitSetID))
+
+    ################################################## DISTRIBUTION LIST MANAGEMENT ##################################################
+
+    async def CreateDistributionList(
+        self, name: str, displayName: str = "", extraParams: dict = None
+    ) -> ResponseData:
+        return await self.__Run(
+            self._CreateDistributionList(name, displayName, extraParams)
+        )
+
+    async def DeleteDistributionList(
+        self, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(
+            self._DeleteDistributionList(distrListID, distrListName)
+        )
+
+    async def ModifyDistributionList(
+        self, params: dict, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(
+            self._ModifyDistributionList(params, distrListID, distrListName)
+        )
+
+    async def GetDistributionList(
+        self,
+        distrListID: str = "",
+        distrListName: str = "",
+        offset: int = 0,
+        limit: int = 0,
+        countOnly: bool = False,
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetDistributionList",
+            (distrListID, distrListName, offset, limit, countOnly),
+            self._GetDistributionList,
+        )
+
+    async def IterDistributionListMembers(
+        self, distrListID: str = "", distrListName: str = "", pageSize: int = 1000
+    ) -> AsyncIterator[ResponseData]:
+        # Yields one ResponseData with a list of members per page,
+        # stops after the first error
+        offset = 0
+        while True:
+            page = await self.__Run(
+                self._GetDistributionList(distrListID, distrListName, offset, pageSize)
+            )
+            if page.IsError():
+                yield page
+                return
+
+            members = ResponseData()
+            members.SetData(page.GetData()["members"])
+            yield members
+
+            if len(members.GetData()) < pageSize:
+                return
+            distrListID, offset = page.GetData()["id"], offset + pageSize
+
+    async def GetDistributionLists(
+        self, offset: int = 0, limit: int = 0
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetDistributionLists", (offset, limit), self._GetDistributionLists
+        )
+
+    async def IterDistributionLists(
+        self, pageSize: int = 1000
+    ) -> AsyncIterator[ResponseData]:
+        # Yields one ResponseData per page, stops after the first error
+        offset = 0
+        while True:
+            page = await self.__Run(self._GetDistributionLists(offset, pageSize))
+            yield page
+
+            if page.IsError() or len(page.GetData()) < pageSize:
+                return
+            offset += pageSize
+
+    async def GetDistributionListMembership(
+        self, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return await self.__Read(
+            "GetDistributionListMembership",
+            (distrListID, distrListName),
+            self._GetDistributionListMembership,
+        )
+
+    async def AddDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return await self.__Run(
+            self._AddDistributionListMembers(
+                userEmails, distrListID, distrListName, chunkSize, inFlight
+            )
+        )
+
+    async def RemoveDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return await self.__Run(
+            self._RemoveDistributionListMembers(
+                userEmails, distrListID, distrListName, chunkSize, inFlight
+            )
+        )
+
+    async def SyncDistributionListMembers(
+        self,
+        desired: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        pageSize: int = MEMBERS_PAGE_SIZE,
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return await self.__Run(
+            self._SyncDistributionListMembers(
+                desired, distrListID, distrListName, pageSize, chunkSize, inFlight
+            )
+        )
+
+    async def RenameDistributionList(
+        self, newName: str, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return await self.__Run(
+            self._RenameDistributionList(newName, distrListID, distrListName)
+        )
+
+    ################################################## DEV METHODS ##################################################
+
+    def GetConnectionStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Session.GetStats())
+        return result
+
+    def GetResilienceStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Session.GetResilienceStats())
+        return result
+
+    def GetNameCacheStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self._GetNameCacheStats())
+        return result
+
+    def GetBatchStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Coalescer.GetStats() if self.__Coalescer else None)
+        return result
+
+    def GetCacheStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self._GetCacheStats())
+        return result
+
+    def GetSingleFlightStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(
+            self.__SingleFlight.GetStats() if self.__SingleFlight else None
+        )
+        return result
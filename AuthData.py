@@ -1,19 +1,113 @@
 import requests
 import json
+import threading
+from contextlib import nullcontext
+from time import monotonic, time
 from ResponseData import ResponseData
+from HTTPSession import HTTPSession
+from SoapBuilder import SoapBuilder
 
 
 class AuthData:
-    def __init__(self, AdminHost: str, Username: str, Password: str) -> None:
+    def __init__(
+        self,
+        AdminHost: str,
+        Username: str,
+        Password: str,
+        Session: HTTPSession = None,
+        RefreshMargin: float = 300,
+        Store=None,
+        Metrics=None,
+    ) -> None:
+        # Session - sends the AuthRequests of UpdateAuthData, made on first use.
+        #           AsyncZimbraAPI sends its own and never needs one
+        # Store   - SharedAuthStore, the tokens are shared with the other
+        #           processes using it instead of each authenticating on its own
+        # Metrics - counts the AuthRequests sent and their time
         self.__AuthURL = AdminHost + "/service/admin/soap/AuthRequest"
         self.__Username = Username
         self.__Password = Password
-        self.__CSRFToken = ""
-        self.__AuthToken = ""
+        self.__Session = Session
+        self.__RefreshMargin = RefreshMargin
+        self.__Tokens = ("", "")  # (AuthToken, CSRFToken), replaced atomically
+        self.__RefreshAt = 0.0
+        self.__Lock = threading.Lock()
+        self.__Store = Store
+        self.__StoreKey = f"{AdminHost} {Username}"
+        self.__Metrics = Metrics
 
-    def UpdateAuthData(self) -> ResponseData:
-        result = ResponseData()
-        RequestData = (
+    def __IsFresh(self) -> bool:
+        return self.__Tokens[0] != "" and monotonic() < self.__RefreshAt
+
+    def LoadShared(self, expiredToken: str = None) -> bool:
+        # Fresh tokens saved by another process are taken over. Reads the
+        # store's file, AsyncZimbraAPI calls it off the event loop
+        if self.__Store is None:
+            return False
+
+        entry = self.__Store.Load(self.__StoreKey)
+        if entry is None or entry["authToken"] in ("", expiredToken):
+            return False
+
+        remaining = entry["refreshAt"] - time()
+        if remaining <= 0:
+            return False
+
+        self.__Tokens = (entry["authToken"], entry["csrfToken"])
+        self.__RefreshAt = monotonic() + remaining
+        return True
+
+    def IsStale(self, expiredToken: str = None) -> bool:
+        # expiredToken is the token Zimbra rejected. If another caller has already
+        # replaced it, the new one is used instead of authenticating again
+        if expiredToken is None:
+            return not self.__IsFresh()
+        return expiredToken == self.__Tokens[0]
+
+    def NeedsUpdate(self, expiredToken: str = None) -> bool:
+        return self.IsStale(expiredToken) and not self.LoadShared(expiredToken)
+
+    def GetSharedLock(self):
+        # held while authenticating, so one process refreshes and the others wait
+        return self.__Store.Lock() if self.__Store is not None else None
+
+    def UpdateAuthData(self, expiredToken: str = None) -> ResponseData:
+        if not self.NeedsUpdate(expiredToken):
+            return ResponseData()
+
+        sharedLock = self.GetSharedLock()
+        with self.__Lock, sharedLock if sharedLock is not None else nullcontext():
+            if not self.NeedsUpdate(expiredToken):
+                return ResponseData()
+
+            result = ResponseData()
+            if self.__Session is None:
+                self.__Session = HTTPSession()
+
+            requestTime = monotonic()
+            try:
+                AuthResponse = self.__Session.Post(
+                    self.GetAuthURL(), self.GetAuthRequestData(), idempotent=True
+                )
+            except requests.exceptions.RequestException as e:
+                self.RecordRefresh(requestTime, False)
+                result.SetErrorCode(str(type(e)))
+                result.SetErrorText(str(e))
+                return result
+
+            return self.ApplyAuthResponse(
+                AuthResponse.cookies.get("ZM_ADMIN_AUTH_TOKEN"),
+                AuthResponse.headers.get("X-Zimbra-Csrf-Token"),
+                AuthResponse.text,
+                requestTime,
+                AuthResponse.status_code,
+            )
+
+    def GetAuthURL(self) -> str:
+        return self.__AuthURL
+
+    def GetAuthRequestData(self) -> str:
+        return (
             '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">'
                 "<soap:Header>"
                     '<context xmlns="urn:zimbra">'
@@ -23,37 +117,77 @@ class AuthData:
                 "</soap:Header>"
                 "<soap:Body>"
                     '<AuthRequest xmlns="urn:zimbraAdmin">'
-                        f"<name>{self.__Username}</name>"
-                        f"<password>{self.__Password}</password>"
+                        f"<name>{SoapBuilder.Escape(self.__Username)}</name>"
+                        f"<password>{SoapBuilder.Escape(self.__Password)}</password>"
                         "<csrfTokenSecured>1</csrfTokenSecured>"
                     "</AuthRequest>"
                 "</soap:Body>"
             "</soap:Envelope>"
         )
 
-        try:
-            AuthResponse = requests.post(self.__AuthURL, data=RequestData, verify=False)
-        except requests.exceptions.RequestException as e:
-            result.SetErrorCode(str(type(e)))
-            result.SetErrorText(str(e))
+    def RecordRefresh(self, requestTime: float, success: bool) -> None:
+        if self.__Metrics is None:
+            return
+
+        self.__Metrics.Count(
+            "zimbra_api_auth_refreshes_total", (("result", "ok" if success else "error"),)
+        )
+        self.__Metrics.Observe(
+            "zimbra_api_auth_refresh_duration_seconds", (), monotonic() - requestTime
+        )
+
+    def ApplyAuthResponse(
+        self,
+        AuthToken: str,
+        CSRFToken: str,
+        ResponseText: str,
+        requestTime: float,
+        StatusCode: int = 200,
+    ) -> ResponseData:
+        result = ResponseData()
+        self.RecordRefresh(requestTime, None not in (AuthToken, CSRFToken))
+
+        if None in (AuthToken, CSRFToken):
+            self.__Tokens = ("", "")
+            self.__RefreshAt = 0.0
+
+            # a proxy answering 502/503 sends a page, not a SOAP fault
+            try:
+                fault = json.loads(ResponseText)["Body"]["Fault"]
+                result.SetErrorText(fault["Reason"]["Text"])
+                result.SetErrorCode(fault["Detail"]["Error"]["Code"])
+            except (ValueError, KeyError, TypeError):
+                result.SetErrorText(f"HTTP {StatusCode}")
+                result.SetErrorCode(f"http.{StatusCode}")
             return result
 
-        self.__AuthToken = AuthResponse.cookies.get("ZM_ADMIN_AUTH_TOKEN")
-        self.__CSRFToken = AuthResponse.headers.get("X-Zimbra-Csrf-Token")
+        jsonResponseData = json.loads(ResponseText)["Body"]
+
+        # lifetime is reported in milliseconds
+        lifetime = jsonResponseData["AuthResponse"].get("lifetime", 0) / 1000
+        margin = min(self.__RefreshMargin, lifetime / 2)
 
-        if None in (self.__AuthToken, self.__CSRFToken):
-            jsonResponseData = json.loads(AuthResponse.text)["Body"]
+        self.__Tokens = (AuthToken, CSRFToken)
+        self.__RefreshAt = requestTime + lifetime - margin
 
-            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
-            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+        if self.__Store is not None:
+            self.__Store.Save(
+                self.__StoreKey,
+                AuthToken,
+                CSRFToken,
+                time() + self.__RefreshAt - monotonic(),
+            )
 
         return result
 
     def GetAuthToken(self) -> str:
-        return self.__AuthToken
+        return self.__Tokens[0]
 
     def GetCSRFToken(self) -> str:
-        return self.__CSRFToken
+        return self.__Tokens[1]
+
+    def GetTokens(self) -> tuple:
+        return self.__Tokens
 
     def GetCookies(self) -> dict:
         return {"ZM_ADMIN_AUTH_TOKEN": self.GetAuthToken()}
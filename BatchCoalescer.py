@@ -0,0 +1,76 @@
+import threading
+from time import monotonic
+
+
+class BatchSlot:
+    def __init__(self, item) -> None:
+        self.Item = item
+        self.Result = None
+        self.Error = None
+        self.Done = threading.Event()
+
+
+class BatchCoalescer:
+    # Collects items submitted by concurrent threads and hands them to sendBatch
+    # together. A batch is sent window seconds after its first item arrives, or
+    # as soon as maxItems are waiting. sendBatch returns one result per item
+    def __init__(self, sendBatch, window: float = 0.005, maxItems: int = 50) -> None:
+        self.__SendBatch = sendBatch
+        self.__Window = window
+        self.__MaxItems = maxItems
+        self.__Condition = threading.Condition()
+        self.__Batch = None  # slots of the batch still open for new items
+        self.__Stats = {"items": 0, "batches": 0}
+
+    def Submit(self, item):
+        # The thread that opens a batch waits out the window and sends it,
+        # the others wait for their result
+        with self.__Condition:
+            batch = self.__Batch
+            isLeader = batch is None
+            if isLeader:
+                batch = self.__Batch = list()
+
+            slot = BatchSlot(item)
+            batch.append(slot)
+            self.__Stats["items"] += 1
+
+            if len(batch) >= self.__MaxItems:
+                self.__Batch = None
+                self.__Condition.notify_all()
+
+            if isLeader:
+                deadline = monotonic() + self.__Window
+                while self.__Batch is batch:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        self.__Batch = None
+                        break
+                    self.__Condition.wait(remaining)
+
+                self.__Stats["batches"] += 1
+
+        if isLeader:
+            self.__Flush(batch)
+        else:
+            slot.Done.wait()
+
+        if slot.Error is not None:
+            raise slot.Error
+        return slot.Result
+
+    def __Flush(self, batch: list) -> None:
+        try:
+            results = self.__SendBatch([slot.Item for slot in batch])
+            for slot, result in zip(batch, results):
+                slot.Result = result
+        except Exception as e:
+            for slot in batch:
+                slot.Error = e
+
+        for slot in batch:
+            slot.Done.set()
+
+    def GetStats(self) -> dict:
+        with self.__Condition:
+            return dict(self.__Stats)
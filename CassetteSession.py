@@ -0,0 +1,315 @@
+import gzip
+import json
+import os
+import re
+import requests
+import threading
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+from requests.structures import CaseInsensitiveDict
+from HTTPSession import HTTPSession
+
+CASSETTE_VERSION = 1
+SCRUBBED = "scrubbed"
+
+# request and response fields holding credentials or tokens, as elements,
+# JSON fields and <a n="..."> attributes
+SECRET_FIELDS = ("password", "newPassword", "userPassword", "authToken", "csrfToken")
+
+# response headers kept in a cassette, the ones the clients read
+RECORDED_HEADERS = ("Content-Type", "X-Zimbra-Csrf-Token")
+SECRET_HEADERS = ("X-Zimbra-Csrf-Token",)
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    pass
+
+
+class Cassette:
+    # Exchanges of one HTTP session in a gzip file of JSON lines, the first
+    # line a header with the version and the recorder's meta. Every exchange
+    # is appended as a gzip member of its own, a cassette stays readable if
+    # the recording process dies. Secrets are scrubbed before anything is
+    # written, requests are matched by method, path and the scrubbed body
+    def __init__(self, path: str, secretFields: tuple = SECRET_FIELDS) -> None:
+        self.__Path = path
+        self.__Lock = threading.Lock()
+
+        names = "|".join(re.escape(name) for name in secretFields)
+        self.__Patterns = (
+            # <password>...</password>, <authToken>...</authToken>
+            (
+                re.compile(rf"(<({names})(?:\s[^>]*)?>)[^<]*(</\2>)"),
+                rf"\g<1>{SCRUBBED}\g<3>",
+            ),
+            # <a n="userPassword">...</a>
+            (
+                re.compile(rf'(<a n="(?:{names})">)[^<]*(</a>)'),
+                rf"\g<1>{SCRUBBED}\g<2>",
+            ),
+            # "csrfToken":"...", "password":{"_content":"..."},
+            # "authToken":[{"_content":"..."}]
+            (
+                re.compile(
+                    rf'("(?:{names})"\s*:\s*(?:\[\s*)?(?:\{{\s*"_content"\s*:\s*)?")'
+                    r'(?:[^"\\]|\\.)*(")'
+                ),
+                rf"\g<1>{SCRUBBED}\g<2>",
+            ),
+            # {"n":"userPassword","_content":"..."}
+            (
+                re.compile(
+                    rf'("n"\s*:\s*"(?:{names})"\s*,\s*"_content"\s*:\s*")(?:[^"\\]|\\.)*(")'
+                ),
+                rf"\g<1>{SCRUBBED}\g<2>",
+            ),
+        )
+
+    def GetPath(self) -> str:
+        return self.__Path
+
+    def Scrub(self, text: str) -> str:
+        for pattern, replacement in self.__Patterns:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def Key(self, method: str, url: str, data) -> tuple:
+        if isinstance(data, bytes):
+            data = data.decode()
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        return method, self.Scrub(path), self.Scrub(data) if data else ""
+
+    def NewExchange(
+        self, key: tuple, response, seconds: float, error: Exception = None
+    ) -> dict:
+        method, path, data = key
+        exchange = {
+            "method": method,
+            "path": path,
+            "request": data,
+            "seconds": round(seconds, 6),
+        }
+        if error is not None:
+            exchange["error"] = str(error)
+            exchange["timeout"] = isinstance(error, requests.exceptions.Timeout)
+            return exchange
+
+        headers = dict()
+        for name in RECORDED_HEADERS:
+            value = response.headers.get(name)
+            if value is not None:
+                headers[name] = SCRUBBED if name in SECRET_HEADERS else value
+
+        exchange["status"] = response.status_code
+        exchange["headers"] = headers
+        exchange["cookies"] = {name: SCRUBBED for name, _ in response.cookies.items()}
+        # streamed AsyncHTTPResponse bodies are kept as bytes only
+        text = response.text if response.text is not None else response.content.decode()
+        exchange["body"] = self.Scrub(text)
+        return exchange
+
+    def Append(self, exchange: dict, meta: dict = None) -> None:
+        with self.__Lock:
+            lines = list()
+            if not os.path.exists(self.__Path) or os.path.getsize(self.__Path) == 0:
+                lines.append(json.dumps({"cassette": CASSETTE_VERSION, "meta": meta or {}}))
+            lines.append(json.dumps(exchange, separators=(",", ":")))
+
+            with gzip.open(self.__Path, "at", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+
+    def Load(self) -> tuple:
+        # (meta, exchanges in the order they were recorded)
+        with gzip.open(self.__Path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            if header.get("cassette") != CASSETTE_VERSION:
+                raise ValueError(
+                    f"{self.__Path} is not a version {CASSETTE_VERSION} cassette"
+                )
+            return header["meta"], [json.loads(line) for line in file if line.strip()]
+
+
+class CassetteResponse:
+    # A recorded response, with the parts of requests.Response the clients use
+    def __init__(self, exchange: dict) -> None:
+        self.status_code = exchange["status"]
+        self.text = exchange["body"]
+        self.headers = CaseInsensitiveDict(exchange["headers"])
+        self.cookies = exchange["cookies"]
+        self.__Content = None
+
+    @property
+    def content(self) -> bytes:
+        if self.__Content is None:
+            self.__Content = self.text.encode()
+        return self.__Content
+
+    def iter_content(self, chunkSize: int):
+        view = memoryview(self.content)
+        for i in range(0, len(view), chunkSize):
+            yield view[i : i + chunkSize]
+
+    def close(self) -> None:
+        self.__Content = None
+
+
+class RecordingSession:
+    # HTTPSession that writes every exchange to a cassette, the responses are
+    # returned as received. Streamed bodies are read whole before returning
+    def __init__(
+        self,
+        path: str,
+        session: HTTPSession = None,
+        meta: dict = None,
+        secretFields: tuple = SECRET_FIELDS,
+    ) -> None:
+        # path - cassette file, appended to if it exists
+        # meta - stored in the header of a new cassette, e.g. what was called
+        self.__Session = session if session else HTTPSession()
+        self.__Cassette = Cassette(path, secretFields)
+        self.__Meta = meta
+
+    def __Record(self, method: str, url: str, data, send) -> requests.Response:
+        key = self.__Cassette.Key(method, url, data)
+        started = monotonic()
+        try:
+            response = send()
+            # a streamed body is read whole here, requests keeps it for
+            # text and iter_content
+            response.content
+        except requests.exceptions.RequestException as e:
+            self.__Cassette.Append(
+                self.__Cassette.NewExchange(key, None, monotonic() - started, e),
+                self.__Meta,
+            )
+            raise
+
+        self.__Cassette.Append(
+            self.__Cassette.NewExchange(key, response, monotonic() - started), self.__Meta
+        )
+        return response
+
+    def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> requests.Response:
+        return self.__Record(
+            "POST",
+            url,
+            data,
+            lambda: self.__Session.Post(url, data, cookies, stream, timeout, idempotent),
+        )
+
+    def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> requests.Response:
+        return self.__Record(
+            "GET", url, None, lambda: self.__Session.Get(url, cookies, timeout)
+        )
+
+    def GetStats(self) -> dict:
+        return self.__Session.GetStats()
+
+    def GetResilienceStats(self) -> dict:
+        return self.__Session.GetResilienceStats()
+
+
+class CassettePlayer:
+    # Answers from a cassette. Requests with the same key get the recorded
+    # responses in their recorded order, starting over after the last one, so
+    # a recorded sequence of calls can be replayed any number of times
+    def __init__(
+        self, path: str, timing: str = "none", secretFields: tuple = SECRET_FIELDS
+    ) -> None:
+        # timing - "none" answers at once, "original" after the recorded time
+        if timing not in ("none", "original"):
+            raise ValueError(f"Unknown timing {timing}")
+
+        self.__Cassette = Cassette(path, secretFields)
+        self.__Timing = timing
+        self.__Lock = threading.Lock()
+        self.__Meta, exchanges = self.__Cassette.Load()
+        self.__Exchanges = dict()  # key -> exchanges
+        self.__Next = dict()  # key -> index of the next answer
+        for exchange in exchanges:
+            key = (exchange["method"], exchange["path"], exchange["request"])
+            self.__Exchanges.setdefault(key, list()).append(exchange)
+        self.__Stats = {"replayed": 0, "misses": 0}
+
+    def GetMeta(self) -> dict:
+        return self.__Meta
+
+    def Next(self, method: str, url: str, data) -> dict:
+        key = self.__Cassette.Key(method, url, data)
+        with self.__Lock:
+            exchanges = self.__Exchanges.get(key)
+            if not exchanges:
+                self.__Stats["misses"] += 1
+                raise CassetteMissError(
+                    f"{method} {key[1]} not in {self.__Cassette.GetPath()}"
+                )
+
+            index = self.__Next.get(key, 0)
+            self.__Next[key] = (index + 1) % len(exchanges)
+            self.__Stats["replayed"] += 1
+        return exchanges[index]
+
+    def GetDelay(self, exchange: dict) -> float:
+        return exchange["seconds"] if self.__Timing == "original" else 0
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return dict(self.__Stats)
+
+
+class ReplaySession:
+    # HTTPSession answering from a cassette instead of the network
+    def __init__(
+        self, path: str, timing: str = "none", secretFields: tuple = SECRET_FIELDS
+    ) -> None:
+        # timing - "none" answers at once, "original" after the recorded time
+        self.__Player = CassettePlayer(path, timing, secretFields)
+
+    def __Replay(self, method: str, url: str, data) -> CassetteResponse:
+        exchange = self.__Player.Next(method, url, data)
+        delay = self.__Player.GetDelay(exchange)
+        if delay:
+            sleep(delay)
+
+        if "error" in exchange:
+            if exchange["timeout"]:
+                raise requests.exceptions.Timeout(exchange["error"])
+            raise requests.exceptions.ConnectionError(exchange["error"])
+        return CassetteResponse(exchange)
+
+    def GetMeta(self) -> dict:
+        return self.__Player.GetMeta()
+
+    def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> CassetteResponse:
+        return self.__Replay("POST", url, data)
+
+    def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> CassetteResponse:
+        return self.__Replay("GET", url, None)
+
+    def GetStats(self) -> dict:
+        stats = self.__Player.GetStats()
+        return {"connections": 0, "requests": stats["replayed"], "reused": 0}
+
+    def GetResilienceStats(self) -> dict:
+        return self.__Player.GetStats()
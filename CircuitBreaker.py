@@ -0,0 +1,80 @@
+import threading
+from time import monotonic
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    # Fails fast while the upstream is down. Closed, it lets every call through
+    # and counts consecutive failures, failureThreshold of them open it. Open,
+    # calls are refused for resetTimeout seconds, then it is half-open and lets
+    # one trial call through: its success closes the breaker, its failure opens
+    # it again
+    def __init__(self, failureThreshold: int = 5, resetTimeout: float = 30) -> None:
+        self.__FailureThreshold = failureThreshold
+        self.__ResetTimeout = resetTimeout
+        self.__Lock = threading.Lock()
+        self.__State = CLOSED
+        self.__Failures = 0  # consecutive
+        self.__OpenedAt = 0.0
+        self.__Trial = False  # the trial call of the half-open state is running
+        self.__Stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def __UpdateState(self) -> str:
+        if self.__State == OPEN and monotonic() - self.__OpenedAt >= self.__ResetTimeout:
+            self.__State = HALF_OPEN
+            self.__Trial = False
+        return self.__State
+
+    def Allow(self) -> bool:
+        with self.__Lock:
+            state = self.__UpdateState()
+            if state == CLOSED:
+                return True
+
+            if state == HALF_OPEN and not self.__Trial:
+                self.__Trial = True
+                return True
+
+            self.__Stats["rejected"] += 1
+            return False
+
+    def Record(self, success: bool = None) -> None:
+        # success None - the call ended without telling anything about the
+        # upstream (e.g. it was cancelled), only a trial slot is given back
+        with self.__Lock:
+            if success is None:
+                if self.__State == HALF_OPEN:
+                    self.__Trial = False
+                return
+
+            if success:
+                self.__Stats["successes"] += 1
+                self.__Failures = 0
+                self.__State = CLOSED
+                self.__Trial = False
+                return
+
+            self.__Stats["failures"] += 1
+            self.__Failures += 1
+            if self.__State == HALF_OPEN or (
+                self.__State == CLOSED and self.__Failures >= self.__FailureThreshold
+            ):
+                self.__State = OPEN
+                self.__OpenedAt = monotonic()
+                self.__Trial = False
+                self.__Stats["opened"] += 1
+
+    def GetState(self) -> str:
+        with self.__Lock:
+            return self.__UpdateState()
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return {
+                "state": self.__UpdateState(),
+                "consecutiveFailures": self.__Failures,
+                **self.__Stats,
+            }
@@ -0,0 +1,141 @@
+import requests
+import random
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from time import sleep
+from requests.adapters import HTTPAdapter
+from CircuitBreaker import CircuitBreaker
+
+# answers of a proxy in front of a stalled or restarting mailbox server
+UPSTREAM_FAILURE_CODES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+
+class HTTPSession:
+    def __init__(
+        self,
+        poolConnections: int = 4,
+        poolMaxSize: int = 32,
+        poolBlock: bool = False,
+        keepAlive: bool = True,
+        connectTimeout: float = 5,
+        readTimeout: float = 60,
+        retries: int = 2,
+        backoffBase: float = 0.1,
+        backoffMax: float = 2,
+        failureThreshold: int = 5,
+        resetTimeout: float = 30,
+    ) -> None:
+        # poolConnections  - number of hosts to keep pools for
+        # poolMaxSize      - kept-alive connections per host
+        # poolBlock        - wait for a free connection instead of opening an extra one
+        # retries          - extra attempts of idempotent requests after a connection
+        #                    error, a timeout or a 502/503/504, up to backoffBase * 2^n
+        #                    (at most backoffMax) seconds apart, randomly
+        # failureThreshold - consecutive failures after which no request is sent
+        #                    for resetTimeout seconds (CircuitOpenError is raised)
+        self.__Timeout = (connectTimeout, readTimeout)
+        self.__Retries = retries
+        self.__BackoffBase = backoffBase
+        self.__BackoffMax = backoffMax
+        self.__Breaker = CircuitBreaker(failureThreshold, resetTimeout)
+        self.__StatsLock = threading.Lock()
+        self.__Stats = {"retries": 0, "timeouts": 0}
+        self.__Adapter = HTTPAdapter(
+            pool_connections=poolConnections,
+            pool_maxsize=poolMaxSize,
+            pool_block=poolBlock,
+        )
+
+        self.__Session = requests.Session()
+        self.__Session.verify = False
+        # auth cookies are passed explicitly, the shared jar must not collect them
+        self.__Session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        if not keepAlive:
+            self.__Session.headers["Connection"] = "close"
+
+        self.__Session.mount("https://", self.__Adapter)
+        self.__Session.mount("http://", self.__Adapter)
+
+    def __Count(self, name: str) -> None:
+        with self.__StatsLock:
+            self.__Stats[name] += 1
+
+    def __Request(
+        self, method: str, url: str, idempotent: bool, timeout: tuple, **kwargs
+    ) -> requests.Response:
+        # Every attempt passes the circuit breaker and reports to it. A failed
+        # idempotent request is repeated, the last failure is returned or raised
+        attempts = self.__Retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            if not self.__Breaker.Allow():
+                raise CircuitOpenError(f"Circuit open, {url} not requested")
+
+            success = None
+            try:
+                response = self.__Session.request(
+                    method, url, timeout=timeout if timeout else self.__Timeout, **kwargs
+                )
+                success = response.status_code not in UPSTREAM_FAILURE_CODES
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                success = False
+                if isinstance(e, requests.exceptions.Timeout):
+                    self.__Count("timeouts")
+                if attempt + 1 == attempts:
+                    raise
+                response = None
+            finally:
+                self.__Breaker.Record(success)
+
+            if success or attempt + 1 == attempts:
+                return response
+
+            if response is not None:
+                response.close()
+            self.__Count("retries")
+            sleep(random.uniform(0, min(self.__BackoffMax, self.__BackoffBase * 2**attempt)))
+
+    def Post(
+        self,
+        url: str,
+        data: str,
+        cookies: dict = None,
+        stream: bool = False,
+        timeout: tuple = None,
+        idempotent: bool = False,
+    ) -> requests.Response:
+        # stream     - return before the body is read, the connection goes back to
+        #              the pool once the body is consumed or the response closed
+        # timeout    - (connect, read) seconds instead of the session's
+        # idempotent - the request may be repeated after a failure
+        return self.__Request(
+            "POST", url, idempotent, timeout, data=data, cookies=cookies, stream=stream
+        )
+
+    def Get(
+        self, url: str, cookies: dict = None, timeout: tuple = None
+    ) -> requests.Response:
+        return self.__Request("GET", url, True, timeout, cookies=cookies)
+
+    def GetStats(self) -> dict:
+        stats = {"connections": 0, "requests": 0, "reused": 0}
+
+        pools = self.__Adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+
+            stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
+
+    def GetResilienceStats(self) -> dict:
+        with self.__StatsLock:
+            stats = dict(self.__Stats)
+        return {**self.__Breaker.GetStats(), **stats}
@@ -0,0 +1,200 @@
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+
+
+class JSONStream:
+    # Incremental reader of a JSON document arriving as byte chunks. Arrays under
+    # the given paths are never built: Items() decodes their elements one at a
+    # time as the chunks come in and yields them as (path, item). Everything else
+    # is kept and returned by GetRest() once Items() is exhausted.
+    # A path is a tuple of keys, "item" stands for every element of an array on
+    # the way, e.g. ("Body", "GetDistributionListResponse", "dl", "item", "dlm")
+    def __init__(self, chunks, paths) -> None:
+        self.__Chunks = iter(chunks)
+        self.__Decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__JSONDecoder = json.JSONDecoder()
+        self.__Buffer = ""
+        self.__Pos = 0
+        self.__EOF = False
+        self.__Paths = {tuple(path) for path in paths}
+        # objects and arrays on the way to a streamed array are walked key by
+        # key, any other value is decoded whole
+        self.__Prefixes = {path[:i] for path in self.__Paths for i in range(len(path))}
+        self.__Rest = None
+
+    def Items(self):
+        # the walk hands up lists of items, one per buffer, so the nested
+        # generators are resumed once per chunk rather than once per item
+        walk = self.__Value(())
+        while True:
+            try:
+                path, items = next(walk)
+            except StopIteration as stop:
+                self.__Rest = stop.value
+                break
+
+            for item in items:
+                yield path, item
+
+        if self.__Peek():
+            raise ValueError("Extra data after the JSON document")
+
+    def GetRest(self):
+        return self.__Rest
+
+    def __Fill(self) -> bool:
+        if self.__EOF:
+            return False
+
+        # the consumed part is dropped, so the buffer only holds the value being read
+        self.__Buffer = self.__Buffer[self.__Pos :]
+        self.__Pos = 0
+
+        chunk = next(self.__Chunks, None)
+        if chunk is None:
+            self.__EOF = True
+            self.__Buffer += self.__Decoder.decode(b"", final=True)
+            return False
+
+        self.__Buffer += self.__Decoder.decode(chunk)
+        return True
+
+    def __Peek(self) -> str:
+        # next significant character, "" at the end of the document
+        while True:
+            buffer, pos = self.__Buffer, self.__Pos
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            self.__Pos = pos
+
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self.__Fill():
+                return ""
+
+    def __Next(self, expected: str) -> str:
+        char = self.__Peek()
+        if char not in expected:
+            raise ValueError(f"Expected one of {expected!r} in JSON, got {char!r}")
+        self.__Pos += 1
+        return char
+
+    def __Decode(self):
+        # A whole value. It is only complete once something follows it in the
+        # buffer, a number at the very end may still continue in the next chunk
+        self.__Peek()
+        while True:
+            try:
+                value, end = self.__JSONDecoder.raw_decode(self.__Buffer, self.__Pos)
+                if end < len(self.__Buffer) or self.__EOF:
+                    self.__Pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__EOF:
+                    raise
+
+            self.__Fill()
+
+    def __Value(self, path: tuple):
+        if path in self.__Paths or path in self.__Prefixes:
+            char = self.__Peek()
+            if char == "{":
+                return (yield from self.__Object(path))
+            if char == "[":
+                return (yield from self.__Array(path))
+
+        value = self.__Decode()
+        if path in self.__Paths:
+            # a single element where an array was expected
+            yield path, [value]
+            return None
+        return value
+
+    def __Object(self, path: tuple):
+        self.__Next("{")
+        result = dict()
+
+        if self.__Peek() == "}":
+            self.__Pos += 1
+            return result
+
+        while True:
+            key = self.__Decode()
+            self.__Next(":")
+
+            childPath = path + (key,)
+            value = yield from self.__Value(childPath)
+            if childPath not in self.__Paths:
+                result[key] = value
+
+            if self.__Next(",}") == "}":
+                return result
+
+    def __Array(self, path: tuple):
+        self.__Next("[")
+        itemPath = path + ("item",)
+        result = list()
+
+        if self.__Peek() == "]":
+            self.__Pos += 1
+            return result
+
+        if path in self.__Paths:
+            return (yield from self.__Items(path))
+
+        while True:
+            result.append((yield from self.__Value(itemPath)))
+
+            if self.__Next(",]") == "]":
+                return result
+
+    def __Items(self, path: tuple):
+        # The complete items in the buffer are decoded together as one array,
+        # cut after the last "},{". If that falls inside a string the slice is
+        # not valid JSON and the items are decoded one by one instead. The item
+        # cut by the end of the buffer is read the careful way
+        decode = self.__JSONDecoder.decode
+        rawDecode = self.__JSONDecoder.raw_decode
+        while True:
+            self.__Peek()
+            buffer, pos = self.__Buffer, self.__Pos
+            size = len(buffer)
+
+            items = None
+            cut = buffer.rfind("},{", pos)
+            if cut == -1:
+                cut = buffer.rfind("}, {", pos)
+            if cut != -1:
+                try:
+                    items = decode(f"[{buffer[pos : cut + 1]}]")
+                    pos = buffer.index("{", cut + 1)
+                except json.JSONDecodeError:
+                    pass
+
+            if items is None:
+                items = list()
+                while True:
+                    try:
+                        item, end = rawDecode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break
+                    while end < size and buffer[end] in WHITESPACE:
+                        end += 1
+                    if end >= size or buffer[end] != ",":
+                        break
+                    end += 1
+                    while end < size and buffer[end] in WHITESPACE:
+                        end += 1
+
+                    pos = end
+                    items.append(item)
+
+            self.__Pos = pos
+            if items:
+                yield path, items
+
+            yield path, [self.__Decode()]
+            if self.__Next(",]") == "]":
+                return []
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+class LRUCache:
+    def __init__(self, maxSize: int = 10000, ttl: float = 300) -> None:
+        self.__MaxSize = maxSize
+        self.__TTL = ttl
+        self.__Items = OrderedDict()  # key -> (expiresAt, value), oldest first
+        self.__Lock = threading.Lock()
+        self.__Stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def Get(self, key):
+        with self.__Lock:
+            item = self.__Items.get(key)
+            if item is None or item[0] <= monotonic():
+                if item is not None:
+                    del self.__Items[key]
+                self.__Stats["misses"] += 1
+                return None
+
+            self.__Items.move_to_end(key)
+            self.__Stats["hits"] += 1
+            return item[1]
+
+    def Set(self, key, value, ttl: float = None) -> None:
+        expiresAt = monotonic() + (self.__TTL if ttl is None else ttl)
+
+        with self.__Lock:
+            self.__Items[key] = (expiresAt, value)
+            self.__Items.move_to_end(key)
+
+            while len(self.__Items) > self.__MaxSize:
+                self.__Items.popitem(last=False)
+                self.__Stats["evictions"] += 1
+
+    def Delete(self, key) -> None:
+        with self.__Lock:
+            self.__Items.pop(key, None)
+
+    def DeleteValue(self, value) -> None:
+        with self.__Lock:
+            for key in [k for k, item in self.__Items.items() if item[1] == value]:
+                del self.__Items[key]
+
+    def Clear(self) -> None:
+        with self.__Lock:
+            self.__Items.clear()
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return {**self.__Stats, "size": len(self.__Items)}
@@ -0,0 +1,212 @@
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+from time import monotonic
+
+# upper bounds in seconds, +Inf is added on export
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# counts of exited processes, summed with the <pid>.json files
+ARCHIVE_FILE = "archive.json"
+
+METRICS = {
+    "zimbra_api_http_requests_total": ("counter", "Requests answered per route and HTTP status"),
+    "zimbra_api_http_request_duration_seconds": ("histogram", "Time to answer a request per route"),
+    "zimbra_api_errors_total": ("counter", "ResponseData error codes answered per route"),
+    "zimbra_api_hmac_check_duration_seconds": ("histogram", "Time to check a request signature"),
+    "zimbra_api_soap_requests_total": ("counter", "Upstream SOAP requests per request type and HTTP status"),
+    "zimbra_api_soap_request_duration_seconds": ("histogram", "Upstream SOAP request time per request type, retries included"),
+    "zimbra_api_soap_faults_total": ("counter", "Zimbra fault codes per request type"),
+    "zimbra_api_upstream_bytes_sent_total": ("counter", "Request body bytes sent upstream"),
+    "zimbra_api_upstream_bytes_received_total": ("counter", "Response body bytes received from upstream"),
+    "zimbra_api_auth_refreshes_total": ("counter", "AuthRequests sent to refresh the admin session"),
+    "zimbra_api_auth_refresh_duration_seconds": ("histogram", "AuthRequest time"),
+    "zimbra_api_name_resolutions_total": ("counter", "Name to id resolutions, from the name cache or a lookup"),
+    "zimbra_api_name_lookup_duration_seconds": ("histogram", "Name to id lookups sent upstream"),
+}
+
+
+class Metrics:
+    # Counters and latency histograms of one process in Prometheus text format.
+    # Labels are tuples of (name, value) pairs. With a directory, the values are
+    # written to <directory>/<pid>.json at most once per flushInterval seconds
+    # and Export() sums the files of all processes, so any gunicorn worker
+    # answers for all of them. On start, the files of exited processes and an
+    # earlier one of this pid are added to archive.json and removed, so their
+    # counts stay in the totals and a reused pid does not start them over
+    def __init__(
+        self, directory: str = None, flushInterval: float = 1, buckets=DEFAULT_BUCKETS
+    ) -> None:
+        self.__Directory = directory
+        self.__FlushInterval = flushInterval
+        self.__Buckets = tuple(buckets)
+        self.__Lock = threading.Lock()
+        self.__Counters = dict()  # (name, labels) -> value
+        self.__Histograms = dict()  # (name, labels) -> [bucket counts..., sum, count]
+        self.__FlushedAt = monotonic()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.__ArchiveExited()
+
+    def Count(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        key = (name, labels)
+        with self.__Lock:
+            self.__Counters[key] = self.__Counters.get(key, 0) + value
+        self.__MaybeFlush()
+
+    def Observe(self, name: str, labels: tuple, seconds: float) -> None:
+        key = (name, labels)
+        with self.__Lock:
+            values = self.__Histograms.get(key)
+            if values is None:
+                values = self.__Histograms[key] = [0] * (len(self.__Buckets) + 2)
+            for i, bound in enumerate(self.__Buckets):
+                if seconds <= bound:
+                    values[i] += 1
+                    break
+            values[-2] += seconds
+            values[-1] += 1
+        self.__MaybeFlush()
+
+    def __Snapshot(self) -> dict:
+        with self.__Lock:
+            return {
+                "buckets": self.__Buckets,
+                "counters": [[n, l, v] for (n, l), v in self.__Counters.items()],
+                "histograms": [[n, l, list(v)] for (n, l), v in self.__Histograms.items()],
+            }
+
+    def __MaybeFlush(self) -> None:
+        if self.__Directory and monotonic() - self.__FlushedAt >= self.__FlushInterval:
+            self.Flush()
+
+    def Flush(self) -> None:
+        if not self.__Directory:
+            return
+
+        self.__FlushedAt = monotonic()
+        self.__Write(os.path.join(self.__Directory, f"{os.getpid()}.json"), self.__Snapshot())
+
+    def __Write(self, path: str, snapshot: dict) -> None:
+        fd, tmpPath = tempfile.mkstemp(dir=self.__Directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(snapshot, file)
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+
+    @staticmethod
+    def __Load(path: str) -> dict:
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __Exited(path: str) -> bool:
+        pid = os.path.basename(path)[: -len(".json")]
+        if not pid.isdigit():
+            return False
+        if int(pid) == os.getpid():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def __ArchiveExited(self) -> None:
+        # the lock keeps workers starting together from archiving a file twice
+        with open(os.path.join(self.__Directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            paths = glob.glob(os.path.join(self.__Directory, "*.json"))
+            exited = [path for path in paths if self.__Exited(path)]
+            if not exited:
+                return
+
+            archivePath = os.path.join(self.__Directory, ARCHIVE_FILE)
+            snapshots = [self.__Load(path) for path in [archivePath] + exited]
+            counters, histograms = self.__Sum(snapshot for snapshot in snapshots if snapshot)
+            self.__Write(
+                archivePath,
+                {
+                    "buckets": self.__Buckets,
+                    "counters": [[n, l, v] for (n, l), v in counters.items()],
+                    "histograms": [[n, l, v] for (n, l), v in histograms.items()],
+                },
+            )
+            for path in exited:
+                os.unlink(path)
+
+    def __Collect(self) -> tuple:
+        # counters and histograms summed over the processes
+        if not self.__Directory:
+            return self.__Sum([self.__Snapshot()])
+
+        self.Flush()
+        paths = glob.glob(os.path.join(self.__Directory, "*.json"))
+        snapshots = [self.__Load(path) for path in paths]
+        return self.__Sum(snapshot for snapshot in snapshots if snapshot)
+
+    def __Sum(self, snapshots) -> tuple:
+        # snapshots of other buckets are skipped
+        counters = dict()
+        histograms = dict()
+        for snapshot in snapshots:
+            if tuple(snapshot["buckets"]) != self.__Buckets:
+                continue
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+        return counters, histograms
+
+    @staticmethod
+    def __Labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        escaped = [
+            (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for name, value in labels
+        ]
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    def Export(self) -> str:
+        counters, histograms = self.__Collect()
+        series = dict()  # name -> lines
+        for (name, labels), value in sorted(counters.items()):
+            series.setdefault(name, []).append(f"{name}{self.__Labels(labels)} {value}")
+
+        for (name, labels), values in sorted(histograms.items()):
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.__Buckets, values):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{self.__Labels(labels + (('le', bound),))} {cumulative}"
+                )
+            lines.append(
+                f"{name}_bucket{self.__Labels(labels + (('le', '+Inf'),))} {values[-1]}"
+            )
+            lines.append(f"{name}_sum{self.__Labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{self.__Labels(labels)} {values[-1]}")
+
+        output = list()
+        for name, lines in series.items():
+            kind, description = METRICS.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
@@ -0,0 +1,228 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_TAGS_CHUNK = 500
+
+
+class ResponseCache:
+    # In-process backend of the read-through cache: serialized results with a
+    # TTL per entry, least recently used evicted above maxSize. Entries are
+    # indexed by their tags, Invalidate drops exactly the entries carrying one.
+    # Every invalidation bumps the generation, a result read before it is not
+    # stored by Set, so a concurrent write cannot be overwritten by stale data
+    def __init__(self, maxSize: int = 10000) -> None:
+        self.__MaxSize = maxSize
+        self.__Items = OrderedDict()  # key -> (expiresAt, value, tags), oldest first
+        self.__Tags = dict()  # tag -> keys
+        self.__Generation = 0
+        self.__Lock = threading.Lock()
+        self.__Stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+
+    def __Remove(self, key) -> None:
+        _, _, tags = self.__Items.pop(key)
+        for tag in tags:
+            keys = self.__Tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__Tags[tag]
+
+    def Get(self, key: str):
+        with self.__Lock:
+            item = self.__Items.get(key)
+            if item is None or item[0] <= time():
+                if item is not None:
+                    self.__Remove(key)
+                self.__Stats["misses"] += 1
+                return None
+
+            self.__Items.move_to_end(key)
+            self.__Stats["hits"] += 1
+            return item[1]
+
+    def GetGeneration(self) -> int:
+        with self.__Lock:
+            return self.__Generation
+
+    def Set(self, key: str, value: str, ttl: float, tags: list, generation: int) -> None:
+        with self.__Lock:
+            if generation != self.__Generation:
+                return
+
+            if key in self.__Items:
+                self.__Remove(key)
+
+            self.__Items[key] = (time() + ttl, value, tuple(tags))
+            for tag in tags:
+                self.__Tags.setdefault(tag, set()).add(key)
+            self.__Stats["sets"] += 1
+
+            while len(self.__Items) > self.__MaxSize:
+                self.__Remove(next(iter(self.__Items)))
+                self.__Stats["evictions"] += 1
+
+    def Invalidate(self, tags: list) -> None:
+        with self.__Lock:
+            self.__Generation += 1
+            for tag in tags:
+                for key in list(self.__Tags.get(tag, ())):
+                    self.__Remove(key)
+                    self.__Stats["invalidations"] += 1
+
+    def Clear(self) -> None:
+        with self.__Lock:
+            self.__Generation += 1
+            self.__Items.clear()
+            self.__Tags.clear()
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return {**self.__Stats, "size": len(self.__Items)}
+
+
+class SQLiteResponseCache:
+    # ResponseCache kept in an SQLite file, shared by every process that opens
+    # the same path, e.g. the gunicorn workers of one host. Above maxSize the
+    # entries closest to expiry are evicted, so reads stay read-only. Hit and
+    # miss counters are per process, the size is that of the shared file
+    def __init__(self, path: str, maxSize: int = 10000, timeout: float = 5) -> None:
+        self.__Path = path
+        self.__MaxSize = maxSize
+        self.__Timeout = timeout
+        self.__Local = threading.local()
+        self.__Lock = threading.Lock()
+        self.__Stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+
+        connection = self.__GetConnection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS entries"
+            " (key TEXT PRIMARY KEY, value TEXT, expires REAL);"
+            "CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);"
+            "CREATE TABLE IF NOT EXISTS tags (tag TEXT, key TEXT);"
+            "CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);"
+            "CREATE INDEX IF NOT EXISTS tags_key ON tags (key);"
+            "CREATE TABLE IF NOT EXISTS generation (value INTEGER);"
+            "INSERT INTO generation SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM generation);"
+        )
+
+    def __GetConnection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self.__Local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.__Path, timeout=self.__Timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__Local.connection = connection
+        return connection
+
+    def __Count(self, name: str, count: int = 1) -> None:
+        with self.__Lock:
+            self.__Stats[name] += count
+
+    def Get(self, key: str):
+        row = (
+            self.__GetConnection()
+            .execute(
+                "SELECT value FROM entries WHERE key = ? AND expires > ?", (key, time())
+            )
+            .fetchone()
+        )
+        self.__Count("misses" if row is None else "hits")
+        return None if row is None else row[0]
+
+    def GetGeneration(self) -> int:
+        return self.__GetConnection().execute("SELECT value FROM generation").fetchone()[0]
+
+    def Set(self, key: str, value: str, ttl: float, tags: list, generation: int) -> None:
+        connection = self.__GetConnection()
+        now = time()
+
+        # committed on leaving the block, rolled back on an error
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if connection.execute("SELECT value FROM generation").fetchone()[0] != generation:
+                return
+
+            connection.execute("DELETE FROM tags WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, value, now + ttl)
+            )
+            connection.executemany(
+                "INSERT INTO tags VALUES (?, ?)", [(tag, key) for tag in tags]
+            )
+
+            excess = (
+                connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                - self.__MaxSize
+            )
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM entries WHERE key IN"
+                    " (SELECT key FROM entries ORDER BY expires LIMIT ?)",
+                    (excess,),
+                )
+                connection.execute(
+                    "DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)"
+                )
+                self.__Count("evictions", excess)
+
+        self.__Count("sets")
+
+    def Invalidate(self, tags: list) -> None:
+        connection = self.__GetConnection()
+        tags = list(tags)
+        removed = 0
+
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("UPDATE generation SET value = value + 1")
+            for i in range(0, len(tags), SQLITE_TAGS_CHUNK):
+                chunk = tags[i : i + SQLITE_TAGS_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                keys = [
+                    row[0]
+                    for row in connection.execute(
+                        f"SELECT DISTINCT key FROM tags WHERE tag IN ({marks})", chunk
+                    )
+                ]
+                for j in range(0, len(keys), SQLITE_TAGS_CHUNK):
+                    keyChunk = keys[j : j + SQLITE_TAGS_CHUNK]
+                    keyMarks = ",".join("?" * len(keyChunk))
+                    removed += connection.execute(
+                        f"DELETE FROM entries WHERE key IN ({keyMarks})", keyChunk
+                    ).rowcount
+                    connection.execute(
+                        f"DELETE FROM tags WHERE key IN ({keyMarks})", keyChunk
+                    )
+
+        self.__Count("invalidations", removed)
+
+    def Clear(self) -> None:
+        connection = self.__GetConnection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("UPDATE generation SET value = value + 1")
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM tags")
+
+    def GetStats(self) -> dict:
+        size = self.__GetConnection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        with self.__Lock:
+            return {**self.__Stats, "size": size}
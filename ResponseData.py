@@ -42,6 +42,27 @@ class ResponseData:
         result.SetErrorText("Some request data missing")
         return result
 
+    @staticmethod
+    def GetUnknownOperationError():
+        result = ResponseData()
+        result.SetErrorCode("UNKNOWN_OPERATION")
+        result.SetErrorText("Unknown operation")
+        return result
+
+    @staticmethod
+    def GetTooManyOperationsError():
+        result = ResponseData()
+        result.SetErrorCode("TOO_MANY_OPERATIONS")
+        result.SetErrorText("Too many operations in one request")
+        return result
+
+    @staticmethod
+    def GetTooManyWaitersError():
+        result = ResponseData()
+        result.SetErrorCode("TOO_MANY_WAITERS")
+        result.SetErrorText("Too many requests waiting for changes, retry later")
+        return result
+
     def asdict(self) -> dict:
         error = {"code": self.GetErrorCode(), "text": self.GetErrorText()}
         return {"error": error} if self.IsError() else {"data": self.GetData()}
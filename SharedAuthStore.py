@@ -0,0 +1,79 @@
+import fcntl
+import json
+import os
+import tempfile
+from time import time
+
+
+class SharedAuthLock:
+    # Exclusive lock on a local file, held by the process refreshing the tokens.
+    # flock locks belong to the open file, so it can be released from another
+    # thread than the one that acquired it
+    def __init__(self, path: str) -> None:
+        self.__Path = path
+        self.__FD = None
+
+    def Acquire(self) -> None:
+        fd = os.open(self.__Path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.__FD = fd
+
+    def Release(self) -> None:
+        fd, self.__FD = self.__FD, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def __enter__(self):
+        self.Acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Release()
+
+
+class SharedAuthStore:
+    # Admin tokens kept in a local file shared by the processes of one host,
+    # e.g. the gunicorn workers. The process that refreshes holds Lock(), the
+    # others wait for it and take over the tokens it saved instead of
+    # authenticating themselves. The file is replaced atomically, so it is read
+    # without the lock. Refresh times are wall-clock, monotonic() is per process
+    def __init__(self, path: str) -> None:
+        self.__Path = path
+        self.__LockPath = path + ".lock"
+
+    def __Read(self) -> dict:
+        try:
+            with open(self.__Path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return dict()
+        return entries if isinstance(entries, dict) else dict()
+
+    def Load(self, key: str):
+        # {"authToken", "csrfToken", "refreshAt"} or None
+        return self.__Read().get(key)
+
+    def Save(self, key: str, authToken: str, CSRFToken: str, refreshAt: float) -> None:
+        # Called holding Lock(). Entries past their refresh time are dropped
+        now = time()
+        entries = {k: v for k, v in self.__Read().items() if v.get("refreshAt", 0) > now}
+        entries[key] = {"authToken": authToken, "csrfToken": CSRFToken, "refreshAt": refreshAt}
+
+        # mkstemp creates the file readable by its owner only
+        directory = os.path.dirname(os.path.abspath(self.__Path))
+        fd, tmpPath = tempfile.mkstemp(dir=directory, prefix=".auth-")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(entries, file)
+            os.replace(tmpPath, self.__Path)
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+
+    def Lock(self) -> SharedAuthLock:
+        return SharedAuthLock(self.__LockPath)
@@ -0,0 +1,42 @@
+import threading
+from BatchCoalescer import BatchSlot
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution: the first thread
+    # runs fn, the others wait for its result (or its exception). The key is
+    # released as soon as fn returns, later calls run fn again
+    def __init__(self) -> None:
+        self.__Lock = threading.Lock()
+        self.__Flights = dict()  # key -> slot of the call in flight
+        self.__Stats = {"calls": 0, "collapsed": 0}
+
+    def Do(self, key, fn):
+        with self.__Lock:
+            self.__Stats["calls"] += 1
+            slot = self.__Flights.get(key)
+            isLeader = slot is None
+            if isLeader:
+                slot = self.__Flights[key] = BatchSlot(key)
+            else:
+                self.__Stats["collapsed"] += 1
+
+        if isLeader:
+            try:
+                slot.Result = fn()
+            except Exception as e:
+                slot.Error = e
+            finally:
+                with self.__Lock:
+                    del self.__Flights[key]
+                slot.Done.set()
+        else:
+            slot.Done.wait()
+
+        if slot.Error is not None:
+            raise slot.Error
+        return slot.Result
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return dict(self.__Stats)
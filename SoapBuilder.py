@@ -0,0 +1,150 @@
+import json
+
+
+class SoapBuilder:
+    # Request XML helpers. Values are escaped and non-ASCII characters written as
+    # character references, so the body stays plain ASCII. Lists of elements are
+    # built with joins instead of repeated concatenation, the constant envelope
+    # parts are pre-encoded.
+    # Requests are described in Zimbra's JSON form and rendered either as XML
+    # (Element) or as a JSON envelope (JsonEnvelope): "_jsns" is the namespace,
+    # "_content" the text, other scalars are attributes, dicts and lists of
+    # dicts are child elements and lists of scalars text-only child elements.
+    # A dict under "a" is a name -> value map of <a n="name">value</a> attributes
+
+    ENVELOPE_START = (
+        b'<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">'
+        b"<soap:Header>"
+        b'<context xmlns="urn:zimbra">'
+        b'<format type="js"/>'
+        b"<csrfToken>"
+    )
+    CSRF_END = b"</csrfToken>"
+    HEADER_END = b"</context></soap:Header><soap:Body>"
+    ENVELOPE_END = b"</soap:Body></soap:Envelope>"
+
+    @staticmethod
+    def Escape(value) -> str:
+        value = (
+            str(value)
+            .replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace('"', "&quot;")
+        )
+        if not value.isascii():
+            value = value.encode("ascii", errors="xmlcharrefreplace").decode()
+        return value
+
+    @staticmethod
+    def Attrs(params: dict) -> str:
+        # keys and values are escaped in one pass over the joined text, the
+        # separators are then replaced by the markup between them
+        if not params:
+            return ""
+
+        try:
+            text = "\x01".join(map("\x00".join, params.items()))
+        except TypeError:  # non-string values
+            text = "\x01".join([f"{k}\x00{v}" for k, v in params.items()])
+        if text.count("\x00") != len(params) or text.count("\x01") != len(params) - 1:
+            escape = SoapBuilder.Escape
+            return "".join(
+                [f'<a n="{escape(k)}">{escape(v)}</a>' for k, v in params.items()]
+            )
+
+        text = SoapBuilder.Escape(text).replace("\x00", '">').replace("\x01", '</a><a n="')
+        return f'<a n="{text}</a>'
+
+    @staticmethod
+    def Elements(tag: str, values) -> str:
+        values = [str(value) for value in values]
+        if not values:
+            return ""
+
+        text = "\x00".join(values)
+        if text.count("\x00") != len(values) - 1:
+            escape = SoapBuilder.Escape
+            return "".join([f"<{tag}>{escape(value)}</{tag}>" for value in values])
+
+        text = SoapBuilder.Escape(text).replace("\x00", f"</{tag}><{tag}>")
+        return f"<{tag}>{text}</{tag}>"
+
+    @staticmethod
+    def Envelope(data: list, CSRFToken: str, targetAccount: str = "") -> bytes:
+        parts = [SoapBuilder.ENVELOPE_START, str(CSRFToken).encode(), SoapBuilder.CSRF_END]
+        if targetAccount:
+            parts.append(
+                f'<account by="name">{SoapBuilder.Escape(targetAccount)}</account>'.encode()
+            )
+        parts.append(SoapBuilder.HEADER_END)
+        parts.extend(item.encode() for item in data)
+        parts.append(SoapBuilder.ENVELOPE_END)
+        return b"".join(parts)
+
+    @staticmethod
+    def Element(name: str, content: dict) -> str:
+        escape = SoapBuilder.Escape
+        attrs = list()
+        children = list()
+        text = ""
+
+        for key, value in content.items():
+            if key == "_jsns":
+                attrs.append(f' xmlns="{value}"')
+            elif key == "_content":
+                text = escape(value)
+            elif isinstance(value, dict):
+                if key == "a":
+                    children.append(SoapBuilder.Attrs(value))
+                else:
+                    children.append(SoapBuilder.Element(key, value))
+            elif isinstance(value, list):
+                if value and not isinstance(value[0], dict):
+                    children.append(SoapBuilder.Elements(key, value))
+                else:
+                    children.extend([SoapBuilder.Element(key, item) for item in value])
+            else:
+                attrs.append(f' {key}="{escape(value)}"')
+
+        attrStr = "".join(attrs)
+        if not text and not children:
+            return f"<{name}{attrStr}/>"
+        return f"<{name}{attrStr}>{text}{''.join(children)}</{name}>"
+
+    @staticmethod
+    def __Json(content: dict) -> dict:
+        result = dict()
+        for key, value in content.items():
+            if isinstance(value, dict):
+                if key == "a":
+                    value = [{"n": n, "_content": v} for n, v in value.items()]
+                else:
+                    value = SoapBuilder.__Json(value)
+            elif isinstance(value, list):
+                if value and not isinstance(value[0], dict):
+                    value = [{"_content": item} for item in value]
+                else:
+                    value = [SoapBuilder.__Json(item) for item in value]
+            result[key] = value
+        return result
+
+    @staticmethod
+    def JsonEnvelope(
+        requestName: str, content: dict, CSRFToken: str, targetAccount: str = ""
+    ) -> bytes:
+        context = {
+            "_jsns": "urn:zimbra",
+            "format": {"type": "js"},
+            "csrfToken": str(CSRFToken),
+        }
+        if targetAccount:
+            context["account"] = {"by": "name", "_content": targetAccount}
+
+        return json.dumps(
+            {
+                "Header": {"context": context},
+                "Body": {requestName: SoapBuilder.__Json(content)},
+            },
+            separators=(",", ":"),
+        ).encode()
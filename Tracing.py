@@ -0,0 +1,149 @@
+import contextvars
+import json
+import re
+import threading
+import uuid
+from time import perf_counter_ns, time
+
+# the trace of the request being handled, None when it is not traced
+CURRENT_TRACE = contextvars.ContextVar("CURRENT_TRACE", default=None)
+
+
+class NullSpan:
+    # returned by Trace.Span outside a trace, entering it costs nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, trace, name: str) -> None:
+        self.__Trace = trace
+        self.__Name = name
+        self.__Start = 0
+
+    def __enter__(self):
+        self.__Start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.__Trace.Add(self.__Name, self.__Start, perf_counter_ns())
+
+
+class Trace:
+    # Timed spans of one request. Spans are kept flat as (name, start, end)
+    # and nested by their times when exported, so a span may start in one
+    # function and end in another (e.g. across the yield of an operation) and
+    # spans of worker threads need no parent to be passed to them. Code calls
+    # Trace.Span(name) wherever a phase is worth timing, outside a trace it
+    # returns NULL_SPAN
+    def __init__(self, name: str, traceID: str = None) -> None:
+        self.__Name = name
+        self.__TraceID = traceID if traceID else uuid.uuid4().hex
+        self.__StartedAt = time()
+        self.__Start = perf_counter_ns()
+        self.__End = None
+        self.__Spans = list()  # appends are atomic, threads share the list
+        self.__Token = None
+
+    @staticmethod
+    def Start(name: str, traceID: str = None):
+        trace = Trace(name, traceID)
+        trace.__Token = CURRENT_TRACE.set(trace)
+        return trace
+
+    @staticmethod
+    def Span(name: str):
+        trace = CURRENT_TRACE.get()
+        return NULL_SPAN if trace is None else Span(trace, name)
+
+    @staticmethod
+    def Bind(fn):
+        # fn running in another thread with the current trace, contextvars
+        # are not passed to ThreadPoolExecutor workers by themselves
+        trace = CURRENT_TRACE.get()
+        if trace is None:
+            return fn
+
+        def bound(*args, **kwargs):
+            token = CURRENT_TRACE.set(trace)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                CURRENT_TRACE.reset(token)
+
+        return bound
+
+    def Add(self, name: str, start: int, end: int) -> None:
+        self.__Spans.append((name, start, end))
+
+    def Finish(self) -> None:
+        # may be called more than once, the first call counts
+        if self.__End is not None:
+            return
+        self.__End = perf_counter_ns()
+        if self.__Token is not None:
+            CURRENT_TRACE.reset(self.__Token)
+            self.__Token = None
+
+    def GetTraceID(self) -> str:
+        return self.__TraceID
+
+    def GetServerTiming(self) -> str:
+        # Server-Timing header value: milliseconds summed per span name, nested
+        # spans are also part of their parent's time
+        totals = dict()
+        for name, start, end in self.__Spans:
+            totals[name] = totals.get(name, 0) + end - start
+        end = self.__End if self.__End is not None else perf_counter_ns()
+        totals["total"] = end - self.__Start
+
+        return ", ".join(
+            f"{re.sub(r'[^A-Za-z0-9_.-]', '-', name)};dur={duration / 1e6:.3f}"
+            for name, duration in totals.items()
+        )
+
+    def asdict(self) -> dict:
+        # spans in start order with offsets and durations in milliseconds,
+        # depth counts the spans enclosing each one
+        end = self.__End if self.__End is not None else perf_counter_ns()
+        spans = list()
+        enclosing = list()  # ends of the spans still open at this start
+        for name, start, spanEnd in sorted(self.__Spans, key=lambda s: (s[1], -s[2])):
+            while enclosing and enclosing[-1] < spanEnd:
+                enclosing.pop()
+            spans.append(
+                {
+                    "name": name,
+                    "offset": round((start - self.__Start) / 1e6, 3),
+                    "duration": round((spanEnd - start) / 1e6, 3),
+                    "depth": len(enclosing),
+                }
+            )
+            enclosing.append(spanEnd)
+
+        return {
+            "traceId": self.__TraceID,
+            "name": self.__Name,
+            "startedAt": self.__StartedAt,
+            "duration": round((end - self.__Start) / 1e6, 3),
+            "spans": spans,
+        }
+
+
+class TraceFileExporter:
+    # Appends finished traces to a file, one JSON object per line
+    def __init__(self, path: str) -> None:
+        self.__Path = path
+        self.__Lock = threading.Lock()
+
+    def Export(self, trace: Trace) -> None:
+        line = json.dumps(trace.asdict(), ensure_ascii=False) + "\n"
+        with self.__Lock:
+            with open(self.__Path, "a") as file:
+                file.write(line)
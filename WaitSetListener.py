@@ -0,0 +1,328 @@
+import threading
+import uuid
+from time import monotonic
+from ResponseData import ResponseData
+from ZimbraAPI import ZimbraAPI
+
+
+class WaitSetListener:
+    # Keeps one Zimbra WaitSet for all watched accounts and polls it from a
+    # background thread. Every notification bumps a local sequence number, so
+    # callers can ask for accounts changed since the sequence they last saw.
+    # The sequence is handed out as "<epoch>:<n>", the epoch is new for every
+    # listener, so one from another process or from before a restart is told
+    # apart and all its accounts are reported changed.
+    # Zimbra reports no changes made before it knew an account, so an account
+    # counts as changed once a WaitSet covers it and callers re-sync it
+    def __init__(
+        self,
+        zimbra: ZimbraAPI,
+        types: str = "m",
+        timeout: int = 20,
+        callback=None,
+        retryDelay: float = 5,
+        idleTimeout: float = 600,
+        maxWaiters: int = 16,
+    ) -> None:
+        # timeout     - seconds each AdminWaitSetRequest blocks on the server, the
+        #               read timeout of the request is extended by as much
+        # callback    - called with a list of changed account ids, from the
+        #               listener thread or from Watch
+        # idleTimeout - seconds after which an account not passed to Watch or
+        #               WaitForChanges is unwatched
+        # maxWaiters  - WaitForChanges calls waiting at once, each holds its
+        #               thread, more get TOO_MANY_WAITERS at once
+        self.__Zimbra = zimbra
+        self.__Types = types
+        self.__Timeout = timeout
+        self.__Callback = callback
+        self.__RetryDelay = retryDelay
+        self.__IdleTimeout = idleTimeout
+        self.__MaxWaiters = maxWaiters
+
+        self.__Condition = threading.Condition()
+        self.__StopEvent = threading.Event()
+        self.__InterruptLock = threading.Lock()
+        self.__Thread = None
+
+        self.__WaitSetID = None
+        self.__WaitSetSeq = "0"
+        self.__Blocked = False  # a blocking request of the listener is out
+        self.__Interrupts = 0
+        self.__Watched = set()
+        self.__PendingAdd = set()
+        self.__PendingRemove = set()
+        self.__LastUsed = dict()  # account id -> monotonic time it was asked for
+
+        self.__Epoch = uuid.uuid4().hex[:12]
+        self.__Seq = 0
+        self.__Waiters = 0
+        self.__Changes = dict()  # account id -> local seq of its last change
+        self.__LastError = None
+
+    def Start(self) -> None:
+        with self.__Condition:
+            if self.__Thread is not None and self.__Thread.is_alive():
+                return
+
+            self.__StopEvent.clear()
+            self.__Thread = threading.Thread(target=self.__Loop, daemon=True)
+            self.__Thread.start()
+
+    def Stop(self) -> None:
+        self.__StopEvent.set()
+        with self.__Condition:
+            self.__Condition.notify_all()
+
+    def Watch(self, accountIDs: list) -> None:
+        with self.__Condition:
+            self.__Touch(accountIDs)
+            newIDs = set(accountIDs) - self.__Watched
+            if not newIDs:
+                return
+
+            self.__Watched |= newIDs
+            self.__PendingAdd |= newIDs
+            self.__PendingRemove -= newIDs
+            interrupt = self.__Blocked
+            self.__Condition.notify_all()
+
+        # the listener is blocked in a request that does not cover them
+        if interrupt:
+            self.__Interrupt()
+
+    def Unwatch(self, accountIDs: list) -> None:
+        with self.__Condition:
+            oldIDs = set(accountIDs) & self.__Watched
+
+            self.__Watched -= oldIDs
+            self.__PendingRemove |= oldIDs - self.__PendingAdd
+            self.__PendingAdd -= oldIDs
+            for accountID in oldIDs:
+                self.__Changes.pop(accountID, None)
+                self.__LastUsed.pop(accountID, None)
+
+    def WaitForChanges(
+        self, accountIDs: list, seq: str = "0", timeout: float = 30
+    ) -> ResponseData:
+        # Returns at once if any of accountIDs changed after seq, otherwise waits
+        # up to timeout seconds. The returned seq is passed to the next call, the
+        # first call passes "0". A seq of another listener returns all accountIDs
+        # with reset set, their changes since that seq are unknown
+        result = ResponseData()
+        deadline = monotonic() + timeout
+
+        epoch, _, number = str(seq).partition(":")
+        reset = bool(number) and (epoch != self.__Epoch or not number.isdigit())
+        since = int(number) if number and not reset else 0
+
+        with self.__Condition:
+            self.__Touch(accountIDs)
+            if reset:
+                result.SetData(
+                    {"seq": self.__GetSeq(), "accounts": list(accountIDs), "reset": True}
+                )
+                return result
+
+            if self.__Waiters >= self.__MaxWaiters:
+                return ResponseData.GetTooManyWaitersError()
+
+            self.__Waiters += 1
+            try:
+                while True:
+                    changed = [a for a in accountIDs if self.__Changes.get(a, 0) > since]
+                    remaining = deadline - monotonic()
+
+                    if changed or remaining <= 0 or self.__StopEvent.is_set():
+                        break
+                    self.__Condition.wait(remaining)
+            finally:
+                self.__Waiters -= 1
+
+            self.__Touch(accountIDs)
+            result.SetData({"seq": self.__GetSeq(), "accounts": changed, "reset": False})
+
+        return result
+
+    def GetState(self) -> ResponseData:
+        result = ResponseData()
+
+        with self.__Condition:
+            result.SetData(
+                {
+                    "running": self.__Thread is not None and self.__Thread.is_alive(),
+                    "watched": len(self.__Watched),
+                    "waiters": self.__Waiters,
+                    "seq": self.__GetSeq(),
+                    "lastError": self.__LastError,
+                }
+            )
+
+        return result
+
+    def __GetSeq(self) -> str:
+        return f"{self.__Epoch}:{self.__Seq}"
+
+    def __Touch(self, accountIDs: list) -> None:
+        now = monotonic()
+        for accountID in accountIDs:
+            self.__LastUsed[accountID] = now
+
+    def __ExpireIdle(self) -> None:
+        with self.__Condition:
+            cutoff = monotonic() - self.__IdleTimeout
+            idle = [a for a in self.__Watched if self.__LastUsed.get(a, 0) < cutoff]
+        if idle:
+            self.Unwatch(idle)
+
+    def __TakePending(self) -> tuple:
+        with self.__Condition:
+            while not self.__Watched and not self.__StopEvent.is_set():
+                self.__Condition.wait()
+
+            pending = (list(self.__PendingAdd), list(self.__PendingRemove))
+            self.__PendingAdd.clear()
+            self.__PendingRemove.clear()
+            return pending
+
+    def __ReturnPending(self, add: list, remove: list) -> None:
+        with self.__Condition:
+            self.__PendingAdd |= set(add) & self.__Watched
+            self.__PendingRemove |= set(remove) - self.__Watched
+
+    def __Notify(self, accountIDs: list) -> None:
+        if not accountIDs:
+            return
+
+        with self.__Condition:
+            self.__Seq += 1
+            for accountID in accountIDs:
+                if accountID in self.__Watched:
+                    self.__Changes[accountID] = self.__Seq
+            self.__Condition.notify_all()
+
+        if self.__Callback:
+            self.__Callback(accountIDs)
+
+    def __Interrupt(self) -> None:
+        # The pending accounts are added by a request of this thread. Zimbra
+        # answers the listener's blocked request for the same WaitSet with
+        # canceled, the changes since its seq are reported by this one
+        with self.__InterruptLock:
+            with self.__Condition:
+                added = list(self.__PendingAdd & self.__Watched)
+                # taken by the listener meanwhile
+                if not self.__Blocked or not added:
+                    return
+
+                self.__PendingAdd -= set(added)
+                self.__Interrupts += 1
+                waitSetID, seq = self.__WaitSetID, self.__WaitSetSeq
+
+            result = self.__Request(waitSetID, seq, added, [], 0)
+            if result.IsError():
+                # the listener adds them with its next request
+                self.__ReturnPending(added, [])
+                self.__LastError = {
+                    "code": result.GetErrorCode(),
+                    "text": result.GetErrorText(),
+                }
+                return
+
+            with self.__Condition:
+                if self.__WaitSetID == waitSetID:
+                    self.__WaitSetSeq = result.GetData()["seq"]
+            self.__Notify(result.GetData()["accounts"] + added)
+
+    def __Request(
+        self, waitSetID: str, seq: str, add: list, remove: list, timeout: int
+    ) -> ResponseData:
+        try:
+            return self.__Zimbra.WaitSet(
+                waitSetID, seq, add, remove, timeout, self.__Types
+            )
+        except Exception as e:
+            result = ResponseData()
+            result.SetErrorCode(str(type(e)))
+            result.SetErrorText(str(e))
+            return result
+
+    def __Fail(self, result: ResponseData) -> None:
+        self.__LastError = {"code": result.GetErrorCode(), "text": result.GetErrorText()}
+        self.__StopEvent.wait(self.__RetryDelay)
+
+    def __Loop(self) -> None:
+        while not self.__StopEvent.is_set():
+            self.__ExpireIdle()
+            add, remove = self.__TakePending()
+            if self.__StopEvent.is_set():
+                break
+
+            with self.__Condition:
+                waitSetID = self.__WaitSetID
+            if waitSetID is None:
+                with self.__Condition:
+                    add, remove = list(self.__Watched), []
+
+                try:
+                    result = self.__Zimbra.CreateWaitSet(add, self.__Types)
+                except Exception as e:
+                    result = ResponseData()
+                    result.SetErrorCode(str(type(e)))
+                    result.SetErrorText(str(e))
+                if result.IsError():
+                    self.__ReturnPending(add, remove)
+                    self.__Fail(result)
+                    continue
+
+                waitSetID = result.GetData()["waitSet"]
+                with self.__Condition:
+                    self.__WaitSetID = waitSetID
+                    self.__WaitSetSeq = result.GetData()["seq"]
+                # changes made while no WaitSet covered them are found by a re-sync
+                self.__Notify(add)
+                add = []
+
+            # A request adding accounts returns at once, they are marked changed
+            # as soon as the server knows them. Accounts watched while a request
+            # blocks are added by __Interrupt
+            with self.__Condition:
+                add += list(self.__PendingAdd)
+                self.__PendingAdd.clear()
+                self.__Blocked = not add
+                interrupts = self.__Interrupts
+                seq = self.__WaitSetSeq
+
+            result = self.__Request(
+                waitSetID, seq, add, remove, 0 if add else self.__Timeout
+            )
+
+            with self.__Condition:
+                self.__Blocked = False
+                interrupted = self.__Interrupts != interrupts
+
+            if result.IsError():
+                self.__ReturnPending(add, remove)
+                # the server forgets idle or restarted WaitSets, make a new one
+                if result.GetErrorCode() == "admin.NO_SUCH_WAITSET":
+                    with self.__Condition:
+                        if self.__WaitSetID == waitSetID:
+                            self.__WaitSetID = None
+                self.__Fail(result)
+                continue
+
+            self.__LastError = None
+            with self.__Condition:
+                if not result.GetData()["canceled"]:
+                    self.__WaitSetSeq = result.GetData()["seq"]
+                elif not interrupted and self.__WaitSetID == waitSetID:
+                    self.__WaitSetID = None
+            self.__Notify(result.GetData()["accounts"] + add)
+
+        with self.__Condition:
+            waitSetID, self.__WaitSetID = self.__WaitSetID, None
+        if waitSetID is not None:
+            try:
+                self.__Zimbra.DestroyWaitSet(waitSetID)
+            except Exception:
+                pass
@@ -2,44 +2,580 @@
 import requests
 import json
 import re
+import hashlib
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from time import monotonic
+from typing import Generator, Iterable, Iterator
 from ResponseData import ResponseData
 from AuthData import AuthData
+from HTTPSession import HTTPSession
+from LRUCache import LRUCache
+from SoapBuilder import SoapBuilder
+from BatchCoalescer import BatchCoalescer
+from SingleFlight import SingleFlight
+from JSONStream import JSONStream
+from Tracing import Trace
+
+AUTH_FAULT_CODES = ("service.AUTH_EXPIRED", "service.AUTH_REQUIRED")
+
+SOAP_TRANSPORTS = ("xml", "json")
+
+SYNC_TOKEN_TTL = 24 * 60 * 60
+SEARCH_IDS_CHUNK = 500
+
+# arrays of large responses that are parsed item by item as the body arrives
+STREAM_CHUNK_SIZE = 64 * 1024
+ACCOUNTS_PATH = ("Body", "SearchDirectoryResponse", "account")
+DISTRIBUTION_LISTS_PATH = ("Body", "SearchDirectoryResponse", "dl")
+DISTRIBUTION_LIST_MEMBERS_PATH = ("Body", "GetDistributionListResponse", "dl", "item", "dlm")
+
+MEMBERS_PAGE_SIZE = 10000
+MEMBERS_CHUNK_SIZE = 1000
+MEMBERS_IN_FLIGHT = 4
+
+# faults that fail a member change as a whole rather than single addresses
+LIST_FAULT_CODES = (
+    "account.NO_SUCH_DISTRIBUTION_LIST",
+    "service.PERM_DENIED",
+    *AUTH_FAULT_CODES,
+)
+
+# faults caused by single addresses of a member change, a chunk failing with
+# one is split to find them. Other faults, e.g. service.FAILURE or a proxy's
+# 502/503, fail the chunk as it is
+MEMBER_FAULT_CODES = (
+    "service.INVALID_REQUEST",
+    "account.NO_SUCH_ACCOUNT",
+    "account.NO_SUCH_MEMBER",
+    "account.INVALID_ATTR_VALUE",
+)
+
+BULK_ACCOUNT_FIELDS = ("accountName", "password", "name", "surname")
+
+# seconds a read result is served from the response cache, 0 - not cached.
+# SyncDistributionListMembers keeps the members a list was last synced to
+DEFAULT_CACHE_TTL = {
+    "GetAccount": 60,
+    "GetAccounts": 300,
+    "GetAccountMembership": 60,
+    "GetDistributionList": 60,
+    "GetDistributionLists": 300,
+    "GetDistributionListMembership": 60,
+    "SyncDistributionListMembers": 300,
+}
+
+# (connect, read) seconds per request, "default" for the others. Single
+# objects answer fast, directory searches and whole lists can take a while.
+# An AdminWaitSetRequest also gets the time it blocks on the server
+DEFAULT_TIMEOUTS = {
+    "default": (5, 60),
+    "GetAccountRequest": (5, 10),
+    "GetAccountMembershipRequest": (5, 10),
+    "GetDistributionListMembershipRequest": (5, 10),
+    "SearchDirectoryRequest": (5, 120),
+    "GetDistributionListRequest": (5, 120),
+    "BatchRequest": (5, 60),
+    "AdminWaitSetRequest": (5, 30),
+}
+
+# requests without side effects, repeated by the session after a failure.
+# A BatchRequest is when all its sub-requests are
+IDEMPOTENT_REQUESTS = (
+    "GetAccountRequest",
+    "GetAccountMembershipRequest",
+    "SearchDirectoryRequest",
+    "GetDistributionListRequest",
+    "GetDistributionListMembershipRequest",
+    "SearchRequest",
+)
+
+ACCOUNT_ATTRS = [
+    "displayName",
+    "zimbraAccountStatus",
+    "zimbraLastLogonTimestamp",
+    "description",
+    "zimbraIsAdminAccount",
+    "zimbraMailStatus",
+]
+
+
+class SoapRequest:
+    def __init__(
+        self,
+        requestName: str,
+        body: dict,
+        targetAccount: str = "",
+        batchable: bool = False,
+        stream: bool = False,
+    ) -> None:
+        # body is the request element in Zimbra's JSON form (see SoapBuilder),
+        # targetAccount runs mail requests against that account's mailbox,
+        # batchable requests may be sent inside a BatchRequest with others,
+        # stream asks for a response whose body is read as it is parsed
+        self.RequestName = requestName
+        self.Body = body
+        self.TargetAccount = targetAccount
+        self.Batchable = batchable
+        self.Stream = stream
+
+
+class SoapSubResponse:
+    # One answer of a BatchResponse, shaped like the response to the
+    # sub-request sent on its own
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+
+
+class CacheCall:
+    # A call on the response cache, yielded by an operation like a request and
+    # answered with its return value. SQLiteResponseCache reads and writes a
+    # file, the driver decides where that runs
+    def __init__(self, method: str, *args) -> None:
+        self.Method = method
+        self.Args = args
+
+
+# Operations yield SoapRequest objects and receive the upstream
+# response (anything with status_code and text) back, returning ResponseData.
+# A yielded list of requests is sent concurrently and answered with a list,
+# a yielded CacheCall is answered with its result
+Operation = Generator[object, object, ResponseData]
+
+
+class ZimbraOperations:
+    # Request building and response parsing shared by ZimbraAPI and
+    # AsyncZimbraAPI. Subclasses only decide how a yielded request is sent
+    def __init__(
+        self,
+        host: str,
+        nameCacheSize: int = 10000,
+        nameCacheTTL: float = 300,
+        transport: str = "xml",
+        cache=None,
+        cacheTTL: dict = None,
+        timeouts: dict = None,
+        metrics=None,
+    ) -> None:
+        # transport - "xml" or "json", the format request bodies are sent in
+        # cache     - ResponseCache or SQLiteResponseCache for read results,
+        #             cacheTTL overrides DEFAULT_CACHE_TTL per operation
+        # timeouts  - overrides DEFAULT_TIMEOUTS per request name
+        # metrics   - Metrics for upstream requests and name resolutions
+        if transport not in SOAP_TRANSPORTS:
+            raise ValueError(f"transport must be one of {SOAP_TRANSPORTS}")
 
-
-class ZimbraAPI:
-    def __init__(self, host, adminUsername, adminPassword) -> None:
         self.__Host = host
-        self.__AdminHost = self.__Host + ":7071"
-        self.__AuthData = AuthData(self.__AdminHost, adminUsername, adminPassword)
+        self.__Transport = transport
+        # the admin port unless host names one
+        self.__AdminHost = self.__Host if urlsplit(host).port else self.__Host + ":7071"
+        # name -> id, filled by lookups and creations, cleared on rename/delete
+        self.__AccountIDCache = LRUCache(nameCacheSize, nameCacheTTL)
+        self.__DistrListIDCache = LRUCache(nameCacheSize, nameCacheTTL)
+        self.__NameCaches = {"account": self.__AccountIDCache, "dl": self.__DistrListIDCache}
+        self.__NameCacheTTL = nameCacheTTL
+        # (kind, name) -> response cache generation its id was last checked at
+        self.__NameChecks = LRUCache(2 * nameCacheSize, nameCacheTTL)
+        # account name -> last SyncRequest token handed out for its inbox
+        self.__SyncTokens = LRUCache(nameCacheSize, SYNC_TOKEN_TTL)
+        self.__Cache = cache
+        self.__CacheTTL = {**DEFAULT_CACHE_TTL, **(cacheTTL if cacheTTL else {})}
+        self.__Timeouts = {**DEFAULT_TIMEOUTS, **(timeouts if timeouts else {})}
+        self.__Metrics = metrics
+
+    def _GetAdminHost(self) -> str:
+        return self.__AdminHost
+
+    def _GetRequestURL(self, request: SoapRequest) -> str:
+        return self.__AdminHost + "/service/admin/soap/" + request.RequestName
+
+    def _GetTimeout(self, request: SoapRequest) -> tuple:
+        connectTimeout, readTimeout = self.__Timeouts.get(
+            request.RequestName, self.__Timeouts["default"]
+        )
+        if request.RequestName == "AdminWaitSetRequest":
+            readTimeout += float(request.Body.get("timeout", 0))
+        return (connectTimeout, readTimeout)
+
+    def _IsIdempotent(self, request: SoapRequest) -> bool:
+        if request.RequestName == "BatchRequest":
+            return all(
+                name in IDEMPOTENT_REQUESTS
+                for name in request.Body
+                if name.endswith("Request")
+            )
+        return request.RequestName in IDEMPOTENT_REQUESTS
 
-    def __UpdateAuthData(self) -> ResponseData:
-        return self.__AuthData.UpdateAuthData()
+    def _GetRequestBody(self, request: SoapRequest, CSRFToken: str) -> bytes:
+        if self.__Transport == "json":
+            return SoapBuilder.JsonEnvelope(
+                request.RequestName, request.Body, CSRFToken, request.TargetAccount
+            )
+        return self._WrapInSoapTemplate(
+            [SoapBuilder.Element(request.RequestName, request.Body)],
+            CSRFToken,
+            request.TargetAccount,
+        )
 
-    def __GetCSRFToken(self) -> str:
-        return self.__AuthData.GetCSRFToken()
+    def _GetMetrics(self):
+        return self.__Metrics
 
-    def __GetCookies(self) -> dict:
-        return self.__AuthData.GetCookies()
+    def _RecordSoapRequest(
+        self, request: SoapRequest, body: bytes, response, seconds: float
+    ) -> None:
+        # response is None if the request raised. The body of a successful
+        # streamed response is counted by _ReadChunks as it is read
+        if self.__Metrics is None:
+            return
 
-    def __WrapInSoapTemplate(self, data: list) -> str:
-        dataStr = "".join(data)
-        return (
-            '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">'
-                "<soap:Header>"
-                    '<context xmlns="urn:zimbra">'
-                        '<format type="js"/>'
-                        f"<csrfToken>{self.__GetCSRFToken()}</csrfToken>"
-                    "</context>"
-                "</soap:Header>"
-                "<soap:Body>"
-                    f"{dataStr}"
-                "</soap:Body>"
-            "</soap:Envelope>"
+        labels = (("request", request.RequestName),)
+        status = str(response.status_code) if response is not None else "error"
+        self.__Metrics.Observe("zimbra_api_soap_request_duration_seconds", labels, seconds)
+        self.__Metrics.Count("zimbra_api_soap_requests_total", labels + (("status", status),))
+        self.__Metrics.Count("zimbra_api_upstream_bytes_sent_total", labels, len(body))
+
+        if response is None or (request.Stream and response.status_code == 200):
+            return
+
+        self.__Metrics.Count(
+            "zimbra_api_upstream_bytes_received_total", labels, self._ResponseSize(response)
+        )
+        if response.status_code != 200:
+            try:
+                code = json.loads(response.text)["Body"]["Fault"]["Detail"]["Error"]["Code"]
+            except (ValueError, KeyError, TypeError):
+                code = "unknown"
+            self.__Metrics.Count("zimbra_api_soap_faults_total", labels + (("code", code),))
+
+    @staticmethod
+    def _FaultOf(response) -> tuple:
+        # (code, text) of a failed response, also of a body that is no SOAP
+        # fault, e.g. the HTML page of a proxy answering 502/503
+        try:
+            fault = json.loads(response.text)["Body"]["Fault"]
+            return fault["Detail"]["Error"]["Code"], fault["Reason"]["Text"]
+        except (ValueError, KeyError, TypeError):
+            return f"http.{response.status_code}", f"HTTP {response.status_code}"
+
+    @classmethod
+    def _AsSoapFault(cls, response):
+        # A failed response whose body is no SOAP fault, e.g. a proxy's page for
+        # 502/503 returned once the session's retries are spent, reaches the
+        # operations as a fault with the code http.<status>, they parse it like
+        # any other
+        if response.status_code == 200:
+            return response
+
+        code, text = cls._FaultOf(response)
+        if not code.startswith("http."):
+            return response
+
+        fault = {"Reason": {"Text": text}, "Detail": {"Error": {"Code": code}}}
+        return SoapSubResponse(response.status_code, json.dumps({"Body": {"Fault": fault}}))
+
+    @staticmethod
+    def _ResponseSize(response) -> int:
+        length = response.headers.get("Content-Length")
+        if length is not None:
+            return int(length)
+        if getattr(response, "content", None) is not None:
+            return len(response.content)
+        return len(response.text.encode())
+
+    def _RecordNameResolution(self, kind: str, started: float, lookup: bool) -> None:
+        if self.__Metrics is None:
+            return
+
+        labels = (("kind", kind),)
+        self.__Metrics.Count(
+            "zimbra_api_name_resolutions_total",
+            labels + (("source", "lookup" if lookup else "cache"),),
+        )
+        if lookup:
+            self.__Metrics.Observe(
+                "zimbra_api_name_lookup_duration_seconds", labels, monotonic() - started
+            )
+
+    @staticmethod
+    def _UpstreamSpan(request):
+        # upstream wait of a yielded request, batching and retries included
+        if isinstance(request, CacheCall):
+            return Trace.Span("cache")
+        if isinstance(request, list):
+            names = sorted({item.RequestName for item in request})
+            return Trace.Span(f"upstream {'+'.join(names)} x{len(request)}")
+        return Trace.Span(f"upstream {request.RequestName}")
+
+    def _GetNameCacheStats(self) -> dict:
+        return {
+            "accounts": self.__AccountIDCache.GetStats(),
+            "distributionLists": self.__DistrListIDCache.GetStats(),
+        }
+
+    def _GetCacheStats(self) -> dict:
+        return self.__Cache.GetStats() if self.__Cache else None
+
+    def _CallCache(self, call: CacheCall):
+        return getattr(self.__Cache, call.Method)(*call.Args)
+
+    ################################################## RESPONSE CACHE ##################################################
+
+    def _ReadKey(self, operationName: str, args: tuple) -> str:
+        return operationName + json.dumps(args, ensure_ascii=False)
+
+    def _Cached(self, operationName: str, args: tuple, operation: Operation) -> Operation:
+        # Read-through: a cached result is returned without running operation,
+        # otherwise a successful result is stored with the tags it depends on
+        ttl = self.__CacheTTL.get(operationName, 0)
+        if self.__Cache is None or not ttl:
+            return (yield from operation)
+
+        key = self._ReadKey(operationName, args)
+        cached = yield CacheCall("Get", key)
+        if cached is not None:
+            operation.close()
+            result = ResponseData()
+            result.SetData(json.loads(cached))
+            return result
+
+        generation = yield CacheCall("GetGeneration")
+        result = yield from operation
+        if not result.IsError():
+            yield CacheCall(
+                "Set",
+                key,
+                json.dumps(result.GetData(), ensure_ascii=False),
+                ttl,
+                (yield from self._CacheTags(operationName, args, result.GetData())),
+                generation,
+            )
+        return result
+
+    def _CacheTags(self, operationName: str, args: tuple, data) -> Operation:
+        # account:<id|name> and dl:<id|name> - the object itself,
+        # membership:<id|name> - what it is a member of, accounts/dls - the
+        # directory listings, dl-members - every list's members
+        # (see _MemberOfTags), memberships-by-id - memberships by an id of
+        # unknown name
+        if operationName == "GetAccount":
+            return [f"account:{data['id']}", f"account:{data['name'].lower()}"]
+
+        if operationName == "GetAccounts":
+            return ["accounts"]
+
+        if operationName == "GetDistributionList":
+            return [f"dl:{data['id']}", f"dl:{data['name'].lower()}", "dl-members"]
+
+        if operationName == "GetDistributionLists":
+            return ["dls"]
+
+        # GetAccountMembership and GetDistributionListMembership, args are (id, name).
+        # The results name the lists, which change on their rename or removal
+        objectID, objectName = args
+        kind = "dl" if operationName == "GetDistributionListMembership" else "account"
+        tags = [f"dl:{item['id']}" for item in data.values()]
+        if objectName:
+            tags.append(f"membership:{objectName.lower()}")
+            objectID = self.__NameCaches[kind].Get(objectName.lower())
+            if objectID:
+                tags.append(f"membership:{objectID}")
+            return tags
+
+        # member changes name addresses, an entry by id is tagged with the name
+        # __RememberID stored for the id
+        tags.append(f"membership:{objectID}")
+        objectName = yield CacheCall("Get", self._ReadKey(f"{kind}-name", (objectID,)))
+        tags.append(f"membership:{objectName}" if objectName else "memberships-by-id")
+        return tags
+
+    @staticmethod
+    def _ObjectTags(kind: str, objectID: str, objectName: str = "") -> list:
+        # everything cached about an account or a list, for renames and removals
+        tags = [f"{kind}:{objectID}", f"membership:{objectID}", f"{kind}-name:{objectID}"]
+        if objectName:
+            tags += [f"{kind}:{objectName.lower()}", f"membership:{objectName.lower()}"]
+        return tags
+
+    def _MemberOfTags(self, kind: str, objectID: str) -> Operation:
+        # dl:<id> of the lists the account or list is in, their members change
+        # with its rename or removal. Read before the change, from the cache if
+        # it is there; dl-members drops every list if the read fails
+        if self.__Cache is None:
+            return []
+
+        if kind == "account":
+            operationName = "GetAccountMembership"
+            operation = self._GetAccountMembership(objectID)
+        else:
+            operationName = "GetDistributionListMembership"
+            operation = self._GetDistributionListMembership(objectID)
+
+        membership = yield from self._Cached(operationName, (objectID, ""), operation)
+        if membership.IsError():
+            return ["dl-members"]
+        return [f"dl:{item['id']}" for item in membership.GetData().values()]
+
+    def _InvalidateCache(self, tags: list) -> Operation:
+        if self.__Cache is not None:
+            yield CacheCall("Invalidate", tags)
+
+    ################################################## NAME CACHE ##################################################
+
+    def __CachedID(self, kind: str, name: str) -> Operation:
+        # The ids are cached per process, a rename or removal in another one
+        # drops the shared entry of the name from the response cache and bumps
+        # its generation. An id last checked at an older generation is compared
+        # with the shared entry again, the other names stay cached
+        cache = self.__NameCaches[kind]
+        objectID = cache.Get(name.lower())
+        if self.__Cache is None:
+            return objectID
+
+        generation = yield CacheCall("GetGeneration")
+        if objectID is not None and self.__NameChecks.Get((kind, name.lower())) == generation:
+            return objectID
+
+        objectID = yield CacheCall("Get", self._ReadKey(f"{kind}-id", (name.lower(),)))
+        if objectID is None:
+            cache.Delete(name.lower())
+        else:
+            cache.Set(name.lower(), objectID)
+            self.__NameChecks.Set((kind, name.lower()), generation)
+        return objectID
+
+    def __RememberID(self, kind: str, name: str, objectID: str, generation) -> Operation:
+        # generation is the response cache's before the lookup of objectID. The
+        # shared entry is only dropped by a rename or removal (see _ObjectTags)
+        self.__NameCaches[kind].Set(name.lower(), objectID)
+        if self.__Cache is not None:
+            self.__NameChecks.Set((kind, name.lower()), generation)
+            yield CacheCall(
+                "Set",
+                self._ReadKey(f"{kind}-id", (name.lower(),)),
+                objectID,
+                self.__NameCacheTTL,
+                [f"{kind}-name:{objectID}"],
+                generation,
+            )
+            # and the name of the id, for the tags of memberships by id
+            yield CacheCall(
+                "Set",
+                self._ReadKey(f"{kind}-name", (objectID,)),
+                name.lower(),
+                self.__NameCacheTTL,
+                [f"{kind}-name:{objectID}"],
+                generation,
+            )
+
+    def _ByName(self, kind: str, name: str, operation) -> Operation:
+        # Runs operation(id) on the id of the account or list ("account" or
+        # "dl") called name. A cached id may be of an object removed or renamed
+        # since: on the object's NO_SUCH fault the entry is dropped and operation
+        # runs once more if the name now resolves to another id
+        if kind == "account":
+            resolve, faultCode = self._GetAccountID, "account.NO_SUCH_ACCOUNT"
+        else:
+            resolve = self._GetDistributionListID
+            faultCode = "account.NO_SUCH_DISTRIBUTION_LIST"
+
+        resolved = yield from resolve(name)
+        if resolved.IsError():
+            return resolved
+
+        objectID = resolved.GetData()["id"]
+        result = yield from operation(objectID)
+        if result.GetErrorCode() != faultCode:
+            return result
+
+        # the shared entry goes too, so other processes check the name again
+        self.__NameCaches[kind].Delete(name.lower())
+        yield from self._InvalidateCache([f"{kind}-name:{objectID}"])
+        resolved = yield from resolve(name, True)
+        if resolved.IsError():
+            return resolved
+        if resolved.GetData()["id"] == objectID:
+            return result
+        return (yield from operation(resolved.GetData()["id"]))
+
+    @staticmethod
+    def _WrapInSoapTemplate(
+        data: list, CSRFToken: str, targetAccount: str = ""
+    ) -> bytes:
+        return SoapBuilder.Envelope(data, CSRFToken, targetAccount)
+
+    @staticmethod
+    def _BuildBatchRequest(requestList: list) -> SoapRequest:
+        # Sub-requests are tagged with their index as requestId
+        body = {"_jsns": "urn:zimbra", "onerror": "continue"}
+        for index, request in enumerate(requestList):
+            body.setdefault(request.RequestName, []).append(
+                {"requestId": str(index), **request.Body}
+            )
+
+        return SoapRequest("BatchRequest", body)
+
+    @staticmethod
+    def _SplitBatchResponse(response, count: int) -> list:
+        jsonResponseData = json.loads(response.text)["Body"]
+
+        # the whole batch was rejected, e.g. on auth, every sub-request gets the fault
+        if "BatchResponse" not in jsonResponseData:
+            return [response] * count
+
+        responses = [None] * count
+        for name, items in jsonResponseData["BatchResponse"].items():
+            if not isinstance(items, list):
+                continue
+
+            for item in items:
+                responses[int(item["requestId"])] = SoapSubResponse(
+                    500 if name == "Fault" else 200, json.dumps({"Body": {name: item}})
+                )
+
+        return responses
+
+    def _ReadChunks(self, response, requestName: str) -> Iterator:
+        size = 0
+        try:
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                yield chunk
+        finally:
+            response.close()
+            if self.__Metrics is not None:
+                self.__Metrics.Count(
+                    "zimbra_api_upstream_bytes_received_total",
+                    (("request", requestName),),
+                    size,
+                )
+
+    def _StreamResponse(self, response, paths, requestName: str) -> JSONStream:
+        # Body of a successful streamed response, the items under paths come
+        # from Items() one by one, the remaining fields from GetRest()
+        return JSONStream(self._ReadChunks(response, requestName), paths)
+
+    @staticmethod
+    def _IsAuthFault(request: SoapRequest, response) -> bool:
+        # a successful streamed body is left unread for the operation to parse
+        if request.Stream and response.status_code == 200:
+            return False
+        if "service.AUTH_" not in response.text:
+            return False
+
+        jsonResponseData = json.loads(response.text)["Body"]
+        if "BatchResponse" in jsonResponseData:
+            faults = jsonResponseData["BatchResponse"].get("Fault", [])
+        else:
+            faults = [jsonResponseData["Fault"]] if "Fault" in jsonResponseData else []
+
+        return any(
+            fault["Detail"]["Error"]["Code"] in AUTH_FAULT_CODES for fault in faults
         )
 
     ################################################## ACCOUNT MANAGEMENT ##################################################
 
-    def CreateAccount(
+    def _CreateAccount(
         self,
         accountName: str,
         password: str,
@@ -47,14 +583,7 @@ class ZimbraAPI:
         surname: str,
         patronymic: str = "",
         extraParams: dict = None,
-    ) -> ResponseData:
-        name = name.encode("ascii", errors="xmlcharrefreplace").decode()
-        surname = surname.encode("ascii", errors="xmlcharrefreplace").decode()
-        patronymic = patronymic.encode("ascii", errors="xmlcharrefreplace").decode()
-
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
+    ) -> Operation:
 
         result = ResponseData()
 
@@ -67,27 +596,15 @@ class ZimbraAPI:
         }
         params = {**baseParams, **(extraParams if extraParams else {})}
 
-        paramStr = ""
-        for key, value in params.items():
-            paramStr = paramStr + f'<a n="{key}">{value}</a>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<CreateAccountRequest xmlns="urn:zimbraAdmin">'
-                        f"<name>{accountName}</name>"
-                        f"<password>{password}</password>"
-                        f"{paramStr}"
-                    "</CreateAccountRequest>"
-                )
-            ]
-        )
-
-        CreateAccountResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/CreateAccountRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+        CreateAccountResponse = yield SoapRequest(
+            "CreateAccountRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "name": {"_content": accountName},
+                "password": {"_content": password},
+                "a": params,
+            },
         )
 
         jsonResponseData = json.loads(CreateAccountResponse.text)["Body"]
@@ -100,6 +617,9 @@ class ZimbraAPI:
             data["name"] = accountData["name"]
             data["id"] = accountData["id"]
 
+            yield from self.__RememberID("account", data["name"], data["id"], generation)
+            yield from self._InvalidateCache(["accounts"])
+
             result.SetData(data)
         else:
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
@@ -107,38 +627,33 @@ class ZimbraAPI:
 
         return result
 
-    def DeleteAccount(self, accountID: str = "", accountName: str = "") -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _DeleteAccount(self, accountID: str = "", accountName: str = "") -> Operation:
         result = ResponseData()
 
         if accountID == "":
-            accInfo = self.GetAccount(accountName=accountName)
-            if accInfo.IsError():
-                return accInfo
-
-            accountID = accInfo.GetData()["id"]
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<DeleteAccountRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{accountID}</id>"
-                    "</DeleteAccountRequest>"
+            return (
+                yield from self._ByName(
+                    "account",
+                    accountName,
+                    lambda accountID: self._DeleteAccount(accountID, accountName),
                 )
-            ]
-        )
+            )
 
-        DeleteAccountResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/DeleteAccountRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        memberOfTags = yield from self._MemberOfTags("account", accountID)
+
+        DeleteAccountResponse = yield SoapRequest(
+            "DeleteAccountRequest",
+            {"_jsns": "urn:zimbraAdmin", "id": {"_content": accountID}},
         )
 
         if DeleteAccountResponse.status_code == 200:
+            self.__AccountIDCache.DeleteValue(accountID)
+            yield from self._InvalidateCache(
+                self._ObjectTags("account", accountID, accountName)
+                + ["accounts"]
+                + memberOfTags
+            )
+
             result.SetData({"success": True})
         else:
             jsonResponseData = json.loads(DeleteAccountResponse.text)["Body"]
@@ -148,40 +663,23 @@ class ZimbraAPI:
 
         return result
 
-    def ModifyAccount(self, params: dict, accountID: str = "", accountName: str = ""):
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _ModifyAccount(
+        self, params: dict, accountID: str = "", accountName: str = ""
+    ) -> Operation:
         result = ResponseData()
 
         if accountID == "":
-            accInfo = self.GetAccount(accountName=accountName)
-            if accInfo.IsError():
-                return accInfo
-
-            accountID = accInfo.GetData()["id"]
-
-        paramStr = ""
-        for key, value in params.items():
-            paramStr = paramStr + f'<a n="{key}">{value}</a>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<ModifyAccountRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{accountID}</id>"
-                        f"{paramStr}"
-                    "</ModifyAccountRequest>"
+            return (
+                yield from self._ByName(
+                    "account",
+                    accountName,
+                    lambda accountID: self._ModifyAccount(params, accountID, accountName),
                 )
-            ]
-        )
+            )
 
-        ModifyAccountResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/ModifyAccountRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        ModifyAccountResponse = yield SoapRequest(
+            "ModifyAccountRequest",
+            {"_jsns": "urn:zimbraAdmin", "id": {"_content": accountID}, "a": params},
         )
 
         jsonResponseData = json.loads(ModifyAccountResponse.text)["Body"]
@@ -203,6 +701,10 @@ class ZimbraAPI:
                 newParams[paramName] = paramValue
 
             data["params"] = newParams
+            yield from self._InvalidateCache(
+                [f"account:{data['id']}", f"account:{data['name'].lower()}", "accounts"]
+            )
+
             result.SetData(data)
         else:
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
@@ -210,36 +712,29 @@ class ZimbraAPI:
 
         return result
 
-    def RenameAccount(self, newName: str, accountID: str = "", accountName: str = ""):
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _RenameAccount(
+        self, newName: str, accountID: str = "", accountName: str = ""
+    ) -> Operation:
         result = ResponseData()
 
         if accountID == "":
-            accInfo = self.GetAccount(accountName=accountName)
-            if accInfo.IsError():
-                return accInfo
-
-            accountID = accInfo.GetData()["id"]
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<RenameAccountRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{accountID}</id>"
-                        f"<newName>{newName}</newName>"
-                    "</RenameAccountRequest>"
+            return (
+                yield from self._ByName(
+                    "account",
+                    accountName,
+                    lambda accountID: self._RenameAccount(newName, accountID, accountName),
                 )
-            ]
-        )
+            )
+
+        memberOfTags = yield from self._MemberOfTags("account", accountID)
 
-        RenameAccountResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/RenameAccountRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        RenameAccountResponse = yield SoapRequest(
+            "RenameAccountRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "id": {"_content": accountID},
+                "newName": {"_content": newName},
+            },
         )
 
         jsonResponseData = json.loads(RenameAccountResponse.text)["Body"]
@@ -252,6 +747,14 @@ class ZimbraAPI:
             data["name"] = accountData["name"]
             data["id"] = accountData["id"]
 
+            self.__AccountIDCache.DeleteValue(data["id"])
+            self.__AccountIDCache.Set(data["name"].lower(), data["id"])
+            yield from self._InvalidateCache(
+                self._ObjectTags("account", data["id"], accountName)
+                + [f"account:{data['name'].lower()}", "accounts"]
+                + memberOfTags
+            )
+
             result.SetData(data)
         else:
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
@@ -259,36 +762,27 @@ class ZimbraAPI:
 
         return result
 
-    def SetPassword(self, newPassword: str, accountID: str = "", accountName: str = ""):
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _SetPassword(
+        self, newPassword: str, accountID: str = "", accountName: str = ""
+    ) -> Operation:
         result = ResponseData()
 
         if accountID == "":
-            accInfo = self.GetAccount(accountName=accountName)
-            if accInfo.IsError():
-                return accInfo
-
-            accountID = accInfo.GetData()["id"]
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<SetPasswordRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{accountID}</id>"
-                        f"<newPassword>{newPassword}</newPassword>"
-                    "</SetPasswordRequest>"
+            return (
+                yield from self._ByName(
+                    "account",
+                    accountName,
+                    lambda accountID: self._SetPassword(newPassword, accountID, accountName),
                 )
-            ]
-        )
+            )
 
-        SetPasswordResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/SetPasswordRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        SetPasswordResponse = yield SoapRequest(
+            "SetPasswordRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "id": {"_content": accountID},
+                "newPassword": {"_content": newPassword},
+            },
         )
 
         if SetPasswordResponse.status_code == 200:
@@ -301,48 +795,33 @@ class ZimbraAPI:
 
         return result
 
-    def GetAccount(self, accountID: str = "", accountName: str = "") -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _GetAccount(self, accountID: str = "", accountName: str = "") -> Operation:
         result = ResponseData()
 
-        requestStr = ""
         if accountName == "":
-            requestStr = f'<account by="id">{accountID}</account>'
+            account = {"by": "id", "_content": accountID}
         else:
-            requestStr = f'<account by="name">{accountName}</account>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<BatchRequest xmlns="urn:zimbra" onerror="continue">'
-                        '<GetAccountRequest xmlns="urn:zimbraAdmin" applyCos="0">'
-                            f"{requestStr}"
-                        "</GetAccountRequest>"
-                    "</BatchRequest>"
-                )
-            ]
-        )
+            account = {"by": "name", "_content": accountName}
 
-        AccountInfoResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/BatchRequest",
-            RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+        AccountInfoResponse = yield SoapRequest(
+            "GetAccountRequest",
+            {"_jsns": "urn:zimbraAdmin", "applyCos": "0", "account": account},
+            batchable=True,
         )
 
-        jsonResponseData = json.loads(AccountInfoResponse.text)["Body"]["BatchResponse"]
+        jsonResponseData = json.loads(AccountInfoResponse.text)["Body"]
 
-        if "GetAccountResponse" in jsonResponseData:
+        if AccountInfoResponse.status_code == 200:
             data = dict()
 
-            accountData = jsonResponseData["GetAccountResponse"][0]["account"][0]
+            accountData = jsonResponseData["GetAccountResponse"]["account"][0]
 
             data["name"] = accountData["name"]
             data["id"] = accountData["id"]
 
+            yield from self.__RememberID("account", data["name"], data["id"], generation)
+
             params = dict()
             for param in accountData["a"]:
                 paramName = param["n"]
@@ -353,92 +832,113 @@ class ZimbraAPI:
             data["params"] = params
             result.SetData(data)
         else:
-            result.SetErrorText(jsonResponseData["Fault"][0]["Reason"]["Text"])
-            result.SetErrorCode(jsonResponseData["Fault"][0]["Detail"]["Error"]["Code"])
+            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
         return result
 
-    def GetAccounts(self):
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _GetAccountID(self, accountName: str, fresh: bool = False) -> Operation:
+        # fresh looks the name up even if its id is cached
         result = ResponseData()
 
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<SearchDirectoryRequest xmlns="urn:zimbraAdmin" offset="0" limit="0" sortBy="name" sortAscending="1" applyCos="false" applyConfig="false" attrs="displayName,zimbraAccountStatus,zimbraLastLogonTimestamp,description,zimbraIsAdminAccount,zimbraMailStatus" types="accounts">'
-                        "<query>(&amp;(!(zimbraIsSystemAccount=TRUE)))</query>"
-                    "</SearchDirectoryRequest>"
+        started = monotonic()
+        accountID = None if fresh else (yield from self.__CachedID("account", accountName))
+        lookup = accountID is None
+
+        if lookup:
+            generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+            with Trace.Span("resolve account"):
+                AccountIDResponse = yield SoapRequest(
+                    "GetAccountRequest",
+                    {
+                        "_jsns": "urn:zimbraAdmin",
+                        "applyCos": "0",
+                        "attrs": "zimbraId",
+                        "account": {"by": "name", "_content": accountName},
+                    },
                 )
-            ]
-        )
 
-        GetAccountsResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/SearchDirectoryRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
-        )
+            jsonResponseData = json.loads(AccountIDResponse.text)["Body"]
+
+            if AccountIDResponse.status_code != 200:
+                result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+                result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+                return result
+
+            accountID = jsonResponseData["GetAccountResponse"]["account"][0]["id"]
+            yield from self.__RememberID("account", accountName, accountID, generation)
+
+        self._RecordNameResolution("account", started, lookup)
+        result.SetData({"name": accountName, "id": accountID})
+        return result
+
+    def _GetAccounts(
+        self, offset: int = 0, limit: int = 0, attrs: list = None
+    ) -> Operation:
+        # limit=0 returns the whole directory in one response
+        result = ResponseData()
 
-        jsonResponseData = json.loads(GetAccountsResponse.text)["Body"]
+        attrsStr = ",".join(attrs if attrs else ACCOUNT_ATTRS)
+
+        GetAccountsResponse = yield SoapRequest(
+            "SearchDirectoryRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "offset": offset,
+                "limit": limit,
+                "sortBy": "name",
+                "sortAscending": "1",
+                "applyCos": "false",
+                "applyConfig": "false",
+                "attrs": attrsStr,
+                "types": "accounts",
+                "query": {"_content": "(&(!(zimbraIsSystemAccount=TRUE)))"},
+            },
+            stream=True,
+        )
 
         if GetAccountsResponse.status_code == 200:
             data = dict()
 
-            accountsData = jsonResponseData["SearchDirectoryResponse"]
-            if "account" in accountsData:
-                for account in accountsData["account"]:
-                    item = dict()
+            stream = self._StreamResponse(
+                GetAccountsResponse, [ACCOUNTS_PATH], "SearchDirectoryRequest"
+            )
+            for _, account in stream.Items():
+                item = dict()
 
-                    item["id"] = account["id"]
+                item["id"] = account["id"]
 
-                    for attr in account["a"]:
-                        attrName = attr["n"]
-                        attrValue = attr["_content"]
+                for attr in account["a"]:
+                    attrName = attr["n"]
+                    attrValue = attr["_content"]
 
-                        item[attrName] = attrValue
+                    item[attrName] = attrValue
 
-                    data[account["name"]] = item
+                data[account["name"]] = item
 
             result.SetData(data)
         else:
+            jsonResponseData = json.loads(GetAccountsResponse.text)["Body"]
+
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
             result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
         return result
 
-    def GetAccountMembership(
+    def _GetAccountMembership(
         self, accountID: str = "", accountName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    ) -> Operation:
         result = ResponseData()
 
-        requestStr = ""
         if accountID == "":
-            requestStr = f'<account by="name">{accountName}</account>'
+            account = {"by": "name", "_content": accountName}
         else:
-            requestStr = f'<account by="id">{accountID}</account>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<GetAccountMembershipRequest xmlns="urn:zimbraAdmin">'
-                        f"{requestStr}"
-                    "</GetAccountMembershipRequest>"
-                )
-            ]
-        )
+            account = {"by": "id", "_content": accountID}
 
-        GetAccountMembershipResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/GetAccountMembershipRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        GetAccountMembershipResponse = yield SoapRequest(
+            "GetAccountMembershipRequest",
+            {"_jsns": "urn:zimbraAdmin", "account": account},
+            batchable=True,
         )
 
         jsonResponseData = json.loads(GetAccountMembershipResponse.text)["Body"]
@@ -462,99 +962,252 @@ class ZimbraAPI:
 
         return result
 
-    ################################################## MAILBOX MANAGEMENT ##################################################
+    def _BulkCreateAccount(self, item: dict, defaultParams: dict = None) -> Operation:
+        # One account of a bulk import. Item params are applied over defaultParams,
+        # an item without the required fields fails without a request
+        if None in [item.get(key) for key in BULK_ACCOUNT_FIELDS]:
+            return ResponseData.GetMissingDataError()
 
-    def GetMessages(self, accountName: str, unreadOnly: bool = True) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
+        return (
+            yield from self._CreateAccount(
+                item["accountName"],
+                item["password"],
+                item["name"],
+                item["surname"],
+                item.get("patronymic", ""),
+                {**(defaultParams if defaultParams else {}), **item.get("params", {})},
+            )
+        )
+
+    @staticmethod
+    def _NewBulkSummary() -> dict:
+        return {"total": 0, "created": 0, "failed": 0, "errors": {}}
 
+    @staticmethod
+    def _BulkItem(
+        index: int, item: dict, result: ResponseData, summary: dict
+    ) -> ResponseData:
+        line = ResponseData()
+
+        summary["total"] += 1
+        if result.IsError():
+            summary["failed"] += 1
+            errors = summary["errors"]
+            errors[result.GetErrorCode()] = errors.get(result.GetErrorCode(), 0) + 1
+        else:
+            summary["created"] += 1
+
+        line.SetData({"index": index, "accountName": item.get("accountName"), **result.asdict()})
+        return line
+
+    @staticmethod
+    def _BulkSummary(summary: dict, seconds: float) -> ResponseData:
         result = ResponseData()
 
-        requestPath = (
-            self.__AdminHost
-            + f"/home/{accountName}/inbox?fmt=json"
-            + ("&query=is:unread" if unreadOnly else "")
+        total = summary["total"]
+        result.SetData(
+            {
+                "summary": {
+                    **summary,
+                    "errorRate": round(summary["failed"] / total, 4) if total else 0,
+                    "seconds": round(seconds, 3),
+                    "perSecond": round(total / seconds, 2) if seconds else 0,
+                }
+            }
         )
+        return result
 
-        GetMessagesResponse = requests.get(
-            requestPath, cookies=self.__GetCookies(), verify=False
-        )
+    ################################################## MAILBOX MANAGEMENT ##################################################
 
-        if GetMessagesResponse.status_code == 200:
-            jsonResponseData = json.loads(GetMessagesResponse.text)
-            data = dict()
+    @staticmethod
+    def _ParseMessage(message: dict) -> dict:
+        parsedMessage = dict()
 
-            messages = list()
+        parsedMessage["id"] = message["id"]
+        parsedMessage["date"] = message["d"] // 1000
 
-            if "m" in jsonResponseData:
-                data["count"] = len(jsonResponseData["m"])
+        sender = message["e"][-1]
+        if "p" in sender:
+            parsedMessage["sender_name"] = sender["p"]
+        elif "d" in sender:
+            parsedMessage["sender_name"] = sender["d"]
 
-                for message in jsonResponseData["m"][:10]:
-                    parsedMessage = dict()
+        if "a" in sender:
+            parsedMessage["sender_email"] = sender["a"]
 
-                    parsedMessage["date"] = message["d"] // 1000
+        if 'su' in message:
+            parsedMessage["subject"] = message["su"]
 
-                    sender = message["e"][-1]
-                    if "p" in sender:
-                        parsedMessage["sender_name"] = sender["p"]
-                    elif "d" in sender:
-                        parsedMessage["sender_name"] = sender["d"]
+        if 'fr' in message:
+            parsedMessage["message"] = message["fr"]
 
-                    if "a" in sender:
-                        parsedMessage["sender_email"] = sender["a"]
+        return parsedMessage
 
-                    if 'su' in message:
-                        parsedMessage["subject"] = message["su"]
+    def _GetMessages(
+        self,
+        accountName: str,
+        unreadOnly: bool = True,
+        limit: int = 10,
+        offset: int = 0,
+        countOnly: bool = False,
+        incremental: bool = False,
+        token: str = None,
+    ) -> Operation:
+        if incremental:
+            return (yield from self._GetMessageChanges(accountName, token))
+
+        # The count comes from the inbox counters and the page from a search
+        # limited to limit/offset, both in one BatchRequest
+        result = ResponseData()
 
-                    if 'fr' in message:
-                        parsedMessage["message"] = message["fr"]
+        body = {
+            "_jsns": "urn:zimbra",
+            "onerror": "stop",
+            "GetFolderRequest": {"_jsns": "urn:zimbraMail", "folder": {"l": "2"}},
+        }
+        if not countOnly:
+            query = "in:inbox is:unread" if unreadOnly else "in:inbox"
+            body["SearchRequest"] = {
+                "_jsns": "urn:zimbraMail",
+                "types": "message",
+                "sortBy": "dateDesc",
+                "limit": limit,
+                "offset": offset,
+                "query": {"_content": query},
+            }
+
+        GetMessagesResponse = yield SoapRequest(
+            "BatchRequest", body, targetAccount=accountName
+        )
 
-                    messages.append(parsedMessage)
-            else:
-                data["count"] = 0
+        jsonResponseData = json.loads(GetMessagesResponse.text)["Body"]
+        if "BatchResponse" in jsonResponseData:
+            jsonResponseData = jsonResponseData["BatchResponse"]
 
-            data["messages"] = messages
+        if "GetFolderResponse" in jsonResponseData and "Fault" not in jsonResponseData:
+            data = dict()
+
+            inboxData = jsonResponseData["GetFolderResponse"][0]["folder"][0]
+            data["count"] = inboxData.get("u" if unreadOnly else "n", 0)
+
+            if not countOnly:
+                messages = list()
+
+                searchData = jsonResponseData["SearchResponse"][0]
+                for message in searchData.get("m", []):
+                    messages.append(self._ParseMessage(message))
+
+                data["messages"] = messages
 
             result.SetData(data)
         else:
-            result.SetErrorText(GetMessagesResponse.text)
+            fault = jsonResponseData["Fault"]
+            fault = fault[0] if isinstance(fault, list) else fault
+
+            result.SetErrorText(fault["Reason"]["Text"])
 
-            if GetMessagesResponse.status_code == 404:
+            if fault["Detail"]["Error"]["Code"] == "account.NO_SUCH_ACCOUNT":
                 result.SetErrorCode("NO_SUCH_MAILBOX")
             else:
-                result.SetErrorCode("UNEXPECTED_ERROR")
+                result.SetErrorCode(fault["Detail"]["Error"]["Code"])
 
         return result
 
-    def DelegateAuth(self, accountID: str = "", accountName: str = "") -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
+    def _GetMessageChanges(self, accountName: str, token: str = None) -> Operation:
+        # Returns inbox messages created or changed and ids deleted since token
+        # (or since the previous call for this account). Without a token only
+        # the starting token is returned, with "reset" set
+        result = ResponseData()
+
+        if token is None:
+            token = self.__SyncTokens.Get(accountName.lower())
+
+        body = {"_jsns": "urn:zimbraMail", "l": "2", "typed": "1"}
+        if token:
+            body["token"] = token
+
+        SyncResponse = yield SoapRequest(
+            "SyncRequest", body, targetAccount=accountName
+        )
+
+        jsonResponseData = json.loads(SyncResponse.text)["Body"]
+
+        if SyncResponse.status_code != 200:
+            errorCode = jsonResponseData["Fault"]["Detail"]["Error"]["Code"]
+
+            # tombstones for this token were purged, start over
+            if errorCode == "mail.MUST_RESYNC" and token:
+                self.__SyncTokens.Delete(accountName.lower())
+                return (yield from self._GetMessageChanges(accountName, ""))
+
+            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+            if errorCode == "account.NO_SUCH_ACCOUNT":
+                result.SetErrorCode("NO_SUCH_MAILBOX")
+            else:
+                result.SetErrorCode(errorCode)
+            return result
+
+        syncData = jsonResponseData["SyncResponse"]
+
+        data = dict()
+        data["token"] = str(syncData["token"])
+        data["reset"] = not token
+        data["changed"] = list()
+        data["deleted"] = list()
+
+        self.__SyncTokens.Set(accountName.lower(), data["token"])
+
+        if not token:
+            result.SetData(data)
+            return result
+
+        for deleted in syncData.get("deleted", []):
+            data["deleted"].extend(deleted["ids"].split(","))
+
+        changedIDs = [message["id"] for message in syncData.get("m", [])]
+
+        if changedIDs:
+            searches = [
+                {
+                    "_jsns": "urn:zimbraMail",
+                    "types": "message",
+                    "limit": len(chunk),
+                    "query": {"_content": f"in:inbox item:{{{','.join(chunk)}}}"},
+                }
+                for chunk in (
+                    changedIDs[i : i + SEARCH_IDS_CHUNK]
+                    for i in range(0, len(changedIDs), SEARCH_IDS_CHUNK)
+                )
+            ]
+
+            ChangedMessagesResponse = yield SoapRequest(
+                "BatchRequest",
+                {"_jsns": "urn:zimbra", "onerror": "continue", "SearchRequest": searches},
+                targetAccount=accountName,
+            )
+
+            jsonResponseData = json.loads(ChangedMessagesResponse.text)["Body"]
+            batchData = jsonResponseData.get("BatchResponse", {})
+
+            for searchData in batchData.get("SearchResponse", []):
+                for message in searchData.get("m", []):
+                    parsedMessage = self._ParseMessage(message)
+                    parsedMessage["unread"] = "u" in message.get("f", "")
+                    data["changed"].append(parsedMessage)
+
+        result.SetData(data)
+        return result
 
+    def _DelegateAuth(self, accountID: str = "", accountName: str = "") -> Operation:
         result = ResponseData()
 
-        requestStr = ""
         if accountName == "":
-            requestStr = f'<account by="id">{accountID}</account>'
+            account = {"by": "id", "_content": accountID}
         else:
-            requestStr = f'<account by="name">{accountName}</account>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<DelegateAuthRequest xmlns="urn:zimbraAdmin">'
-                    f"{requestStr}"
-                    "</DelegateAuthRequest>"
-                )
-            ]
-        )
+            account = {"by": "name", "_content": accountName}
 
-        DelegateAuthResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/DelegateAuthRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        DelegateAuthResponse = yield SoapRequest(
+            "DelegateAuthRequest", {"_jsns": "urn:zimbraAdmin", "account": account}
         )
 
         jsonResponseData = json.loads(DelegateAuthResponse.text)["Body"]
@@ -577,7 +1230,7 @@ class ZimbraAPI:
 
         return result
 
-    def SendMessage(
+    def _SendMessage(
         self,
         senderAccountName: str,
         receiverAccountName: str,
@@ -585,35 +1238,23 @@ class ZimbraAPI:
         content: str = "",
         senderPseudonym: str = "",
         receiverPseudonym: str = "",
-    ) -> ResponseData:
-        subject = subject.encode("ascii", errors="xmlcharrefreplace").decode()
-        content = content.encode("ascii", errors="xmlcharrefreplace").decode()
-        senderPseudonym = senderPseudonym.encode("ascii", errors="xmlcharrefreplace").decode()
-        receiverPseudonym = receiverPseudonym.encode("ascii", errors="xmlcharrefreplace").decode()
+    ) -> Operation:
         
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
         result = ResponseData()
 
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                '<SendMsgRequest xmlns="urn:zimbraMail">'
-                    f'<m su="{subject}">'
-                        f'<mp ct="text/plain" content="{content}">'"</mp>"
-                        f'<e a="{senderAccountName}" t="f" p="{senderPseudonym}" />'
-                        f'<e a="{receiverAccountName}" t="t" p="{receiverPseudonym}" />'
-                    "</m>"
-                "</SendMsgRequest>"
-            ]
-        )
-
-        SendMessageResponce = requests.post(
-            self.__AdminHost + "/service/admin/soap/SendMsgRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        SendMessageResponce = yield SoapRequest(
+            "SendMsgRequest",
+            {
+                "_jsns": "urn:zimbraMail",
+                "m": {
+                    "su": subject,
+                    "mp": {"ct": "text/plain", "content": content},
+                    "e": [
+                        {"a": senderAccountName, "t": "f", "p": senderPseudonym},
+                        {"a": receiverAccountName, "t": "t", "p": receiverPseudonym},
+                    ],
+                },
+            },
         )
 
         jsonResponseData = json.loads(SendMessageResponce.text)["Body"]
@@ -626,97 +1267,172 @@ class ZimbraAPI:
 
         return result
 
-    ################################################## DISTRIBUTION LIST MANAGEMENT ##################################################
-
-    def CreateDistributionList(
-        self, name: str, displayName: str = "", extraParams: dict = None
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
+    @staticmethod
+    def _WaitSetAccounts(accountIDs: list) -> dict:
+        return {"a": [{"id": accountID} for accountID in accountIDs]}
 
+    def _CreateWaitSet(self, accountIDs: list, types: str = "m") -> Operation:
         result = ResponseData()
 
-        displayName = displayName.encode("ascii", errors="xmlcharrefreplace").decode()
+        CreateWaitSetResponse = yield SoapRequest(
+            "AdminCreateWaitSetRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "defTypes": types,
+                "allAccounts": "0",
+                "add": self._WaitSetAccounts(accountIDs),
+            },
+        )
 
-        baseParams = {
-            "displayName": displayName,
-        }
-        params = {**baseParams, **(extraParams if extraParams else {})}
+        jsonResponseData = json.loads(CreateWaitSetResponse.text)["Body"]
 
-        paramStr = ""
-        for key, value in params.items():
-            paramStr = paramStr + f'<a n="{key}">{value}</a>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<CreateDistributionListRequest xmlns="urn:zimbraAdmin">'
-                        f"<name>{name}</name>"
-                        f"{paramStr}"
-                    "</CreateDistributionListRequest>"
-                )
-            ]
-        )
+        if CreateWaitSetResponse.status_code == 200:
+            waitSetData = jsonResponseData["AdminCreateWaitSetResponse"]
 
-        CreateDistributionListResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/CreateDistributionListRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
-        )
+            result.SetData(
+                {
+                    "waitSet": waitSetData["waitSet"],
+                    "seq": str(waitSetData.get("seq", 0)),
+                }
+            )
+        else:
+            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
-        jsonResponseData = json.loads(CreateDistributionListResponse.text)["Body"]
+        return result
 
-        if CreateDistributionListResponse.status_code == 200:
-            data = dict()
+    def _WaitSet(
+        self,
+        waitSetID: str,
+        seq: str,
+        addAccountIDs: list = None,
+        removeAccountIDs: list = None,
+        timeout: int = 0,
+        types: str = "m",
+    ) -> Operation:
+        # Blocks on the server for up to timeout seconds (0 - return at once) and
+        # returns the ids of accounts with changes since seq
+        result = ResponseData()
 
-            dlData = jsonResponseData["CreateDistributionListResponse"]["dl"][0]
+        body = {
+            "_jsns": "urn:zimbraAdmin",
+            "waitSet": waitSetID,
+            "seq": seq,
+            "defTypes": types,
+            "block": "1" if timeout else "0",
+            "timeout": timeout,
+        }
+        if addAccountIDs:
+            body["add"] = self._WaitSetAccounts(addAccountIDs)
+        if removeAccountIDs:
+            body["remove"] = self._WaitSetAccounts(removeAccountIDs)
 
-            data["name"] = dlData["name"]
-            data["id"] = dlData["id"]
+        WaitSetResponse = yield SoapRequest("AdminWaitSetRequest", body)
 
-            result.SetData(data)
+        jsonResponseData = json.loads(WaitSetResponse.text)["Body"]
+
+        if WaitSetResponse.status_code == 200:
+            waitSetData = jsonResponseData["AdminWaitSetResponse"]
+
+            result.SetData(
+                {
+                    "seq": str(waitSetData.get("seq", seq)),
+                    "canceled": waitSetData.get("canceled", False),
+                    "accounts": [account["id"] for account in waitSetData.get("a", [])],
+                }
+            )
         else:
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
             result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
         return result
 
-    def DeleteDistributionList(
-        self, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _DestroyWaitSet(self, waitSetID: str) -> Operation:
         result = ResponseData()
 
-        if distrListID == "":
-            distrListData = self.GetDistributionList(distrListName=distrListName)
-            if distrListData.IsError():
-                return distrListData
-
-            distrListID = distrListData.GetData()["id"]
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<DeleteDistributionListRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{distrListID}</id>"
-                    "</DeleteDistributionListRequest>"
-                )
-            ]
+        DestroyWaitSetResponse = yield SoapRequest(
+            "AdminDestroyWaitSetRequest",
+            {"_jsns": "urn:zimbraAdmin", "waitSet": waitSetID},
         )
 
-        DeleteDistrListResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/DeleteDistributionListRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
-        )
+        if DestroyWaitSetResponse.status_code == 200:
+            result.SetData({"success": True})
+        else:
+            jsonResponseData = json.loads(DestroyWaitSetResponse.text)["Body"]
+
+            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+
+        return result
+
+    ################################################## DISTRIBUTION LIST MANAGEMENT ##################################################
+
+    def _CreateDistributionList(
+        self, name: str, displayName: str = "", extraParams: dict = None
+    ) -> Operation:
+        result = ResponseData()
+
+
+        baseParams = {
+            "displayName": displayName,
+        }
+        params = {**baseParams, **(extraParams if extraParams else {})}
+
+        generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+        CreateDistributionListResponse = yield SoapRequest(
+            "CreateDistributionListRequest",
+            {"_jsns": "urn:zimbraAdmin", "name": {"_content": name}, "a": params},
+        )
+
+        jsonResponseData = json.loads(CreateDistributionListResponse.text)["Body"]
+
+        if CreateDistributionListResponse.status_code == 200:
+            data = dict()
+
+            dlData = jsonResponseData["CreateDistributionListResponse"]["dl"][0]
+
+            data["name"] = dlData["name"]
+            data["id"] = dlData["id"]
+
+            yield from self.__RememberID("dl", data["name"], data["id"], generation)
+            yield from self._InvalidateCache(["dls"])
+
+            result.SetData(data)
+        else:
+            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+
+        return result
+
+    def _DeleteDistributionList(
+        self, distrListID: str = "", distrListName: str = ""
+    ) -> Operation:
+        result = ResponseData()
+
+        if distrListID == "":
+            return (
+                yield from self._ByName(
+                    "dl",
+                    distrListName,
+                    lambda distrListID: self._DeleteDistributionList(distrListID, distrListName),
+                )
+            )
+
+        memberOfTags = yield from self._MemberOfTags("dl", distrListID)
+
+        DeleteDistrListResponse = yield SoapRequest(
+            "DeleteDistributionListRequest",
+            {"_jsns": "urn:zimbraAdmin", "id": {"_content": distrListID}},
+        )
 
         if DeleteDistrListResponse.status_code == 200:
+            self.__DistrListIDCache.DeleteValue(distrListID)
+            yield from self._InvalidateCache(
+                self._ObjectTags("dl", distrListID, distrListName)
+                + ["dls"]
+                + memberOfTags
+            )
+
             result.SetData({"success": True})
         else:
             jsonResponseData = json.loads(DeleteDistrListResponse.text)["Body"]
@@ -726,47 +1442,34 @@ class ZimbraAPI:
 
         return result
 
-    def ModifyDistributionList(
+    def _ModifyDistributionList(
         self, params: dict, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    ) -> Operation:
         result = ResponseData()
 
         if distrListID == "":
-            distrListData = self.GetDistributionList(distrListName=distrListName)
-            if distrListData.IsError():
-                return distrListData
-
-            distrListID = distrListData.GetData()["id"]
-
-        paramStr = ""
-        for key, value in params.items():
-            paramStr = paramStr + f'<a n="{key}">{value}</a>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<ModifyDistributionListRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{distrListID}</id>"
-                        f"{paramStr}"
-                    "</ModifyDistributionListRequest>"
+            return (
+                yield from self._ByName(
+                    "dl",
+                    distrListName,
+                    lambda distrListID: self._ModifyDistributionList(
+                        params, distrListID, distrListName
+                    ),
                 )
-            ]
-        )
+            )
 
-        ModifyDistributionListResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/ModifyDistributionListRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        ModifyDistributionListResponse = yield SoapRequest(
+            "ModifyDistributionListRequest",
+            {"_jsns": "urn:zimbraAdmin", "id": {"_content": distrListID}, "a": params},
         )
 
         jsonResponseData = json.loads(ModifyDistributionListResponse.text)["Body"]
 
         if ModifyDistributionListResponse.status_code == 200:
+            yield from self._InvalidateCache(
+                [f"dl:{distrListID}", f"dl:{distrListName.lower()}", "dls"]
+            )
+
             data = dict()
 
             dlData = jsonResponseData["ModifyDistributionListResponse"]["dl"][0]
@@ -790,55 +1493,57 @@ class ZimbraAPI:
 
         return result
 
-    def GetDistributionList(
-        self, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _GetDistributionList(
+        self,
+        distrListID: str = "",
+        distrListName: str = "",
+        offset: int = 0,
+        limit: int = 0,
+        countOnly: bool = False,
+    ) -> Operation:
+        # limit=0 returns all members. countOnly asks for a single member and
+        # only reports the total, so large lists are not transferred
         result = ResponseData()
 
-        requestStr = ""
+        if countOnly:
+            offset, limit = 0, 1
+
         if distrListID == "":
-            requestStr = f'<dl by="name">{distrListName}</dl>'
+            dl = {"by": "name", "_content": distrListName}
         else:
-            requestStr = f'<dl by="id">{distrListID}</dl>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<GetDistributionListRequest xmlns="urn:zimbraAdmin" limit="0" offset="0">'
-                        f"{requestStr}"
-                    "</GetDistributionListRequest>"
-                )
-            ]
-        )
+            dl = {"by": "id", "_content": distrListID}
 
-        GetDistrListResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/GetDistributionListRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+        GetDistrListResponse = yield SoapRequest(
+            "GetDistributionListRequest",
+            {"_jsns": "urn:zimbraAdmin", "limit": limit, "offset": offset, "dl": dl},
+            stream=True,
         )
 
-        jsonResponseData = json.loads(GetDistrListResponse.text)["Body"]
-
         if GetDistrListResponse.status_code == 200:
             data = dict()
 
-            dlData = jsonResponseData["GetDistributionListResponse"]["dl"][0]
+            members = list()
+
+            stream = self._StreamResponse(
+                GetDistrListResponse,
+                [DISTRIBUTION_LIST_MEMBERS_PATH],
+                "GetDistributionListRequest",
+            )
+            for _, member in stream.Items():
+                members.append(member["_content"])
+
+            dlResponseData = stream.GetRest()["Body"]["GetDistributionListResponse"]
+            dlData = dlResponseData["dl"][0]
 
             data["name"] = dlData["name"]
             data["id"] = dlData["id"]
 
-            members = list()
-
-            if "dlm" in dlData:
-                for member in dlData["dlm"]:
-                    members.append(member["_content"])
+            yield from self.__RememberID("dl", data["name"], data["id"], generation)
 
-            data["members"] = members
+            if not countOnly:
+                data["members"] = members
+            data["membersCount"] = dlResponseData.get("total", len(members))
 
             params = dict()
             for param in dlData["a"]:
@@ -850,97 +1555,118 @@ class ZimbraAPI:
 
             result.SetData(data)
         else:
+            jsonResponseData = json.loads(GetDistrListResponse.text)["Body"]
+
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
             result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
         return result
 
-    def GetDistributionLists(self) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _GetDistributionListID(
+        self, distrListName: str, fresh: bool = False
+    ) -> Operation:
+        # fresh looks the name up even if its id is cached
         result = ResponseData()
 
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<SearchDirectoryRequest xmlns="urn:zimbraAdmin" offset="0" sortBy="name" sortAscending="1" applyCos="false" applyConfig="false" attrs="displayName,uid,zimbraMailStatus" types="distributionlists,dynamicgroups">'
-                        "<query>(&amp;(!(zimbraIsSystemAccount=TRUE)))</query>"
-                    "</SearchDirectoryRequest>"
+        started = monotonic()
+        distrListID = None if fresh else (yield from self.__CachedID("dl", distrListName))
+        lookup = distrListID is None
+
+        if lookup:
+            generation = (yield CacheCall("GetGeneration")) if self.__Cache else None
+            with Trace.Span("resolve dl"):
+                DistrListIDResponse = yield SoapRequest(
+                    "GetDistributionListRequest",
+                    {
+                        "_jsns": "urn:zimbraAdmin",
+                        "limit": "1",
+                        "offset": "0",
+                        "attrs": "zimbraId",
+                        "dl": {"by": "name", "_content": distrListName},
+                    },
                 )
-            ]
-        )
 
-        GetDistributionListsResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/SearchDirectoryRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
-        )
+            jsonResponseData = json.loads(DistrListIDResponse.text)["Body"]
 
-        jsonResponseData = json.loads(GetDistributionListsResponse.text)["Body"]
+            if DistrListIDResponse.status_code != 200:
+                result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
+                result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+                return result
+
+            distrListID = jsonResponseData["GetDistributionListResponse"]["dl"][0]["id"]
+            yield from self.__RememberID("dl", distrListName, distrListID, generation)
+
+        self._RecordNameResolution("dl", started, lookup)
+        result.SetData({"name": distrListName, "id": distrListID})
+        return result
+
+    def _GetDistributionLists(self, offset: int = 0, limit: int = 0) -> Operation:
+        # limit=0 returns all lists in one response
+        result = ResponseData()
+
+        GetDistributionListsResponse = yield SoapRequest(
+            "SearchDirectoryRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "offset": offset,
+                "limit": limit,
+                "sortBy": "name",
+                "sortAscending": "1",
+                "applyCos": "false",
+                "applyConfig": "false",
+                "attrs": "displayName,uid,zimbraMailStatus",
+                "types": "distributionlists,dynamicgroups",
+                "query": {"_content": "(&(!(zimbraIsSystemAccount=TRUE)))"},
+            },
+            stream=True,
+        )
 
         if GetDistributionListsResponse.status_code == 200:
             data = dict()
 
-            dlData = jsonResponseData["SearchDirectoryResponse"]
-            if "dl" in dlData:
-                for distrList in dlData["dl"]:
-                    item = dict()
+            stream = self._StreamResponse(
+                GetDistributionListsResponse,
+                [DISTRIBUTION_LISTS_PATH],
+                "SearchDirectoryRequest",
+            )
+            for _, distrList in stream.Items():
+                item = dict()
 
-                    item["id"] = distrList["id"]
-                    item["dynamic"] = distrList["dynamic"]
+                item["id"] = distrList["id"]
+                item["dynamic"] = distrList["dynamic"]
 
-                    for attr in distrList["a"]:
-                        attrName = attr["n"]
-                        attrValue = attr["_content"]
+                for attr in distrList["a"]:
+                    attrName = attr["n"]
+                    attrValue = attr["_content"]
 
-                        item[attrName] = attrValue
+                    item[attrName] = attrValue
 
-                    if "owners" in distrList:
-                        item["owner"] = distrList["owners"][0]["owner"][0]
+                if "owners" in distrList:
+                    item["owner"] = distrList["owners"][0]["owner"][0]
 
-                    data[distrList["name"]] = item
+                data[distrList["name"]] = item
 
             result.SetData(data)
         else:
+            jsonResponseData = json.loads(GetDistributionListsResponse.text)["Body"]
+
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
             result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
 
         return result
 
-    def GetDistributionListMembership(
+    def _GetDistributionListMembership(
         self, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    ) -> Operation:
         result = ResponseData()
 
-        requestStr = ""
         if distrListID == "":
-            requestStr = f'<dl by="name">{distrListName}</dl>'
+            dl = {"by": "name", "_content": distrListName}
         else:
-            requestStr = f'<dl by="id">{distrListID}</dl>'
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<GetDistributionListMembershipRequest xmlns="urn:zimbraAdmin">'
-                        f"{requestStr}"
-                    "</GetDistributionListMembershipRequest>"
-                )
-            ]
-        )
+            dl = {"by": "id", "_content": distrListID}
 
-        GetDistributionListMembershipResponse = requests.post(
-            self.__AdminHost
-            + "/service/admin/soap/GetDistributionListMembershipReques",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        GetDistributionListMembershipResponse = yield SoapRequest(
+            "GetDistributionListMembershipRequest", {"_jsns": "urn:zimbraAdmin", "dl": dl}
         )
 
         jsonResponseData = json.loads(GetDistributionListMembershipResponse.text)[
@@ -969,135 +1695,248 @@ class ZimbraAPI:
 
         return result
 
-    def AddDistributionListMembers(
-        self, userEmails: list, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    def _ChangeDistributionListMembers(
+        self,
+        requestName: str,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> Operation:
+        # Sends userEmails in chunks, up to inFlight chunks at once. Zimbra rejects
+        # a whole chunk because of one bad address, so a chunk failing with one of
+        # MEMBER_FAULT_CODES is split in halves and retried until the failing
+        # addresses are found
         result = ResponseData()
 
         if distrListID == "":
-            distrListData = self.GetDistributionList(distrListName=distrListName)
-            if distrListData.IsError():
-                return distrListData
-
-            distrListID = distrListData.GetData()["id"]
-
-        usersRequestStr = ""
-        for user in userEmails:
-            usersRequestStr += f"<dlm>{user}</dlm>"
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<AddDistributionListMemberRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{distrListID}</id>"
-                        f"{usersRequestStr}"
-                    "</AddDistributionListMemberRequest>"
+            return (
+                yield from self._ByName(
+                    "dl",
+                    distrListName,
+                    lambda distrListID: self._ChangeDistributionListMembers(
+                        requestName, userEmails, distrListID, distrListName, chunkSize, inFlight
+                    ),
+                )
+            )
+
+        chunks = [
+            userEmails[i : i + chunkSize] for i in range(0, len(userEmails), chunkSize)
+        ]
+        succeeded, failed = list(), list()
+        requestCount = 0
+
+        while chunks:
+            batch, chunks = chunks[:inFlight], chunks[inFlight:]
+
+            responses = yield [
+                SoapRequest(
+                    requestName,
+                    {"_jsns": "urn:zimbraAdmin", "id": {"_content": distrListID}, "dlm": chunk},
                 )
+                for chunk in batch
             ]
+            requestCount += len(batch)
+
+            for chunk, response in zip(batch, responses):
+                if response.status_code == 200:
+                    succeeded.extend(chunk)
+                    continue
+
+                errorCode, errorText = self._FaultOf(response)
+
+                # faults about the list itself fail every chunk the same way
+                if errorCode in LIST_FAULT_CODES:
+                    result.SetErrorText(errorText)
+                    result.SetErrorCode(errorCode)
+                    return result
+
+                if errorCode in MEMBER_FAULT_CODES and len(chunk) > 1:
+                    half = len(chunk) // 2
+                    chunks += [chunk[:half], chunk[half:]]
+                else:
+                    failed.extend(
+                        {"member": member, "code": errorCode, "text": errorText}
+                        for member in chunk
+                    )
+
+        if succeeded:
+            yield from self._InvalidateCache(
+                [f"dl:{distrListID}", "memberships-by-id"]
+                + [f"membership:{member.lower()}" for member in succeeded]
+            )
+
+        result.SetData(
+            {
+                "success": not failed,
+                "succeeded": succeeded,
+                "failed": failed,
+                "requests": requestCount,
+            }
         )
+        return result
 
-        AddDistributionListMembersResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/AddDistributionListMemberRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+    def _AddDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> Operation:
+        return (
+            yield from self._ChangeDistributionListMembers(
+                "AddDistributionListMemberRequest",
+                userEmails,
+                distrListID,
+                distrListName,
+                chunkSize,
+                inFlight,
+            )
         )
 
-        if AddDistributionListMembersResponse.status_code == 200:
-            result.SetData({"success": True})
-        else:
-            jsonResponseData = json.loads(AddDistributionListMembersResponse.text)["Body"]
+    def _RemoveDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> Operation:
+        return (
+            yield from self._ChangeDistributionListMembers(
+                "RemoveDistributionListMemberRequest",
+                userEmails,
+                distrListID,
+                distrListName,
+                chunkSize,
+                inFlight,
+            )
+        )
 
-            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
-            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
+    def _SyncDistributionListMembers(
+        self,
+        desired: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        pageSize: int = MEMBERS_PAGE_SIZE,
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> Operation:
+        # Makes the list contain exactly the desired members. Addresses are compared
+        # case-insensitively, an unchanged list costs one read per pageSize members.
+        # A list synced to the same members before, with no member change through
+        # this API since (those drop its dl:<id> entries), costs a single read of
+        # its member count. A change made outside this API that keeps the count
+        # is seen after the TTL, as with the other cached reads
+        result = ResponseData()
+        startTime = monotonic()
+        requestCount = 0
+
+        wanted = {member.lower(): member for member in desired}
+        current = None  # lowercase address -> address as stored
+
+        syncKey = digest = None
+        ttl = self.__CacheTTL.get("SyncDistributionListMembers", 0)
+        if self.__Cache is not None and ttl:
+            digest = hashlib.sha1("\n".join(sorted(wanted)).encode()).hexdigest()
+            page = yield from self._GetDistributionList(
+                distrListID, distrListName, countOnly=True
+            )
+            requestCount += 1
+            if page.IsError():
+                return page
+
+            distrListID = page.GetData()["id"]
+            syncKey = self._ReadKey("SyncDistributionListMembers", (distrListID,))
+            synced = yield CacheCall("Get", syncKey)
+            if synced == digest and page.GetData()["membersCount"] == len(wanted):
+                current = dict(wanted)
+
+        if current is None:
+            current = dict()
+            offset = 0
+            while True:
+                page = yield from self._GetDistributionList(
+                    distrListID, distrListName, offset, pageSize
+                )
+                requestCount += 1
+                if page.IsError():
+                    return page
 
-        return result
+                distrListID = page.GetData()["id"]
+                members = page.GetData()["members"]
+                for member in members:
+                    current[member.lower()] = member
 
-    def RemoveDistributionListMembers(
-        self, userEmails: list, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
+                offset += pageSize
+                if len(members) < pageSize or offset >= page.GetData()["membersCount"]:
+                    break
 
-        result = ResponseData()
+        toAdd = [wanted[key] for key in wanted.keys() - current.keys()]
+        toRemove = [current[key] for key in current.keys() - wanted.keys()]
 
-        if distrListID == "":
-            distrListData = self.GetDistributionList(distrListName=distrListName)
-            if distrListData.IsError():
-                return distrListData
-
-            distrListID = distrListData.GetData()["id"]
-
-        usersRequestStr = ""
-        for user in userEmails:
-            usersRequestStr += f"<dlm>{user}</dlm>"
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<RemoveDistributionListMemberRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{distrListID}</id>"
-                        f"{usersRequestStr}"
-                    "</RemoveDistributionListMemberRequest>"
-                )
-            ]
+        added = yield from self._AddDistributionListMembers(
+            toAdd, distrListID, chunkSize=chunkSize, inFlight=inFlight
         )
+        if added.IsError():
+            return added
 
-        RemoveDistributionListMembersResponse = requests.post(
-            self.__AdminHost
-            + "/service/admin/soap/RemoveDistributionListMemberRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        removed = yield from self._RemoveDistributionListMembers(
+            toRemove, distrListID, chunkSize=chunkSize, inFlight=inFlight
         )
+        if removed.IsError():
+            return removed
+
+        added, removed = added.GetData(), removed.GetData()
+        # read after the own changes, whose invalidations would drop the entry
+        if syncKey is not None and not added["failed"] and not removed["failed"]:
+            generation = yield CacheCall("GetGeneration")
+            yield CacheCall(
+                "Set", syncKey, digest, ttl, [f"dl:{distrListID}"], generation
+            )
 
-        if RemoveDistributionListMembersResponse.status_code == 200:
-            result.SetData({"success": True})
-        else:
-            jsonResponseData = json.loads(RemoveDistributionListMembersResponse.text)["Body"]
-
-            result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
-            result.SetErrorCode(jsonResponseData["Fault"]["Detail"]["Error"]["Code"])
-
+        result.SetData(
+            {
+                "id": distrListID,
+                "name": page.GetData()["name"],
+                "added": len(added["succeeded"]),
+                "removed": len(removed["succeeded"]),
+                "unchanged": len(current) - len(toRemove),
+                "failed": [{**item, "action": "add"} for item in added["failed"]]
+                + [{**item, "action": "remove"} for item in removed["failed"]],
+                "requests": requestCount + added["requests"] + removed["requests"],
+                "seconds": round(monotonic() - startTime, 3),
+            }
+        )
         return result
 
-    def RenameDistributionList(
+    def _RenameDistributionList(
         self, newName: str, distrListID: str = "", distrListName: str = ""
-    ) -> ResponseData:
-        UpdateAuthDataStatus = self.__UpdateAuthData()
-        if UpdateAuthDataStatus.IsError():
-            return UpdateAuthDataStatus
-
+    ) -> Operation:
         result = ResponseData()
 
         if distrListID == "":
-            distrListData = self.GetDistributionList(distrListName=distrListName)
-            if distrListData.IsError():
-                return distrListData
-
-            distrListID = distrListData.GetData()["id"]
-
-        RequestData = self.__WrapInSoapTemplate(
-            [
-                (
-                    '<RenameDistributionListRequest xmlns="urn:zimbraAdmin">'
-                        f"<id>{distrListID}</id>"
-                        f"<newName>{newName}</newName>"
-                    f"</RenameDistributionListRequest>"
+            return (
+                yield from self._ByName(
+                    "dl",
+                    distrListName,
+                    lambda distrListID: self._RenameDistributionList(
+                        newName, distrListID, distrListName
+                    ),
                 )
-            ]
-        )
+            )
+
+        memberOfTags = yield from self._MemberOfTags("dl", distrListID)
 
-        RenameDistributionListResponse = requests.post(
-            self.__AdminHost + "/service/admin/soap/RenameDistributionListRequest",
-            data=RequestData,
-            cookies=self.__GetCookies(),
-            verify=False,
+        RenameDistributionListResponse = yield SoapRequest(
+            "RenameDistributionListRequest",
+            {
+                "_jsns": "urn:zimbraAdmin",
+                "id": {"_content": distrListID},
+                "newName": {"_content": newName},
+            },
         )
 
         jsonResponseData = json.loads(RenameDistributionListResponse.text)["Body"]
@@ -1110,6 +1949,14 @@ class ZimbraAPI:
             data["name"] = dlData["name"]
             data["id"] = dlData["id"]
 
+            self.__DistrListIDCache.DeleteValue(data["id"])
+            self.__DistrListIDCache.Set(data["name"].lower(), data["id"])
+            yield from self._InvalidateCache(
+                self._ObjectTags("dl", data["id"], distrListName)
+                + [f"dl:{data['name'].lower()}", "dls"]
+                + memberOfTags
+            )
+
             result.SetData(data)
         else:
             result.SetErrorText(jsonResponseData["Fault"]["Reason"]["Text"])
@@ -1117,6 +1964,455 @@ class ZimbraAPI:
 
         return result
 
+
+class ZimbraAPI(ZimbraOperations):
+    def __init__(
+        self,
+        host,
+        adminUsername,
+        adminPassword,
+        session: HTTPSession = None,
+        nameCacheSize: int = 10000,
+        nameCacheTTL: float = 300,
+        batchWindow: float = 0,
+        batchMaxItems: int = 50,
+        transport: str = "xml",
+        cache=None,
+        cacheTTL: dict = None,
+        singleFlight: bool = True,
+        authStore=None,
+        timeouts: dict = None,
+        metrics=None,
+    ) -> None:
+        # session      - HTTPSession, or RecordingSession/ReplaySession from CassetteSession
+        # batchWindow  - seconds to collect concurrent batchable calls (GetAccount,
+        #                GetAccountMembership) into one BatchRequest, 0 disables
+        # transport    - "xml" or "json" request bodies, responses are JSON either way
+        # cache        - read-through cache of the Get* results, cacheTTL per operation
+        # singleFlight - identical concurrent Get* calls share one upstream request
+        # authStore    - SharedAuthStore, one admin session for all processes using it
+        # timeouts     - (connect, read) seconds per request name, see DEFAULT_TIMEOUTS.
+        #                Retries and the circuit breaker are set on the session
+        # metrics      - Metrics recording upstream requests and auth refreshes
+        super().__init__(
+            host,
+            nameCacheSize,
+            nameCacheTTL,
+            transport,
+            cache,
+            cacheTTL,
+            timeouts,
+            metrics,
+        )
+        self.__AdminHost = self._GetAdminHost()
+        self.__Session = session if session else HTTPSession()
+        self.__AuthData = AuthData(
+            self.__AdminHost,
+            adminUsername,
+            adminPassword,
+            self.__Session,
+            Store=authStore,
+            Metrics=metrics,
+        )
+        self.__Coalescer = None
+        if batchWindow > 0:
+            self.__Coalescer = BatchCoalescer(
+                self.__SendBatch, batchWindow, batchMaxItems
+            )
+        self.__SingleFlight = SingleFlight() if singleFlight else None
+
+    def __UpdateAuthData(self) -> ResponseData:
+        return self.__AuthData.UpdateAuthData()
+
+    def __GetCSRFToken(self) -> str:
+        return self.__AuthData.GetCSRFToken()
+
+    def __GetCookies(self) -> dict:
+        return self.__AuthData.GetCookies()
+
+    def __Send(
+        self, request: SoapRequest, AuthToken: str, CSRFToken: str
+    ) -> requests.Response:
+        with Trace.Span("build"):
+            body = self._GetRequestBody(request, CSRFToken)
+        response = None
+        started = monotonic()
+        try:
+            response = self.__Session.Post(
+                self._GetRequestURL(request),
+                body,
+                cookies={"ZM_ADMIN_AUTH_TOKEN": AuthToken},
+                stream=request.Stream,
+                timeout=self._GetTimeout(request),
+                idempotent=self._IsIdempotent(request),
+            )
+            return response
+        finally:
+            self._RecordSoapRequest(request, body, response, monotonic() - started)
+
+    def __SendWithAuthRetry(self, request: SoapRequest) -> requests.Response:
+        # If Zimbra rejects the token, it is refreshed once and the request repeated
+        expiredToken, CSRFToken = self.__AuthData.GetTokens()
+        response = self.__Send(request, expiredToken, CSRFToken)
+
+        if self._IsAuthFault(request, response):
+            if not self.__AuthData.UpdateAuthData(expiredToken).IsError():
+                response = self.__Send(request, *self.__AuthData.GetTokens())
+
+        return self._AsSoapFault(response)
+
+    def __SendAll(self, requestList: list) -> list:
+        with ThreadPoolExecutor(len(requestList)) as executor:
+            return list(
+                executor.map(Trace.Bind(self.__SendWithAuthRetry), requestList)
+            )
+
+    def __SendBatch(self, requestList: list) -> list:
+        if len(requestList) == 1:
+            return [self.__SendWithAuthRetry(requestList[0])]
+
+        response = self.__SendWithAuthRetry(self._BuildBatchRequest(requestList))
+        return self._SplitBatchResponse(response, len(requestList))
+
+    def __Dispatch(self, request):
+        if isinstance(request, CacheCall):
+            return self._CallCache(request)
+        if isinstance(request, list):
+            return self.__SendAll(request)
+        if request.Batchable and self.__Coalescer is not None:
+            return self.__Coalescer.Submit(request)
+        return self.__SendWithAuthRetry(request)
+
+    def __Run(self, operation: Operation) -> ResponseData:
+        with Trace.Span("auth"):
+            UpdateAuthDataStatus = self.__UpdateAuthData()
+        if UpdateAuthDataStatus.IsError():
+            operation.close()
+            return UpdateAuthDataStatus
+
+        # parse - the operation reading a response and building the next request
+        try:
+            with Trace.Span("parse"):
+                request = next(operation)
+            while True:
+                with self._UpstreamSpan(request):
+                    response = self.__Dispatch(request)
+                with Trace.Span("parse"):
+                    request = operation.send(response)
+        except StopIteration as stop:
+            return stop.value
+        except requests.exceptions.RequestException as e:
+            # timeouts, connection errors and an open circuit fail the operation
+            operation.close()
+            result = ResponseData()
+            result.SetErrorCode(str(type(e)))
+            result.SetErrorText(str(e))
+            return result
+
+    def __Read(self, operationName: str, args: tuple, operation) -> ResponseData:
+        # Identical concurrent reads share one upstream request and one
+        # ResponseData, operation(*args) only runs for the first of them
+        def run():
+            return self.__Run(self._Cached(operationName, args, operation(*args)))
+
+        if self.__SingleFlight is None:
+            return run()
+        return self.__SingleFlight.Do(
+            self._ReadKey(operationName, args), run
+        )
+
+    ################################################## ACCOUNT MANAGEMENT ##################################################
+
+    def CreateAccount(
+        self,
+        accountName: str,
+        password: str,
+        name: str,
+        surname: str,
+        patronymic: str = "",
+        extraParams: dict = None,
+    ) -> ResponseData:
+        return self.__Run(
+            self._CreateAccount(
+                accountName, password, name, surname, patronymic, extraParams
+            )
+        )
+
+    def DeleteAccount(self, accountID: str = "", accountName: str = "") -> ResponseData:
+        return self.__Run(self._DeleteAccount(accountID, accountName))
+
+    def ModifyAccount(
+        self, params: dict, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return self.__Run(self._ModifyAccount(params, accountID, accountName))
+
+    def RenameAccount(
+        self, newName: str, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return self.__Run(self._RenameAccount(newName, accountID, accountName))
+
+    def SetPassword(
+        self, newPassword: str, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return self.__Run(self._SetPassword(newPassword, accountID, accountName))
+
+    def GetAccount(self, accountID: str = "", accountName: str = "") -> ResponseData:
+        return self.__Read("GetAccount", (accountID, accountName), self._GetAccount)
+
+    def GetAccounts(
+        self, offset: int = 0, limit: int = 0, attrs: list = None
+    ) -> ResponseData:
+        return self.__Read("GetAccounts", (offset, limit, attrs), self._GetAccounts)
+
+    def IterAccounts(
+        self, pageSize: int = 1000, attrs: list = None
+    ) -> Iterator[ResponseData]:
+        # Yields one ResponseData per page, stops after the first error
+        offset = 0
+        while True:
+            page = self.__Run(self._GetAccounts(offset, pageSize, attrs))
+            yield page
+
+            if page.IsError() or len(page.GetData()) < pageSize:
+                return
+            offset += pageSize
+
+    def GetAccountMembership(
+        self, accountID: str = "", accountName: str = ""
+    ) -> ResponseData:
+        return self.__Read(
+            "GetAccountMembership", (accountID, accountName), self._GetAccountMembership
+        )
+
+    def __RunBulkItem(self, item: dict, defaultParams: dict = None) -> ResponseData:
+        try:
+            return self.__Run(self._BulkCreateAccount(item, defaultParams))
+        except requests.exceptions.RequestException as e:
+            result = ResponseData()
+            result.SetErrorCode(str(type(e)))
+            result.SetErrorText(str(e))
+            return result
+
+    def BulkCreateAccounts(
+        self, accounts: Iterable[dict], workers: int = 8, defaultParams: dict = None
+    ) -> Iterator[ResponseData]:
+        # accounts - dicts with the CreateAccount fields and optional params, read
+        #            lazily, at most workers creations are in flight
+        # Yields {"index", "accountName", "data"/"error"} per account in the order
+        # they complete, then {"summary": ...} with counts and throughput
+        startTime = monotonic()
+        summary = self._NewBulkSummary()
+        pending = dict()  # future -> (index, item)
+
+        with ThreadPoolExecutor(workers) as executor:
+            for index, item in enumerate(accounts):
+                future = executor.submit(self.__RunBulkItem, item, defaultParams)
+                pending[future] = (index, item)
+
+                if len(pending) >= workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self._BulkItem(*pending.pop(future), future.result(), summary)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._BulkItem(*pending.pop(future), future.result(), summary)
+
+        yield self._BulkSummary(summary, monotonic() - startTime)
+
+    ################################################## MAILBOX MANAGEMENT ##################################################
+
+    def GetMessages(
+        self,
+        accountName: str,
+        unreadOnly: bool = True,
+        limit: int = 10,
+        offset: int = 0,
+        countOnly: bool = False,
+        incremental: bool = False,
+        token: str = None,
+    ) -> ResponseData:
+        return self.__Run(
+            self._GetMessages(
+                accountName, unreadOnly, limit, offset, countOnly, incremental, token
+            )
+        )
+
+    def DelegateAuth(self, accountID: str = "", accountName: str = "") -> ResponseData:
+        return self.__Run(self._DelegateAuth(accountID, accountName))
+
+    def SendMessage(
+        self,
+        senderAccountName: str,
+        receiverAccountName: str,
+        subject: str = "",
+        content: str = "",
+        senderPseudonym: str = "",
+        receiverPseudonym: str = "",
+    ) -> ResponseData:
+        return self.__Run(
+            self._SendMessage(
+                senderAccountName,
+                receiverAccountName,
+                subject,
+                content,
+                senderPseudonym,
+                receiverPseudonym,
+            )
+        )
+
+    def CreateWaitSet(self, accountIDs: list, types: str = "m") -> ResponseData:
+        return self.__Run(self._CreateWaitSet(accountIDs, types))
+
+    def WaitSet(
+        self,
+        waitSetID: str,
+        seq: str,
+        addAccountIDs: list = None,
+        removeAccountIDs: list = None,
+        timeout: int = 0,
+        types: str = "m",
+    ) -> ResponseData:
+        return self.__Run(
+            self._WaitSet(
+                waitSetID, seq, addAccountIDs, removeAccountIDs, timeout, types
+            )
+        )
+
+    def DestroyWaitSet(self, waitSetID: str) -> ResponseData:
+        return self.__Run(self._DestroyWaitSet(waitSetID))
+
+    ################################################## DISTRIBUTION LIST MANAGEMENT ##################################################
+
+    def CreateDistributionList(
+        self, name: str, displayName: str = "", extraParams: dict = None
+    ) -> ResponseData:
+        return self.__Run(self._CreateDistributionList(name, displayName, extraParams))
+
+    def DeleteDistributionList(
+        self, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return self.__Run(self._DeleteDistributionList(distrListID, distrListName))
+
+    def ModifyDistributionList(
+        self, params: dict, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return self.__Run(
+            self._ModifyDistributionList(params, distrListID, distrListName)
+        )
+
+    def GetDistributionList(
+        self,
+        distrListID: str = "",
+        distrListName: str = "",
+        offset: int = 0,
+        limit: int = 0,
+        countOnly: bool = False,
+    ) -> ResponseData:
+        return self.__Read(
+            "GetDistributionList",
+            (distrListID, distrListName, offset, limit, countOnly),
+            self._GetDistributionList,
+        )
+
+    def IterDistributionListMembers(
+        self, distrListID: str = "", distrListName: str = "", pageSize: int = 1000
+    ) -> Iterator[ResponseData]:
+        # Yields one ResponseData with a list of members per page,
+        # stops after the first error
+        offset = 0
+        while True:
+            page = self.__Run(
+                self._GetDistributionList(distrListID, distrListName, offset, pageSize)
+            )
+            if page.IsError():
+                yield page
+                return
+
+            members = ResponseData()
+            members.SetData(page.GetData()["members"])
+            yield members
+
+            if len(members.GetData()) < pageSize:
+                return
+            distrListID, offset = page.GetData()["id"], offset + pageSize
+
+    def GetDistributionLists(self, offset: int = 0, limit: int = 0) -> ResponseData:
+        return self.__Read(
+            "GetDistributionLists", (offset, limit), self._GetDistributionLists
+        )
+
+    def IterDistributionLists(self, pageSize: int = 1000) -> Iterator[ResponseData]:
+        # Yields one ResponseData per page, stops after the first error
+        offset = 0
+        while True:
+            page = self.__Run(self._GetDistributionLists(offset, pageSize))
+            yield page
+
+            if page.IsError() or len(page.GetData()) < pageSize:
+                return
+            offset += pageSize
+
+    def GetDistributionListMembership(
+        self, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return self.__Read(
+            "GetDistributionListMembership",
+            (distrListID, distrListName),
+            self._GetDistributionListMembership,
+        )
+
+    def AddDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return self.__Run(
+            self._AddDistributionListMembers(
+                userEmails, distrListID, distrListName, chunkSize, inFlight
+            )
+        )
+
+    def RemoveDistributionListMembers(
+        self,
+        userEmails: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return self.__Run(
+            self._RemoveDistributionListMembers(
+                userEmails, distrListID, distrListName, chunkSize, inFlight
+            )
+        )
+
+    def SyncDistributionListMembers(
+        self,
+        desired: list,
+        distrListID: str = "",
+        distrListName: str = "",
+        pageSize: int = MEMBERS_PAGE_SIZE,
+        chunkSize: int = MEMBERS_CHUNK_SIZE,
+        inFlight: int = MEMBERS_IN_FLIGHT,
+    ) -> ResponseData:
+        return self.__Run(
+            self._SyncDistributionListMembers(
+                desired, distrListID, distrListName, pageSize, chunkSize, inFlight
+            )
+        )
+
+    def RenameDistributionList(
+        self, newName: str, distrListID: str = "", distrListName: str = ""
+    ) -> ResponseData:
+        return self.__Run(
+            self._RenameDistributionList(newName, distrListID, distrListName)
+        )
+
     ################################################## DEV METHODS ##################################################
 
     def ExecuteCustomRequest(
@@ -1126,10 +2422,42 @@ class ZimbraAPI:
         Request = re.sub(
             r"(?<=<csrfToken>)(.*?)(?=<\/csrfToken>)", self.__GetCSRFToken(), Request
         )
-        Response = requests.post(
+        Response = self.__Session.Post(
             self.__AdminHost + URL, Request, cookies=self.__GetCookies()
         )
 
         result = ResponseData()
         result.SetData(Response.text)
         return result
+
+    def GetConnectionStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Session.GetStats())
+        return result
+
+    def GetResilienceStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Session.GetResilienceStats())
+        return result
+
+    def GetNameCacheStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self._GetNameCacheStats())
+        return result
+
+    def GetBatchStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self.__Coalescer.GetStats() if self.__Coalescer else None)
+        return result
+
+    def GetCacheStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(self._GetCacheStats())
+        return result
+
+    def GetSingleFlightStats(self) -> ResponseData:
+        result = ResponseData()
+        result.SetData(
+            self.__SingleFlight.GetStats() if self.__SingleFlight else None
+        )
+        return result
@@ -1,12 +1,94 @@
 # %%
-from flask import Flask, request
+from flask import Flask, Response, request, g
 from ZimbraAPI import ZimbraAPI, ResponseData
+from ZimbraAPI import MEMBERS_CHUNK_SIZE, MEMBERS_IN_FLIGHT
+from WaitSetListener import WaitSetListener
+from ResponseCache import SQLiteResponseCache
+from SharedAuthStore import SharedAuthStore
+from Metrics import Metrics
+from Tracing import Trace, TraceFileExporter
 from config import host, adminUsername, adminPassword, hmac_key
-from time import time
+from time import time, monotonic
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
 import hmac, hashlib
+import functools
 import json
+import csv
+import io
+
+ACCOUNT_FIELDS = ["accountName", "password", "name", "surname", "patronymic"]
+
+DEFAULT_ACCOUNT_PARAMS = {
+    "zimbraAccountStatus": "active",
+    "zimbraFeatureCalendarEnabled": "FALSE",
+    "zimbraFeatureTasksEnabled": "FALSE",
+    "zimbraFeatureBriefcasesEnabled": "FALSE",
+    "zimbraFeatureOptionsEnabled": "FALSE",
+    "zimbraFeatureSharingEnabled": "FALSE",
+    "zimbraFeatureManageZimlets": "FALSE",
+    "zimbraFeatureGalEnabled": "FALSE",
+    "zimbraFeatureGalAutoCompleteEnabled": "FALSE",
+    "zimbraPrefGalAutoCompleteEnabled": "FALSE",
+    "zimbraFeatureChangePasswordEnabled": "FALSE",
+    "zimbraMailForwardingAddressMaxNumAddrs": 5,
+    "zimbraMailQuota": 524288000,
+}
+
+DEFAULT_DISTRIBUTION_LIST_PARAMS = {
+    "zimbraMailStatus": "enabled",
+    "zimbraDistributionListSubscriptionPolicy": "REJECT",
+    "zimbraDistributionListUnsubscriptionPolicy": "REJECT",
+}
+
+BULK_MAX_WORKERS = 32
+BATCH_MAX_OPERATIONS = 500
+BATCH_MAX_WORKERS = 32
+MEMBERS_MAX_IN_FLIGHT = 16
+# /waitForChanges calls blocked at once, each holds one of gunicorn's 32 threads
+WAIT_MAX_WAITERS = 16
+
+# shared by all gunicorn workers of the container
+RESPONSE_CACHE_PATH = "/tmp/zimbra_api_cache.sqlite"
+AUTH_STORE_PATH = "/tmp/zimbra_api_auth.json"
+METRICS_PATH = "/tmp/zimbra_api_metrics"
+
+# answers up to this size are checked for a ResponseData error code
+METRICS_ERROR_BODY_SIZE = 4096
+
+# requests sent with "X-Debug-Trace: 1" are traced, the answer gets the phases
+# in a Server-Timing header and the full trace is appended to TRACE_EXPORT_PATH
+TRACE_HEADER = "X-Debug-Trace"
+TRACE_ID_HEADER = "X-Trace-Id"
+TRACE_EXPORT_PATH = "/tmp/zimbra_api_traces.jsonl"
+
+
+def calculate_HMAC(data: bytes) -> str:
+    return str(
+        hmac.new(
+            hmac_key,
+            data,
+            hashlib.sha3_512,
+        ).hexdigest()
+    )
+
 
+def record_HMAC_check(check):
+    @functools.wraps(check)
+    def wrapper(*args, **kwargs):
+        started = monotonic()
+        try:
+            with Trace.Span("hmac"):
+                return check(*args, **kwargs)
+        finally:
+            AppMetrics.Observe(
+                "zimbra_api_hmac_check_duration_seconds", (), monotonic() - started
+            )
 
+    return wrapper
+
+
+@record_HMAC_check
 def check_HMAC(data: dict) -> bool:
     hmac_sign = data.pop("hmac_sign")
     datastr = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
@@ -15,20 +97,137 @@ def check_HMAC(data: dict) -> bool:
     if abs(current_timestamp - data["timestamp"]) > 30:
         return False
 
-    calculated_hmac = str(
-        hmac.new(
-            hmac_key,
-            datastr.encode("utf-8"),
-            hashlib.sha3_512,
-        ).hexdigest()
-    )
+    calculated_hmac = calculate_HMAC(datastr.encode("utf-8"))
+    return calculated_hmac == hmac_sign
+
+
+@record_HMAC_check
+def check_HMAC_body(body: bytes, timestamp: int, hmac_sign: str) -> bool:
+    # Raw (non-JSON) bodies are signed as "<timestamp>\n<body>"
+    current_timestamp = int(time())
+    if abs(current_timestamp - timestamp) > 30:
+        return False
+
+    calculated_hmac = calculate_HMAC(f"{timestamp}\n".encode("utf-8") + body)
     return calculated_hmac == hmac_sign
 
 
+def NDJSONAccounts(text: str) -> Iterator[dict]:
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = None
+        # a malformed line is reported as MISSING_DATA
+        yield item if isinstance(item, dict) else {}
+
+
+def CSVAccounts(text: str) -> Iterator[dict]:
+    # Header row names the CreateAccount fields, any other column is an account attribute
+    for row in csv.DictReader(io.StringIO(text)):
+        item = {key: value for key, value in row.items() if value not in ["", None]}
+        params = {key: item.pop(key) for key in list(item) if key not in ACCOUNT_FIELDS}
+        yield {**item, "params": params}
+
+
+def SingleItem(data: dict) -> Iterator[dict]:
+    return iter([data])
+
+
+def NamedItems(data: dict) -> Iterator[dict]:
+    return ({"name": name, **item} for name, item in data.items())
+
+
+def MemberItems(data: list) -> Iterator[dict]:
+    return ({"member": member} for member in data)
+
+
+def StreamNDJSON(pages: Iterator[ResponseData], items=NamedItems) -> Response:
+    # One line per item, sent page by page as pages arrive. An error ends the
+    # stream with a line in the usual {"error": ...} format
+    def generate():
+        for page in pages:
+            if page.IsError():
+                yield json.dumps(page.asdict(), ensure_ascii=False) + "\n"
+                return
+
+            yield "".join(
+                json.dumps(item, ensure_ascii=False) + "\n"
+                for item in items(page.GetData())
+            )
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
 app = Flask(__name__)
 app.config["JSON_AS_ASCII"] = False
 
-Zimbra = ZimbraAPI(host, adminUsername, adminPassword)
+AppMetrics = Metrics(METRICS_PATH)
+TraceExporter = TraceFileExporter(TRACE_EXPORT_PATH)
+
+Zimbra = ZimbraAPI(
+    host,
+    adminUsername,
+    adminPassword,
+    batchWindow=0.005,
+    cache=SQLiteResponseCache(RESPONSE_CACHE_PATH),
+    authStore=SharedAuthStore(AUTH_STORE_PATH),
+    metrics=AppMetrics,
+)
+Listener = WaitSetListener(Zimbra, maxWaiters=WAIT_MAX_WAITERS)
+
+
+@app.before_request
+def StartRequestTimer():
+    g.requestStarted = monotonic()
+    if request.headers.get(TRACE_HEADER) == "1":
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.trace = Trace.Start(route, request.headers.get(TRACE_ID_HEADER))
+
+
+@app.teardown_request
+def FinishTrace(exc) -> None:
+    # the trace must not outlive its request on this thread, also after an error
+    trace = g.pop("trace", None)
+    if trace is not None:
+        trace.Finish()
+
+
+@app.after_request
+def RecordRequestMetrics(response: Response) -> Response:
+    # Streamed answers are timed until their first byte. Error codes are read
+    # from small JSON answers only, errors never come with a large body
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    labels = (("route", route),)
+    AppMetrics.Observe(
+        "zimbra_api_http_request_duration_seconds",
+        labels,
+        monotonic() - g.get("requestStarted", monotonic()),
+    )
+    AppMetrics.Count(
+        "zimbra_api_http_requests_total",
+        labels + (("status", str(response.status_code)),),
+    )
+
+    if response.is_json and not response.is_streamed:
+        body = response.get_data()
+        if len(body) <= METRICS_ERROR_BODY_SIZE and b'"error"' in body:
+            error = json.loads(body).get("error")
+            if isinstance(error, dict):
+                AppMetrics.Count(
+                    "zimbra_api_errors_total", labels + (("code", str(error.get("code"))),)
+                )
+
+    trace = g.pop("trace", None)
+    if trace is not None:
+        trace.Finish()
+        response.headers[TRACE_ID_HEADER] = trace.GetTraceID()
+        response.headers["Server-Timing"] = trace.GetServerTiming()
+        TraceExporter.Export(trace)
+
+    return response
 
 
 ################################################## ACCOUNT MANAGEMENT ##################################################
@@ -43,24 +242,7 @@ def CreateAccount():
     name: str = data.get("name")
     surname: str = data.get("surname")
     patronymic: str = data.get("patronymic", "")
-    params: dict = data.get(
-        "params",
-        {
-            "zimbraAccountStatus": "active",
-            "zimbraFeatureCalendarEnabled": "FALSE",
-            "zimbraFeatureTasksEnabled": "FALSE",
-            "zimbraFeatureBriefcasesEnabled": "FALSE",
-            "zimbraFeatureOptionsEnabled": "FALSE",
-            "zimbraFeatureSharingEnabled": "FALSE",
-            "zimbraFeatureManageZimlets": "FALSE",
-            "zimbraFeatureGalEnabled": "FALSE",
-            "zimbraFeatureGalAutoCompleteEnabled": "FALSE",
-            "zimbraPrefGalAutoCompleteEnabled": "FALSE",
-            "zimbraFeatureChangePasswordEnabled": "FALSE",
-            "zimbraMailForwardingAddressMaxNumAddrs": 5,
-            "zimbraMailQuota": 524288000,
-        },
-    )
+    params: dict = data.get("params", DEFAULT_ACCOUNT_PARAMS)
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -186,6 +368,9 @@ def GetAccount():
 def GetAccounts():
     data = request.json
 
+    stream: bool = data.get("stream", False)
+    pageSize: int = data.get("pageSize", 1000)
+
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
 
@@ -195,6 +380,9 @@ def GetAccounts():
     if not check_HMAC(data):
         return ResponseData.GetHMACError().asdict()
 
+    if stream:
+        return StreamNDJSON(Zimbra.IterAccounts(pageSize))
+
     result = Zimbra.GetAccounts().asdict()
     return result
 
@@ -219,6 +407,37 @@ def GetAccountMembership():
     return result
 
 
+@app.route("/bulkCreateAccounts", methods=["POST"])
+def BulkCreateAccounts():
+    # Body is NDJSON (one /createAccount object per line) or CSV with
+    # Content-Type: text/csv. Signature and options are passed in the query string
+    body = request.get_data()
+
+    workers: int = request.args.get("workers", 8, type=int)
+
+    timestamp: int = request.args.get("timestamp", type=int)
+    hmac_sign: str = request.args.get("hmac_sign")
+
+    if None in [timestamp, hmac_sign]:
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC_body(body, timestamp, hmac_sign):
+        return ResponseData.GetHMACError().asdict()
+
+    text = body.decode("utf-8-sig")
+    if request.mimetype == "text/csv":
+        accounts = CSVAccounts(text)
+    else:
+        accounts = NDJSONAccounts(text)
+
+    return StreamNDJSON(
+        Zimbra.BulkCreateAccounts(
+            accounts, max(1, min(workers, BULK_MAX_WORKERS)), DEFAULT_ACCOUNT_PARAMS
+        ),
+        SingleItem,
+    )
+
+
 ################################################## MAILBOX MANAGEMENT ##################################################
 
 
@@ -228,6 +447,11 @@ def GetMessages():
 
     accountName: str = data.get("accountName")
     unreadOnly: bool = data.get("unreadOnly", True)
+    limit: int = data.get("limit", 10)
+    offset: int = data.get("offset", 0)
+    countOnly: bool = data.get("countOnly", False)
+    incremental: bool = data.get("incremental", False)
+    token: str = data.get("token")
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -238,7 +462,9 @@ def GetMessages():
     if not check_HMAC(data):
         return ResponseData.GetHMACError().asdict()
 
-    result = Zimbra.GetMessages(accountName, unreadOnly).asdict()
+    result = Zimbra.GetMessages(
+        accountName, unreadOnly, limit, offset, countOnly, incremental, token
+    ).asdict()
     return result
 
 
@@ -295,6 +521,30 @@ def SendMessage():
     return result
 
 
+@app.route("/waitForChanges", methods=["POST"])
+def WaitForChanges():
+    data = request.json
+
+    accountIDs: list = data.get("accountIDs")
+    seq: str = data.get("seq", "0")
+    timeout: int = data.get("timeout", 30)
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if None in [accountIDs, timestamp, hmac_sign]:
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    Listener.Watch(accountIDs)
+    Listener.Start()
+
+    result = Listener.WaitForChanges(accountIDs, seq, min(timeout, 60)).asdict()
+    return result
+
+
 ################################################## DISTRIBUTION LIST MANAGEMENT ##################################################
 
 
@@ -302,6 +552,9 @@ def SendMessage():
 def GetDistributionLists():
     data = request.json
 
+    stream: bool = data.get("stream", False)
+    pageSize: int = data.get("pageSize", 1000)
+
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
 
@@ -311,6 +564,9 @@ def GetDistributionLists():
     if not check_HMAC(data):
         return ResponseData.GetHMACError().asdict()
 
+    if stream:
+        return StreamNDJSON(Zimbra.IterDistributionLists(pageSize))
+
     result = Zimbra.GetDistributionLists().asdict()
     return result
 
@@ -321,6 +577,9 @@ def GetDistributionList():
 
     distrListID: str = data.get("distrListID", "")
     distrListName: str = data.get("distrListName", "")
+    stream: bool = data.get("stream", False)
+    pageSize: int = data.get("pageSize", 1000)
+    countOnly: bool = data.get("countOnly", False)
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -331,7 +590,15 @@ def GetDistributionList():
     if not check_HMAC(data):
         return ResponseData.GetHMACError().asdict()
 
-    result = Zimbra.GetDistributionList(distrListID, distrListName).asdict()
+    if stream:
+        return StreamNDJSON(
+            Zimbra.IterDistributionListMembers(distrListID, distrListName, pageSize),
+            MemberItems,
+        )
+
+    result = Zimbra.GetDistributionList(
+        distrListID, distrListName, countOnly=countOnly
+    ).asdict()
     return result
 
 
@@ -361,14 +628,7 @@ def CreateDistributionList():
 
     name: str = data.get("name")
     displayName: str = data.get("displayName", "")
-    params: dict = data.get(
-        "params",
-        {
-            "zimbraMailStatus": "enabled",
-            "zimbraDistributionListSubscriptionPolicy": "REJECT",
-            "zimbraDistributionListUnsubscriptionPolicy": "REJECT",
-        },
-    )
+    params: dict = data.get("params", DEFAULT_DISTRIBUTION_LIST_PARAMS)
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -458,6 +718,8 @@ def AddDistributionListMembers():
     distrListID: str = data.get("distrListID", "")
     distrListName: str = data.get("distrListName", "")
     userEmails: list = data.get("userEmails")
+    chunkSize: int = data.get("chunkSize", MEMBERS_CHUNK_SIZE)
+    inFlight: int = data.get("inFlight", MEMBERS_IN_FLIGHT)
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -471,7 +733,11 @@ def AddDistributionListMembers():
         return ResponseData.GetHMACError().asdict()
 
     result = Zimbra.AddDistributionListMembers(
-        userEmails, distrListID, distrListName
+        userEmails,
+        distrListID,
+        distrListName,
+        max(1, chunkSize),
+        max(1, min(inFlight, MEMBERS_MAX_IN_FLIGHT)),
     ).asdict()
     return result
 
@@ -483,6 +749,8 @@ def RemoveDistributionListMembers():
     distrListID: str = data.get("distrListID", "")
     distrListName: str = data.get("distrListName", "")
     userEmails: list = data.get("userEmails")
+    chunkSize: int = data.get("chunkSize", MEMBERS_CHUNK_SIZE)
+    inFlight: int = data.get("inFlight", MEMBERS_IN_FLIGHT)
 
     timestamp: str = data.get("timestamp")
     hmac_sign: str = data.get("hmac_sign")
@@ -496,10 +764,336 @@ def RemoveDistributionListMembers():
         return ResponseData.GetHMACError().asdict()
 
     result = Zimbra.RemoveDistributionListMembers(
+        userEmails,
+        distrListID,
+        distrListName,
+        max(1, chunkSize),
+        max(1, min(inFlight, MEMBERS_MAX_IN_FLIGHT)),
+    ).asdict()
+    return result
+
+
+@app.route("/syncDistributionListMembers", methods=["POST"])
+def SyncDistributionListMembers():
+    data = request.json
+
+    distrListID: str = data.get("distrListID", "")
+    distrListName: str = data.get("distrListName", "")
+    userEmails: list = data.get("userEmails")
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if (None in [userEmails, timestamp, hmac_sign]) or (
+        distrListID == distrListName == ""
+    ):
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    result = Zimbra.SyncDistributionListMembers(
         userEmails, distrListID, distrListName
     ).asdict()
     return result
 
 
+################################################## BATCH ##################################################
+
+# op -> (read only, required fields, call). "a/b" means either a or b
+BATCH_OPERATIONS = {
+    "createAccount": (
+        False,
+        ["accountName", "password", "name", "surname"],
+        lambda op: Zimbra.CreateAccount(
+            op["accountName"],
+            op["password"],
+            op["name"],
+            op["surname"],
+            op.get("patronymic", ""),
+            op.get("params", DEFAULT_ACCOUNT_PARAMS),
+        ),
+    ),
+    "deleteAccount": (
+        False,
+        ["accountID/accountName"],
+        lambda op: Zimbra.DeleteAccount(
+            op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "modifyAccount": (
+        False,
+        ["params", "accountID/accountName"],
+        lambda op: Zimbra.ModifyAccount(
+            op["params"], op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "renameAccount": (
+        False,
+        ["newName", "accountID/accountName"],
+        lambda op: Zimbra.RenameAccount(
+            op["newName"], op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "setPassword": (
+        False,
+        ["newPassword", "accountID/accountName"],
+        lambda op: Zimbra.SetPassword(
+            op["newPassword"], op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "getAccount": (
+        True,
+        ["accountID/accountName"],
+        lambda op: Zimbra.GetAccount(op.get("accountID", ""), op.get("accountName", "")),
+    ),
+    "getAccountMembership": (
+        True,
+        ["accountID/accountName"],
+        lambda op: Zimbra.GetAccountMembership(
+            op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "getMessages": (
+        True,
+        ["accountName"],
+        lambda op: Zimbra.GetMessages(
+            op["accountName"],
+            op.get("unreadOnly", True),
+            op.get("limit", 10),
+            op.get("offset", 0),
+            op.get("countOnly", False),
+            op.get("incremental", False),
+            op.get("token"),
+        ),
+    ),
+    "delegateAuth": (
+        True,
+        ["accountID/accountName"],
+        lambda op: Zimbra.DelegateAuth(
+            op.get("accountID", ""), op.get("accountName", "")
+        ),
+    ),
+    "sendMessage": (
+        False,
+        ["senderAccountName", "receiverAccountName"],
+        lambda op: Zimbra.SendMessage(
+            op["senderAccountName"],
+            op["receiverAccountName"],
+            op.get("subject", ""),
+            op.get("content", ""),
+            op.get("senderPseudonym", ""),
+            op.get("receiverPseudonym", ""),
+        ),
+    ),
+    "getDistributionLists": (
+        True,
+        [],
+        lambda op: Zimbra.GetDistributionLists(),
+    ),
+    "getDistributionList": (
+        True,
+        ["distrListID/distrListName"],
+        lambda op: Zimbra.GetDistributionList(
+            op.get("distrListID", ""),
+            op.get("distrListName", ""),
+            countOnly=op.get("countOnly", False),
+        ),
+    ),
+    "getDistributionListMembership": (
+        True,
+        ["distrListID/distrListName"],
+        lambda op: Zimbra.GetDistributionListMembership(
+            op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "createDistributionList": (
+        False,
+        ["name"],
+        lambda op: Zimbra.CreateDistributionList(
+            op["name"],
+            op.get("displayName", ""),
+            op.get("params", DEFAULT_DISTRIBUTION_LIST_PARAMS),
+        ),
+    ),
+    "deleteDistributionList": (
+        False,
+        ["distrListID/distrListName"],
+        lambda op: Zimbra.DeleteDistributionList(
+            op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "modifyDistributionList": (
+        False,
+        ["params", "distrListID/distrListName"],
+        lambda op: Zimbra.ModifyDistributionList(
+            op["params"], op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "renameDistributionList": (
+        False,
+        ["newName", "distrListID/distrListName"],
+        lambda op: Zimbra.RenameDistributionList(
+            op["newName"], op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "addDistributionListMembers": (
+        False,
+        ["userEmails", "distrListID/distrListName"],
+        lambda op: Zimbra.AddDistributionListMembers(
+            op["userEmails"], op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "removeDistributionListMembers": (
+        False,
+        ["userEmails", "distrListID/distrListName"],
+        lambda op: Zimbra.RemoveDistributionListMembers(
+            op["userEmails"], op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+    "syncDistributionListMembers": (
+        False,
+        ["userEmails", "distrListID/distrListName"],
+        lambda op: Zimbra.SyncDistributionListMembers(
+            op["userEmails"], op.get("distrListID", ""), op.get("distrListName", "")
+        ),
+    ),
+}
+
+
+def RunBatchOperation(op: dict) -> dict:
+    if not isinstance(op, dict) or op.get("op") not in BATCH_OPERATIONS:
+        return ResponseData.GetUnknownOperationError().asdict()
+
+    _, fields, call = BATCH_OPERATIONS[op["op"]]
+    for field in fields:
+        if all(op.get(name) in [None, ""] for name in field.split("/")):
+            return ResponseData.GetMissingDataError().asdict()
+
+    # any error, upstream or in the operation's own fields, fails this
+    # operation only, the results of the others are still returned
+    try:
+        return call(op).asdict()
+    except Exception as e:
+        result = ResponseData()
+        result.SetErrorCode(str(type(e)))
+        result.SetErrorText(str(e))
+        return result.asdict()
+
+
+def IsReadOnly(op: dict) -> bool:
+    if not isinstance(op, dict):
+        return False
+    # an incremental getMessages advances the stored sync token
+    if op.get("op") == "getMessages" and op.get("incremental"):
+        return False
+    return BATCH_OPERATIONS.get(op.get("op"), (False,))[0]
+
+
+@app.route("/batch", methods=["POST"])
+def Batch():
+    # Runs operations in order. Consecutive read-only operations run
+    # concurrently, so GetAccount/GetAccountMembership calls among them are
+    # merged into SOAP BatchRequests
+    data = request.json
+
+    operations: list = data.get("operations")
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if (None in [operations, timestamp, hmac_sign]) or not isinstance(operations, list):
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return ResponseData.GetTooManyOperationsError().asdict()
+
+    results = list()
+    with ThreadPoolExecutor(BATCH_MAX_WORKERS) as executor:
+        i = 0
+        while i < len(operations):
+            if not IsReadOnly(operations[i]):
+                results.append(RunBatchOperation(operations[i]))
+                i += 1
+                continue
+
+            reads = list()
+            while i < len(operations) and IsReadOnly(operations[i]):
+                reads.append(operations[i])
+                i += 1
+            results.extend(executor.map(Trace.Bind(RunBatchOperation), reads))
+
+    result = ResponseData()
+    result.SetData(results)
+    return result.asdict()
+
+
+################################################## STATS ##################################################
+
+
+@app.route("/getCacheStats", methods=["POST"])
+def GetCacheStats():
+    # hits and misses of this worker, size of the cache shared by all workers
+    data = request.json
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if None in [timestamp, hmac_sign]:
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    result = Zimbra.GetCacheStats().asdict()
+    return result
+
+
+@app.route("/getSingleFlightStats", methods=["POST"])
+def GetSingleFlightStats():
+    # reads of this worker and how many of them joined an identical one in flight
+    data = request.json
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if None in [timestamp, hmac_sign]:
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    result = Zimbra.GetSingleFlightStats().asdict()
+    return result
+
+
+@app.route("/getResilienceStats", methods=["POST"])
+def GetResilienceStats():
+    # circuit breaker state, retries and timeouts of this worker's upstream calls
+    data = request.json
+
+    timestamp: str = data.get("timestamp")
+    hmac_sign: str = data.get("hmac_sign")
+
+    if None in [timestamp, hmac_sign]:
+        return ResponseData.GetMissingDataError().asdict()
+
+    if not check_HMAC(data):
+        return ResponseData.GetHMACError().asdict()
+
+    result = Zimbra.GetResilienceStats().asdict()
+    return result
+
+
+@app.route("/metrics", methods=["GET"])
+def GetMetrics():
+    # Prometheus text format, summed over all workers. Unsigned, so that a
+    # scraper can read it, it holds counts and timings only
+    return Response(AppMetrics.Export(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0")
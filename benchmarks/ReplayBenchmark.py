@@ -0,0 +1,213 @@
+# CPU time and allocations of ZimbraAPI's request building and result parsing,
+# replayed from a cassette (CassetteSession) so no server and no network is
+# involved and every run sees the same bytes. --record runs a fixed set of
+# read-only calls once against ZimbraSimulator, started in process, or against
+# the server given with --host, and writes every exchange, secrets scrubbed,
+# together with the calls made. A replay makes the same calls --repeat times
+# in each of --rounds on a ReplaySession with zero latency and reports the CPU
+# and wall time per call of the fastest round and the allocation peak of one
+# call under tracemalloc. With --baseline, the results of an earlier --output
+# are compared and the script exits with 1 if a call got slower or allocates
+# more than --tolerance allows. Requests are matched on their body, a call
+# whose request is no longer built as recorded fails with a cassette miss. The
+# allocation peak repeats exactly from run to run, CPU time only on a quiet
+# machine, compare against a baseline taken on the same one
+# Run from the repository root:
+#   python benchmarks/ReplayBenchmark.py --record /tmp/zimbra.cassette.gz --accounts 100000
+#   python benchmarks/ReplayBenchmark.py /tmp/zimbra.cassette.gz --output base.json
+#   python benchmarks/ReplayBenchmark.py /tmp/zimbra.cassette.gz --baseline base.json
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from time import perf_counter, process_time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ZimbraAPI import ZimbraAPI
+from CassetteSession import RecordingSession, ReplaySession, CassetteMissError
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+
+KB = 1024
+CALL_WIDTH = 80
+
+
+def Calls(account: str, distrList: str) -> list:
+    # [method, kwargs], reads only, so a capture against production changes nothing
+    return [
+        ["GetAccount", {"accountName": account}],
+        ["GetAccountMembership", {"accountName": account}],
+        ["GetAccounts", {"limit": 1000}],
+        ["GetAccounts", {}],
+        ["GetDistributionList", {"distrListName": distrList}],
+        ["GetDistributionList", {"distrListName": distrList, "countOnly": True}],
+        ["GetDistributionLists", {}],
+        ["GetDistributionListMembership", {"distrListName": distrList}],
+        ["GetMessages", {"accountName": account, "unreadOnly": False, "limit": 100}],
+    ]
+
+
+def CallName(method: str, kwargs: dict) -> str:
+    return f"{method}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})"
+
+
+def NewZimbra(host: str, username: str, password: str, session, transport: str) -> ZimbraAPI:
+    # no cache and no single-flight, every call is built and parsed
+    return ZimbraAPI(
+        host, username, password, session=session, transport=transport, singleFlight=False
+    )
+
+
+def Record(args) -> None:
+    simulator = None
+    host, username, password = args.host, args.username, args.password
+    if not host:
+        simulator = ZimbraSimulator(
+            SimulatedDirectory(args.accounts, args.lists, args.members, args.messages),
+            args.address,
+        )
+        simulator.Start()
+        host, username, password = simulator.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD
+
+    calls = Calls(args.account, args.list)
+    if os.path.exists(args.record):
+        os.remove(args.record)
+    # the password is scrubbed from the AuthRequest, the username is matched on
+    meta = {"calls": calls, "transport": args.transport, "username": username}
+    session = RecordingSession(args.record, meta=meta)
+    zimbra = NewZimbra(host, username, password, session, args.transport)
+
+    try:
+        for method, kwargs in calls:
+            result = getattr(zimbra, method)(**kwargs)
+            status = result.GetErrorCode() if result.IsError() else "ok"
+            print(f"{CallName(method, kwargs):<{CALL_WIDTH}}{status}")
+    finally:
+        if simulator is not None:
+            simulator.Stop()
+    print(f"recorded to {args.record}, {os.path.getsize(args.record) // KB} KB")
+
+
+def Replay(args) -> list:
+    session = ReplaySession(args.cassette, timing="none")
+    meta = session.GetMeta()
+    zimbra = NewZimbra("http://replay", meta["username"], "", session, meta["transport"])
+
+    results = list()
+    for method, kwargs in meta["calls"]:
+        call = getattr(zimbra, method)
+        try:
+            error = call(**kwargs).IsError()  # warm-up, authenticates and resolves names
+        except CassetteMissError as e:
+            results.append({"call": CallName(method, kwargs), "failed": str(e)})
+            continue
+
+        cpu = wall = float("inf")
+        for _ in range(args.rounds):
+            gc.collect()
+            started, cpuStarted = perf_counter(), process_time()
+            for _ in range(args.repeat):
+                call(**kwargs)
+            cpu = min(cpu, process_time() - cpuStarted)
+            wall = min(wall, perf_counter() - started)
+
+        gc.collect()
+        tracemalloc.start()
+        call(**kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append(
+            {
+                "call": CallName(method, kwargs),
+                "error": error,
+                "cpu": round(cpu / args.repeat * 1e6, 1),
+                "wall": round(wall / args.repeat * 1e6, 1),
+                "peakKB": round(peak / KB, 1),
+            }
+        )
+    return results
+
+
+def Regressions(results: list, baseline: list, tolerance: float) -> list:
+    before = {result["call"]: result for result in baseline}
+    regressions = list()
+    for result in results:
+        old = before.get(result["call"])
+        if old is None or "failed" in old or "failed" in result:
+            continue
+        for field in ("cpu", "peakKB"):
+            if old[field] and result[field] > old[field] * (1 + tolerance):
+                regressions.append(
+                    f"{result['call']}: {field} {old[field]} -> {result[field]}"
+                )
+    return regressions
+
+
+HEADER = f"{'call':<{CALL_WIDTH}}{'cpu us':>11}{'wall us':>11}{'peak KB':>10}"
+
+
+def FormatRow(result: dict) -> str:
+    if "failed" in result:
+        return f"{result['call']:<{CALL_WIDTH}}  failed: {result['failed']}"
+    call = result["call"] + (" [error]" if result["error"] else "")
+    return (
+        f"{call:<{CALL_WIDTH}}"
+        f"{result['cpu']:>11.1f}{result['wall']:>11.1f}{result['peakKB']:>10.1f}"
+    )
+
+
+def ParseArgs():
+    parser = argparse.ArgumentParser(
+        description="ZimbraAPI CPU and allocations replayed from a cassette"
+    )
+    parser.add_argument("cassette", nargs="?", help="cassette to replay")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per round")
+    parser.add_argument("--rounds", type=int, default=5, help="the fastest round counts")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", help="an earlier --output to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="0.2 allows 20%% more")
+    parser.add_argument("--record", help="record a new cassette to this file")
+    parser.add_argument("--host", help="server to record from, ZimbraSimulator if not given")
+    parser.add_argument("--username", default=ADMIN_USERNAME)
+    parser.add_argument("--password", default=ADMIN_PASSWORD)
+    parser.add_argument("--account", default=f"user1@{DOMAIN}")
+    parser.add_argument("--list", default=f"list0@{DOMAIN}")
+    parser.add_argument("--transport", choices=["xml", "json"], default="xml")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+    if not args.record and not args.cassette:
+        parser.error("a cassette to replay or --record is required")
+    return args
+
+
+if __name__ == "__main__":
+    args = ParseArgs()
+    if args.record:
+        Record(args)
+        sys.exit()
+
+    print(HEADER)
+    results = Replay(args)
+    for result in results:
+        print(FormatRow(result))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    failed = any("failed" in result for result in results)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = Regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,619 @@
+# Throughput, p50/p99 latency and peak RSS of ZimbraAPI methods and app.py routes
+# against ZimbraSimulator, so the effect of a change can be measured without a
+# live Zimbra. The simulator runs in a process of its own and every case in a
+# fresh one, so the peak RSS of a case is its own and cases share no state. The
+# clients are built without the response cache and single-flight, every call
+# reaches the simulator. Route cases call app.py in process through Flask's
+# test client, with its ZimbraAPI replaced by one talking to the simulator
+# (batching and single-flight as in app.py, no cache); app.py is given the
+# simulator's settings instead of config.py. "upstream" is the number of HTTP requests
+# the simulator received per call, "growth" the peak RSS over the one after the
+# imports. Cases are selected with shell-style patterns
+# Run from the repository root:
+#   python benchmarks/ZimbraBenchmark.py --accounts 100000 --lists 20 --members 50000
+#   python benchmarks/ZimbraBenchmark.py --cases "GetAccount*" "/get*" --latency 0.005
+import argparse
+import asyncio
+import contextlib
+import fnmatch
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter, sleep, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from ZimbraAPI import ZimbraAPI, ResponseData
+from AsyncZimbraAPI import AsyncZimbraAPI
+from WaitSetListener import WaitSetListener
+from ZimbraSimulator import ADMIN_PORT, ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from ZimbraSimulator import InstallAppConfig
+
+SIMULATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ZimbraSimulator.py")
+SIMULATOR_START_TIMEOUT = 300
+MB = 1024 * 1024
+
+ROUTE_BATCH_WINDOW = 0.005  # as app.py
+BATCH_OPERATIONS = 20  # getAccount operations per /batch call
+MEMBERS_CHANGED = 100  # members added and removed per SyncDistributionListMembers call
+MEMBERS_ADDED = 1000  # addresses per AddDistributionListMembers call
+WAIT_TIMEOUT = 10  # seconds a WaitForChanges case waits for a change
+
+
+def AccountName(args, i: int) -> str:
+    # a prime stride spreads consecutive calls over the directory
+    return f"user{(i * 7919) % args.accounts}@{DOMAIN}"
+
+
+def ListName(args, i: int) -> str:
+    return f"list{i % args.lists}@{DOMAIN}"
+
+
+def ListMembers(args, j: int) -> list:
+    # the synthetic members of list j, as SimulatedDirectory builds them
+    count = min(args.members, args.accounts)
+    return [f"user{(j * count + k) % args.accounts}@{DOMAIN}" for k in range(count)]
+
+
+def NewZimbra(args, **options) -> ZimbraAPI:
+    # identical concurrent reads would share one request, ZimbraAPI cases time
+    # every call on its own
+    options = {"singleFlight": False, **options}
+    zimbra = ZimbraAPI(
+        args.host, ADMIN_USERNAME, ADMIN_PASSWORD, transport=args.transport, **options
+    )
+    # authenticates and opens a connection before anything is timed
+    zimbra.GetAccount(accountName=AccountName(args, 0))
+    return zimbra
+
+
+def IsError(result) -> bool:
+    if isinstance(result, ResponseData):
+        return result.IsError()
+    return not isinstance(result, dict) or "error" in result
+
+
+################################################## ZIMBRAAPI CASES ##################################################
+
+
+@contextlib.contextmanager
+def GetAccount(args, calls: int, batchWindow: float = 0):
+    zimbra = NewZimbra(args, batchWindow=batchWindow)
+    yield lambda i: zimbra.GetAccount(accountName=AccountName(args, i))
+
+
+@contextlib.contextmanager
+def GetAccountMembership(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.GetAccountMembership(accountName=AccountName(args, i))
+
+
+@contextlib.contextmanager
+def GetAccounts(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.GetAccounts()
+
+
+@contextlib.contextmanager
+def CreateAccount(args, calls: int):
+    zimbra = NewZimbra(args)
+    tag = uuid.uuid4().hex[:8]
+    yield lambda i: zimbra.CreateAccount(
+        f"bench-{tag}-{i}@{DOMAIN}", "password", "Bench", str(i)
+    )
+
+
+@contextlib.contextmanager
+def ModifyAccount(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.ModifyAccount(
+        {"description": f"benchmark {i}"}, accountName=AccountName(args, i)
+    )
+
+
+@contextlib.contextmanager
+def DeleteAccount(args, calls: int):
+    # the accounts are created before the timing starts
+    zimbra = NewZimbra(args)
+    tag = uuid.uuid4().hex[:8]
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(
+            executor.map(
+                lambda i: zimbra.CreateAccount(
+                    f"bench-{tag}-{i}@{DOMAIN}", "password", "Bench", str(i)
+                ),
+                range(calls),
+            )
+        )
+    yield lambda i: zimbra.DeleteAccount(accountName=f"bench-{tag}-{i}@{DOMAIN}")
+
+
+@contextlib.contextmanager
+def GetDistributionList(args, calls: int, countOnly: bool = False):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.GetDistributionList(
+        distrListName=ListName(args, i), countOnly=countOnly
+    )
+
+
+@contextlib.contextmanager
+def GetDistributionLists(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.GetDistributionLists()
+
+
+@contextlib.contextmanager
+def AddDistributionListMembers(args, calls: int):
+    zimbra = NewZimbra(args)
+    tag = uuid.uuid4().hex[:8]
+    yield lambda i: zimbra.AddDistributionListMembers(
+        [f"bench-{tag}-{i}-{k}@external.test" for k in range(MEMBERS_ADDED)],
+        distrListName=ListName(args, i),
+    )
+
+
+@contextlib.contextmanager
+def SyncDistributionListMembers(args, calls: int):
+    # every call drops MEMBERS_CHANGED members of a list and adds as many
+    zimbra = NewZimbra(args)
+    tag = uuid.uuid4().hex[:8]
+    desired = [
+        ListMembers(args, i % args.lists)[MEMBERS_CHANGED:]
+        + [f"bench-{tag}-{k}@external.test" for k in range(MEMBERS_CHANGED)]
+        for i in range(min(calls, args.lists))
+    ]
+    yield lambda i: zimbra.SyncDistributionListMembers(
+        desired[i % len(desired)], distrListName=ListName(args, i)
+    )
+
+
+@contextlib.contextmanager
+def SendMessage(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.SendMessage(
+        AccountName(args, i), AccountName(args, i + 1), f"Benchmark {i}", "Benchmark message"
+    )
+
+
+@contextlib.contextmanager
+def GetMessages(args, calls: int):
+    zimbra = NewZimbra(args)
+    yield lambda i: zimbra.GetMessages(AccountName(args, i))
+
+
+def AccountIDs(zimbra: ZimbraAPI, args, calls: int) -> list:
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        return list(
+            executor.map(
+                lambda i: zimbra.GetAccount(accountName=AccountName(args, i)).GetData()["id"],
+                range(calls),
+            )
+        )
+
+
+def WatchAndDeliver(zimbra: ZimbraAPI, args, calls: int, wait):
+    # A call watches a new account, waits until the listener reports it as
+    # covered, delivers a message to it and waits for that change. A change
+    # that is not reported within WAIT_TIMEOUT is an error.
+    # wait(accountIDs, seq) returns {"seq", "accounts"}
+    accountIDs = AccountIDs(zimbra, args, calls)
+
+    def call(i: int):
+        accountID = accountIDs[i]
+        registered = wait([accountID], 0)
+        if accountID not in registered["accounts"]:
+            return {"error": "account not reported as covered"}
+
+        zimbra.SendMessage(
+            AccountName(args, i + 1), AccountName(args, i), f"Benchmark {i}", "Benchmark message"
+        )
+        changed = wait([accountID], registered["seq"])
+        if accountID not in changed["accounts"]:
+            return {"error": "delivery not reported"}
+        return changed
+
+    return call
+
+
+@contextlib.contextmanager
+def WaitForChanges(args, calls: int):
+    zimbra = NewZimbra(args)
+    listener = WaitSetListener(zimbra)
+    listener.Start()
+
+    def wait(accountIDs: list, seq: str) -> dict:
+        listener.Watch(accountIDs)
+        return listener.WaitForChanges(accountIDs, seq, WAIT_TIMEOUT).GetData()
+
+    try:
+        yield WatchAndDeliver(zimbra, args, calls, wait)
+    finally:
+        listener.Stop()
+
+
+################################################## ASYNCZIMBRAAPI CASES ##################################################
+
+
+@contextlib.asynccontextmanager
+async def AsyncGetAccount(args, calls: int):
+    async with AsyncZimbraAPI(
+        args.host,
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        transport=args.transport,
+        singleFlight=False,
+    ) as zimbra:
+        await zimbra.GetAccount(accountName=AccountName(args, 0))
+        yield lambda i: zimbra.GetAccount(accountName=AccountName(args, i))
+
+
+@contextlib.asynccontextmanager
+async def AsyncGetDistributionList(args, calls: int):
+    async with AsyncZimbraAPI(
+        args.host,
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        transport=args.transport,
+        singleFlight=False,
+    ) as zimbra:
+        await zimbra.GetAccount(accountName=AccountName(args, 0))
+        yield lambda i: zimbra.GetDistributionList(distrListName=ListName(args, i))
+
+
+################################################## ROUTE CASES ##################################################
+
+
+def PostRoute(app, clients: threading.local, path: str, body: dict) -> dict:
+    if not hasattr(clients, "client"):
+        clients.client = app.app.test_client()
+
+    data = {**body, "timestamp": int(time())}
+    data["hmac_sign"] = app.calculate_HMAC(
+        json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+    # sent as serialized here, the test client would sort the keys
+    return clients.client.post(
+        path,
+        data=json.dumps(data, ensure_ascii=False).encode("utf-8"),
+        content_type="application/json",
+    ).get_json()
+
+
+def ImportApp(args):
+    InstallAppConfig(args.host)
+    import app
+
+    return app
+
+
+def Route(path: str, payload):
+    # payload(args, i) is the request body without the signature
+    @contextlib.contextmanager
+    def case(args, calls: int):
+        app = ImportApp(args)
+
+        app.Zimbra = NewZimbra(args, batchWindow=ROUTE_BATCH_WINDOW, singleFlight=True)
+        clients = threading.local()
+        yield lambda i: PostRoute(app, clients, path, payload(args, i))
+
+    return case
+
+
+@contextlib.contextmanager
+def WaitForChangesRoute(args, calls: int):
+    # the long-poll of app.py, with WaitForChanges' watch-and-deliver calls
+    app = ImportApp(args)
+
+    app.Zimbra = NewZimbra(args, batchWindow=ROUTE_BATCH_WINDOW, singleFlight=True)
+    app.Listener = WaitSetListener(app.Zimbra)
+    clients = threading.local()
+
+    def wait(accountIDs: list, seq: str) -> dict:
+        body = {"accountIDs": accountIDs, "seq": seq, "timeout": WAIT_TIMEOUT}
+        result = PostRoute(app, clients, "/waitForChanges", body)
+        return result.get("data") or {"seq": seq, "accounts": []}
+
+    try:
+        yield WatchAndDeliver(app.Zimbra, args, calls, wait)
+    finally:
+        app.Listener.Stop()
+
+
+CASES = {
+    # name: (case, heavy - runs --heavy-calls times instead of --calls)
+    "GetAccount": (GetAccount, False),
+    "GetAccount+batch": (
+        lambda args, calls: GetAccount(args, calls, ROUTE_BATCH_WINDOW),
+        False,
+    ),
+    "GetAccountMembership": (GetAccountMembership, False),
+    "GetAccounts": (GetAccounts, True),
+    "CreateAccount": (CreateAccount, False),
+    "ModifyAccount": (ModifyAccount, False),
+    "DeleteAccount": (DeleteAccount, False),
+    "GetDistributionList": (GetDistributionList, True),
+    "GetDistributionList+countOnly": (
+        lambda args, calls: GetDistributionList(args, calls, countOnly=True),
+        False,
+    ),
+    "GetDistributionLists": (GetDistributionLists, False),
+    "AddDistributionListMembers": (AddDistributionListMembers, True),
+    "SyncDistributionListMembers": (SyncDistributionListMembers, True),
+    "SendMessage": (SendMessage, False),
+    "GetMessages": (GetMessages, False),
+    "WaitForChanges": (WaitForChanges, False),
+    "async GetAccount": (AsyncGetAccount, False),
+    "async GetDistributionList": (AsyncGetDistributionList, True),
+    "/getAccount": (
+        Route("/getAccount", lambda args, i: {"accountName": AccountName(args, i)}),
+        False,
+    ),
+    "/modifyAccount": (
+        Route(
+            "/modifyAccount",
+            lambda args, i: {
+                "accountName": AccountName(args, i),
+                "params": {"description": f"benchmark {i}"},
+            },
+        ),
+        False,
+    ),
+    "/getAccounts": (Route("/getAccounts", lambda args, i: {}), True),
+    "/getDistributionList": (
+        Route("/getDistributionList", lambda args, i: {"distrListName": ListName(args, i)}),
+        True,
+    ),
+    "/sendMessage": (
+        Route(
+            "/sendMessage",
+            lambda args, i: {
+                "senderAccountName": AccountName(args, i),
+                "receiverAccountName": AccountName(args, i + 1),
+                "subject": f"Benchmark {i}",
+                "content": "Benchmark message",
+            },
+        ),
+        False,
+    ),
+    "/getMessages": (
+        Route("/getMessages", lambda args, i: {"accountName": AccountName(args, i)}),
+        False,
+    ),
+    "/waitForChanges": (WaitForChangesRoute, False),
+    "/batch": (
+        Route(
+            "/batch",
+            lambda args, i: {
+                "operations": [
+                    {"op": "getAccount", "accountName": AccountName(args, i * BATCH_OPERATIONS + k)}
+                    for k in range(BATCH_OPERATIONS)
+                ]
+            },
+        ),
+        False,
+    ),
+}
+
+
+################################################## MEASUREMENT ##################################################
+
+
+def PeakRSS() -> int:
+    # bytes, ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def Percentile(values: list, q: float) -> float:
+    # nearest rank of sorted values
+    return values[max(0, math.ceil(q * len(values)) - 1)] if values else 0
+
+
+def UpstreamRequests(args) -> int:
+    return requests.get(f"{args.host}:{ADMIN_PORT}/simulator/stats", timeout=5).json()["total"]
+
+
+def Measure(call, calls: int, concurrency: int) -> tuple:
+    def timed(i: int) -> tuple:
+        started = perf_counter()
+        try:
+            error = IsError(call(i))
+        except Exception:
+            error = True
+        return perf_counter() - started, error
+
+    started = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(timed, range(calls)))
+    return results, perf_counter() - started
+
+
+async def MeasureAsync(call, calls: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> tuple:
+        async with semaphore:
+            started = perf_counter()
+            try:
+                error = IsError(await call(i))
+            except Exception:
+                error = True
+            return perf_counter() - started, error
+
+    started = perf_counter()
+    results = await asyncio.gather(*[timed(i) for i in range(calls)])
+    return results, perf_counter() - started
+
+
+async def RunAsyncCase(context, args, calls: int) -> tuple:
+    async with context as call:
+        before = UpstreamRequests(args)
+        results, seconds = await MeasureAsync(call, calls, args.concurrency)
+        return results, seconds, UpstreamRequests(args) - before
+
+
+def RunCase(args) -> dict:
+    # runs in the child process started for the case
+    case, heavy = CASES[args.case]
+    calls = args.heavy_calls if heavy else args.calls
+    importedRSS = PeakRSS()
+
+    context = case(args, calls)
+    if isinstance(context, contextlib.AbstractAsyncContextManager):
+        results, seconds, upstream = asyncio.run(RunAsyncCase(context, args, calls))
+    else:
+        with context as call:
+            before = UpstreamRequests(args)
+            results, seconds = Measure(call, calls, args.concurrency)
+            upstream = UpstreamRequests(args) - before
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "case": args.case,
+        "calls": calls,
+        "errors": sum(error for _, error in results),
+        "opsPerSecond": round(calls / seconds, 2) if seconds else 0,
+        "p50": round(Percentile(latencies, 0.5) * 1000, 3),
+        "p99": round(Percentile(latencies, 0.99) * 1000, 3),
+        "upstream": round(upstream / calls, 2),
+        "peakRSS": round(PeakRSS() / MB, 1),
+        "growthRSS": round((PeakRSS() - importedRSS) / MB, 1),
+    }
+
+
+################################################## RUNNER ##################################################
+
+
+def StartSimulator(args) -> subprocess.Popen:
+    try:
+        UpstreamRequests(args)
+    except requests.exceptions.RequestException:
+        pass
+    else:
+        raise RuntimeError(
+            f"{args.host}:{ADMIN_PORT} already answers, stop it or pass --external"
+        )
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            SIMULATOR_PATH,
+            "--address", args.address,
+            "--accounts", str(args.accounts),
+            "--lists", str(args.lists),
+            "--members", str(args.members),
+            "--messages", str(args.messages),
+            "--latency", str(args.latency),
+            "--jitter", str(args.jitter),
+            "--fault-rate", str(args.fault_rate),
+            "--unavailable-rate", str(args.unavailable_rate),
+            "--seed", str(args.seed),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+
+    deadline = monotonic() + SIMULATOR_START_TIMEOUT
+    while True:
+        try:
+            UpstreamRequests(args)
+            return process
+        except requests.exceptions.RequestException:
+            if process.poll() is not None:
+                raise RuntimeError("the simulator exited, see its output above")
+            if monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("the simulator did not start in time")
+            sleep(0.1)
+
+
+def RunCaseProcess(args, name: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--case", name],
+        capture_output=True,
+        text=True,
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        stderr = completed.stderr.strip().splitlines()
+        return {"case": name, "failed": stderr[-1] if stderr else f"exit {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+HEADER = (
+    f"{'case':<32}{'calls':>7}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    f"{'upstream':>10}{'peak MB':>9}{'growth MB':>11}"
+)
+
+
+def FormatRow(result: dict) -> str:
+    if "failed" in result:
+        return f"{result['case']:<32}  failed: {result['failed']}"
+    return (
+        f"{result['case']:<32}{result['calls']:>7}{result['errors']:>8}"
+        f"{result['opsPerSecond']:>10.1f}{result['p50']:>10.2f}{result['p99']:>10.2f}"
+        f"{result['upstream']:>10.2f}{result['peakRSS']:>9.1f}{result['growthRSS']:>11.1f}"
+    )
+
+
+def ParseArgs():
+    parser = argparse.ArgumentParser(description="ZimbraAPI benchmarks against ZimbraSimulator")
+    parser.add_argument("--cases", nargs="*", default=["*"], help="patterns of case names")
+    parser.add_argument("--list", action="store_true", help="print the case names")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--heavy-calls", type=int, default=5, help="calls of whole-directory cases")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--transport", choices=["xml", "json"], default="xml")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--external", action="store_true", help="use a simulator already running")
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0, help="seconds")
+    parser.add_argument("--fault-rate", type=float, default=0)
+    parser.add_argument("--unavailable-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # set for the case processes
+    args = parser.parse_args()
+    args.host = f"http://{args.address}"
+    return args
+
+
+if __name__ == "__main__":
+    args = ParseArgs()
+    if args.case:
+        print(json.dumps(RunCase(args)))
+        sys.exit()
+
+    names = [
+        name for name in CASES if any(fnmatch.fnmatchcase(name, p) for p in args.cases)
+    ]
+    if args.list:
+        print("\n".join(names))
+        sys.exit()
+
+    simulator = None if args.external else StartSimulator(args)
+    results = list()
+    try:
+        print(HEADER)
+        for name in names:
+            results.append(RunCaseProcess(args, name))
+            print(FormatRow(results[-1]), flush=True)
+    finally:
+        if simulator is not None:
+            simulator.terminate()
+            simulator.wait()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"args": vars(args), "results": results}, file, indent=2)
@@ -0,0 +1,980 @@
+# Local stand-in for the Zimbra endpoints this project calls, so ZimbraAPI can be
+# measured without a live server (see ZimbraBenchmark.py). It answers the admin
+# SOAP requests, sent as XML or JSON envelopes, with JSON bodies as Zimbra does
+# for <format type="js"/>, and the REST /home/<account>/inbox, all on
+# <address>:7071, the port ZimbraAPI talks to by default. The directory is synthetic
+# and held in memory: accounts user<i>@<domain> and lists list<j>@<domain> of
+# `members` accounts each. Every answer can be delayed by latency plus up to
+# jitter seconds, and a share of the requests answered with a service.FAILURE
+# fault or with a bare 503, as a proxy in front of a restarting mailbox server
+# would. GET /simulator/stats counts the requests received per request name
+# Run from the repository root:
+#   python benchmarks/ZimbraSimulator.py --accounts 100000 --lists 20 --members 50000
+import argparse
+import collections
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import types
+import uuid
+import xml.etree.ElementTree as ElementTree
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ADMIN_PORT = 7071
+DOMAIN = "example.com"
+ADMIN_USERNAME = "admin@example.com"
+ADMIN_PASSWORD = "password"
+
+ACCOUNT_ID_PREFIX = "00000000-0000-4000-8000-"
+LIST_ID_PREFIX = "00000000-0000-4000-9000-"
+
+INBOX_ID = "2"
+FIRST_MESSAGE_ID = 257  # lower ids are taken by Zimbra's system folders
+MESSAGES_START = 1700000000000  # date of the oldest synthetic message, ms
+CHANGE_LOG_SIZE = 100000  # mailbox changes kept for WaitSets
+
+INBOX_PATH = re.compile(r"^(?:/service)?/home/([^/]+)/inbox/?$")
+SOAP_PATHS = ("/service/admin/soap", "/service/soap")
+
+
+class SoapFault(Exception):
+    def __init__(self, code: str, text: str) -> None:
+        super().__init__(text)
+        self.Code = code
+        self.Text = text
+
+    def asdict(self) -> dict:
+        return {
+            "Code": {"Value": "soap:Receiver" if self.Code == "service.FAILURE" else "soap:Sender"},
+            "Reason": {"Text": self.Text},
+            "Detail": {"Error": {"_jsns": "urn:zimbra", "Code": self.Code}},
+        }
+
+
+def LocalName(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def ElementContent(element) -> dict:
+    # An XML element in the form of the JSON envelope: attributes as keys, text
+    # as "_content", child elements as lists
+    content = dict(element.attrib)
+    for child in element:
+        content.setdefault(LocalName(child.tag), []).append(ElementContent(child))
+    if len(element) == 0 and element.text:
+        content["_content"] = element.text
+    return content
+
+
+def ParseEnvelope(body: bytes) -> tuple:
+    # (request name, request content, header context) of either envelope format
+    if body.lstrip()[:1] == b"{":
+        envelope = json.loads(body)
+        context = envelope.get("Header", {}).get("context", {})
+        name, content = next(iter(envelope["Body"].items()))
+        return name, content, context
+
+    root = ElementTree.fromstring(body)
+    parts = {LocalName(child.tag): child for child in root}
+    context = dict()
+    if "Header" in parts and len(parts["Header"]):
+        context = ElementContent(parts["Header"][0])
+    request = parts["Body"][0]
+    return LocalName(request.tag), ElementContent(request), context
+
+
+def Nodes(content: dict, key: str) -> list:
+    # child elements under key as a list of dicts, whichever form they came in
+    value = content.get(key, [])
+    if not isinstance(value, list):
+        value = [value]
+    return [item if isinstance(item, dict) else {"_content": item} for item in value]
+
+
+def Text(content: dict, key: str, default: str = "") -> str:
+    nodes = Nodes(content, key)
+    return str(nodes[0].get("_content", default)) if nodes else default
+
+
+def Attrs(content: dict) -> dict:
+    # <a n="name">value</a> elements, a dict of them is accepted as well
+    if isinstance(content.get("a"), dict):
+        return {name: str(value) for name, value in content["a"].items()}
+    return {item["n"]: str(item.get("_content", "")) for item in Nodes(content, "a")}
+
+
+def AttrList(attrs: dict) -> list:
+    return [{"n": name, "_content": value} for name, value in attrs.items()]
+
+
+def Flag(content: dict, key: str) -> bool:
+    return str(content.get(key, "0")).lower() in ("1", "true")
+
+
+class SimulatedDirectory:
+    # Synthetic accounts and distribution lists with their mailboxes. List j
+    # holds accounts j*members ... j*members+members-1, wrapping around the
+    # directory. Account attributes are derived from the name until they are
+    # modified. Every inbox starts with `messages` messages, the newer half
+    # unread, followed by the ones sent to it. Requests are handled one at a
+    # time, a blocking AdminWaitSetRequest lets the others through while it waits
+    def __init__(
+        self,
+        accounts: int = 10000,
+        lists: int = 100,
+        members: int = 1000,
+        messages: int = 20,
+        domain: str = DOMAIN,
+    ) -> None:
+        self.__Domain = domain
+        self.__Messages = messages
+        self.__Lock = threading.Lock()
+        self.__Changed = threading.Condition(self.__Lock)
+
+        self.__Accounts = dict()  # id -> {"id", "name", "a": attrs, None until modified}
+        self.__AccountIDs = dict()  # lowercase name -> id
+        self.__Lists = dict()  # id -> {"id", "name", "a", "members": lowercase -> address}
+        self.__ListIDs = dict()  # lowercase name -> id
+        self.__Inboxes = dict()  # account id -> messages sent to it
+        self.__NextMessageID = FIRST_MESSAGE_ID + messages
+
+        self.__WaitSets = dict()  # id -> watched account ids
+        self.__WaitSetRequests = dict()  # id -> number of AdminWaitSetRequests
+        self.__ChangeSeq = 0
+        self.__ChangeLog = collections.deque(maxlen=CHANGE_LOG_SIZE)  # (seq, account id)
+
+        names = [f"user{i}@{domain}" for i in range(accounts)]
+        for i, name in enumerate(names):
+            self.__AddAccount(f"{ACCOUNT_ID_PREFIX}{i:012d}", name, None)
+
+        count = min(members, accounts)
+        for j in range(lists):
+            start = j * count
+            listMembers = {
+                names[(start + k) % accounts]: names[(start + k) % accounts]
+                for k in range(count)
+            }
+            self.__AddList(
+                f"{LIST_ID_PREFIX}{j:012d}",
+                f"list{j}@{domain}",
+                {"displayName": f"List {j}", "zimbraMailStatus": "enabled"},
+                listMembers,
+            )
+
+        self.__Handlers = {
+            "GetAccountRequest": self.__GetAccount,
+            "SearchDirectoryRequest": self.__SearchDirectory,
+            "CreateAccountRequest": self.__CreateAccount,
+            "DeleteAccountRequest": self.__DeleteAccount,
+            "ModifyAccountRequest": self.__ModifyAccount,
+            "RenameAccountRequest": self.__RenameAccount,
+            "SetPasswordRequest": self.__SetPassword,
+            "GetAccountMembershipRequest": self.__GetAccountMembership,
+            "DelegateAuthRequest": self.__DelegateAuth,
+            "CreateDistributionListRequest": self.__CreateDistributionList,
+            "DeleteDistributionListRequest": self.__DeleteDistributionList,
+            "ModifyDistributionListRequest": self.__ModifyDistributionList,
+            "RenameDistributionListRequest": self.__RenameDistributionList,
+            "GetDistributionListRequest": self.__GetDistributionList,
+            "GetDistributionListMembershipRequest": self.__GetDistributionListMembership,
+            "AddDistributionListMemberRequest": self.__AddDistributionListMember,
+            "RemoveDistributionListMemberRequest": self.__RemoveDistributionListMember,
+            "GetFolderRequest": self.__GetFolder,
+            "SearchRequest": self.__Search,
+            "SyncRequest": self.__Sync,
+            "SendMsgRequest": self.__SendMsg,
+            "AdminCreateWaitSetRequest": self.__CreateWaitSet,
+            "AdminWaitSetRequest": self.__WaitSet,
+            "AdminDestroyWaitSetRequest": self.__DestroyWaitSet,
+        }
+
+    def Handle(self, requestName: str, content: dict, targetAccount: str = "") -> dict:
+        # content of the response to one request, a SoapFault if it fails
+        handler = self.__Handlers.get(requestName)
+        if handler is None:
+            raise SoapFault("service.UNKNOWN_DOCUMENT", f"unknown document: {requestName}")
+
+        with self.__Lock:
+            try:
+                return handler(content, targetAccount)
+            except (KeyError, ValueError, TypeError, IndexError) as e:
+                raise SoapFault("service.INVALID_REQUEST", f"invalid request: {e!r}")
+
+    def GetInbox(self, accountName: str, unreadOnly: bool = False) -> list:
+        # messages newest first, None for an unknown account
+        with self.__Lock:
+            accountID = self.__AccountIDs.get(accountName.lower())
+            if accountID is None:
+                return None
+            messages = self.__InboxMessages(accountID)
+        if unreadOnly:
+            messages = [message for message in messages if "u" in message["f"]]
+        return messages[::-1]
+
+    def GetSize(self) -> dict:
+        with self.__Lock:
+            return {"accounts": len(self.__Accounts), "lists": len(self.__Lists)}
+
+    ################################################## DIRECTORY ##################################################
+
+    def __AddAccount(self, accountID: str, name: str, attrs) -> dict:
+        account = {"id": accountID, "name": name, "a": attrs}
+        self.__Accounts[accountID] = account
+        self.__AccountIDs[name.lower()] = accountID
+        return account
+
+    def __AddList(self, listID: str, name: str, attrs: dict, members: dict) -> dict:
+        distrList = {"id": listID, "name": name, "a": attrs, "members": members}
+        self.__Lists[listID] = distrList
+        self.__ListIDs[name.lower()] = listID
+        return distrList
+
+    @staticmethod
+    def __DefaultAttrs(name: str) -> dict:
+        localPart = name.split("@")[0]
+        return {
+            "displayName": f"Synthetic {localPart}",
+            "givenName": localPart,
+            "sn": "Synthetic",
+            "description": f"Synthetic account {localPart}",
+            "zimbraAccountStatus": "active",
+            "zimbraMailStatus": "enabled",
+            "zimbraIsAdminAccount": "FALSE",
+            "zimbraLastLogonTimestamp": "20240101000000Z",
+        }
+
+    @staticmethod
+    def __Selected(attrs: dict, content: dict) -> dict:
+        # only the attributes named in the request's attrs, all without it
+        names = [name for name in str(content.get("attrs", "")).split(",") if name]
+        if not names:
+            return attrs
+        return {name: attrs[name] for name in names if name in attrs}
+
+    def __AccountItem(self, account: dict, content: dict = None) -> dict:
+        attrs = account["a"] if account["a"] is not None else self.__DefaultAttrs(account["name"])
+        attrs = {"zimbraId": account["id"], "mail": account["name"], **attrs}
+        return {
+            "name": account["name"],
+            "id": account["id"],
+            "a": AttrList(self.__Selected(attrs, content if content else {})),
+        }
+
+    def __ListItem(self, distrList: dict, content: dict = None) -> dict:
+        attrs = {"zimbraId": distrList["id"], "mail": distrList["name"], **distrList["a"]}
+        return {
+            "name": distrList["name"],
+            "id": distrList["id"],
+            "dynamic": False,
+            "a": AttrList(self.__Selected(attrs, content if content else {})),
+        }
+
+    @staticmethod
+    def __Selector(content: dict, key: str) -> tuple:
+        nodes = Nodes(content, key)
+        if not nodes:
+            raise SoapFault("service.INVALID_REQUEST", f"invalid request: missing {key}")
+        return nodes[0].get("by", "name"), str(nodes[0].get("_content", ""))
+
+    def __FindAccount(self, by: str, value: str) -> dict:
+        accountID = value if by == "id" else self.__AccountIDs.get(value.lower())
+        account = self.__Accounts.get(accountID)
+        if account is None:
+            raise SoapFault("account.NO_SUCH_ACCOUNT", f"no such account: {value}")
+        return account
+
+    def __FindList(self, by: str, value: str) -> dict:
+        listID = value if by == "id" else self.__ListIDs.get(value.lower())
+        distrList = self.__Lists.get(listID)
+        if distrList is None:
+            raise SoapFault(
+                "account.NO_SUCH_DISTRIBUTION_LIST", f"no such distribution list: {value}"
+            )
+        return distrList
+
+    def __CheckNewName(self, name: str) -> None:
+        if "@" not in name:
+            raise SoapFault(
+                "service.INVALID_REQUEST", f"invalid request: must be valid email address: {name}"
+            )
+        if name.lower() in self.__AccountIDs:
+            raise SoapFault("account.ACCOUNT_EXISTS", f"email address already exists: {name}")
+        if name.lower() in self.__ListIDs:
+            raise SoapFault(
+                "account.DISTRIBUTION_LIST_EXISTS", f"email address already exists: {name}"
+            )
+
+    def __RenameMember(self, oldName: str, newName: str = None) -> None:
+        for distrList in self.__Lists.values():
+            if distrList["members"].pop(oldName.lower(), None) is not None and newName:
+                distrList["members"][newName.lower()] = newName
+
+    ################################################## ACCOUNTS ##################################################
+
+    def __GetAccount(self, content: dict, targetAccount: str) -> dict:
+        account = self.__FindAccount(*self.__Selector(content, "account"))
+        return {"account": [self.__AccountItem(account, content)]}
+
+    def __SearchDirectory(self, content: dict, targetAccount: str) -> dict:
+        # the query is not evaluated, every object of the requested types matches
+        offset = int(content.get("offset", 0))
+        limit = int(content.get("limit", 0))
+        if "accounts" in str(content.get("types", "accounts")):
+            key, objects, item = "account", list(self.__Accounts.values()), self.__AccountItem
+        else:
+            key, objects, item = "dl", list(self.__Lists.values()), self.__ListItem
+
+        page = objects[offset : offset + limit] if limit else objects[offset:]
+        return {
+            key: [item(entry, content) for entry in page],
+            "more": offset + len(page) < len(objects),
+            "searchTotal": len(objects),
+        }
+
+    def __CreateAccount(self, content: dict, targetAccount: str) -> dict:
+        name = Text(content, "name")
+        self.__CheckNewName(name)
+        account = self.__AddAccount(
+            str(uuid.uuid4()), name, {**self.__DefaultAttrs(name), **Attrs(content)}
+        )
+        return {"account": [self.__AccountItem(account)]}
+
+    def __DeleteAccount(self, content: dict, targetAccount: str) -> dict:
+        account = self.__FindAccount("id", Text(content, "id"))
+        del self.__Accounts[account["id"]]
+        del self.__AccountIDs[account["name"].lower()]
+        self.__Inboxes.pop(account["id"], None)
+        self.__RenameMember(account["name"])
+        return {}
+
+    def __ModifyAccount(self, content: dict, targetAccount: str) -> dict:
+        account = self.__FindAccount("id", Text(content, "id"))
+        if account["a"] is None:
+            account["a"] = self.__DefaultAttrs(account["name"])
+        account["a"].update(Attrs(content))
+        return {"account": [self.__AccountItem(account)]}
+
+    def __RenameAccount(self, content: dict, targetAccount: str) -> dict:
+        account = self.__FindAccount("id", Text(content, "id"))
+        newName = Text(content, "newName")
+        self.__CheckNewName(newName)
+
+        if account["a"] is None:
+            account["a"] = self.__DefaultAttrs(account["name"])
+        del self.__AccountIDs[account["name"].lower()]
+        self.__RenameMember(account["name"], newName)
+        account["name"] = newName
+        self.__AccountIDs[newName.lower()] = account["id"]
+        return {"account": [self.__AccountItem(account)]}
+
+    def __SetPassword(self, content: dict, targetAccount: str) -> dict:
+        self.__FindAccount("id", Text(content, "id"))
+        return {}
+
+    def __GetAccountMembership(self, content: dict, targetAccount: str) -> dict:
+        account = self.__FindAccount(*self.__Selector(content, "account"))
+        name = account["name"].lower()
+        return {
+            "dl": [
+                {"name": distrList["name"], "id": distrList["id"], "dynamic": False}
+                for distrList in self.__Lists.values()
+                if name in distrList["members"]
+            ]
+        }
+
+    def __DelegateAuth(self, content: dict, targetAccount: str) -> dict:
+        self.__FindAccount(*self.__Selector(content, "account"))
+        return {"authToken": [{"_content": uuid.uuid4().hex}], "lifetime": 86400000}
+
+    ################################################## DISTRIBUTION LISTS ##################################################
+
+    def __CreateDistributionList(self, content: dict, targetAccount: str) -> dict:
+        name = Text(content, "name")
+        self.__CheckNewName(name)
+        distrList = self.__AddList(str(uuid.uuid4()), name, Attrs(content), dict())
+        return {"dl": [self.__ListItem(distrList)]}
+
+    def __DeleteDistributionList(self, content: dict, targetAccount: str) -> dict:
+        distrList = self.__FindList("id", Text(content, "id"))
+        del self.__Lists[distrList["id"]]
+        del self.__ListIDs[distrList["name"].lower()]
+        return {}
+
+    def __ModifyDistributionList(self, content: dict, targetAccount: str) -> dict:
+        distrList = self.__FindList("id", Text(content, "id"))
+        distrList["a"].update(Attrs(content))
+        return {"dl": [self.__ListItem(distrList)]}
+
+    def __RenameDistributionList(self, content: dict, targetAccount: str) -> dict:
+        distrList = self.__FindList("id", Text(content, "id"))
+        newName = Text(content, "newName")
+        self.__CheckNewName(newName)
+
+        del self.__ListIDs[distrList["name"].lower()]
+        distrList["name"] = newName
+        self.__ListIDs[newName.lower()] = distrList["id"]
+        return {"dl": [self.__ListItem(distrList)]}
+
+    def __GetDistributionList(self, content: dict, targetAccount: str) -> dict:
+        distrList = self.__FindList(*self.__Selector(content, "dl"))
+        offset = int(content.get("offset", 0))
+        limit = int(content.get("limit", 0))
+
+        members = list(distrList["members"].values())
+        page = members[offset : offset + limit] if limit else members[offset:]
+        return {
+            "dl": [
+                {
+                    **self.__ListItem(distrList, content),
+                    "dlm": [{"_content": member} for member in page],
+                }
+            ],
+            "more": offset + len(page) < len(members),
+            "total": len(members),
+        }
+
+    def __GetDistributionListMembership(self, content: dict, targetAccount: str) -> dict:
+        # lists are not nested here, so none is a member of another
+        self.__FindList(*self.__Selector(content, "dl"))
+        return {}
+
+    def __AddDistributionListMember(self, content: dict, targetAccount: str) -> dict:
+        # as in Zimbra one bad address fails the whole request
+        distrList = self.__FindList("id", Text(content, "id"))
+        addresses = [str(node.get("_content", "")) for node in Nodes(content, "dlm")]
+        for address in addresses:
+            if "@" not in address:
+                raise SoapFault(
+                    "service.INVALID_REQUEST", f"invalid request: invalid email address: {address}"
+                )
+
+        for address in addresses:
+            distrList["members"].setdefault(address.lower(), address)
+        return {}
+
+    def __RemoveDistributionListMember(self, content: dict, targetAccount: str) -> dict:
+        distrList = self.__FindList("id", Text(content, "id"))
+        addresses = [str(node.get("_content", "")) for node in Nodes(content, "dlm")]
+        for address in addresses:
+            if address.lower() not in distrList["members"]:
+                raise SoapFault(
+                    "account.NO_SUCH_MEMBER",
+                    f"no such member: {address} in list {distrList['name']}",
+                )
+
+        for address in addresses:
+            del distrList["members"][address.lower()]
+        return {}
+
+    ################################################## MAILBOXES ##################################################
+
+    def __Mailbox(self, targetAccount: str) -> dict:
+        if not targetAccount:
+            raise SoapFault("account.NO_SUCH_ACCOUNT", "no such account: no target account")
+        return self.__FindAccount("name", targetAccount)
+
+    def __InboxMessages(self, accountID: str) -> list:
+        # oldest first, the synthetic ones followed by those sent to the account
+        messages = list()
+        for k in range(self.__Messages):
+            sender = k % 10
+            messages.append(
+                {
+                    "id": str(FIRST_MESSAGE_ID + k),
+                    "l": INBOX_ID,
+                    "d": MESSAGES_START + k * 60000,
+                    "f": "u" if k >= self.__Messages // 2 else "",
+                    "e": [
+                        {"a": f"sender{sender}@{self.__Domain}", "p": f"Sender {sender}", "t": "f"}
+                    ],
+                    "su": f"Synthetic message {k}",
+                    "fr": f"Body of synthetic message {k}",
+                }
+            )
+        return messages + self.__Inboxes.get(accountID, [])
+
+    def __GetFolder(self, content: dict, targetAccount: str) -> dict:
+        messages = self.__InboxMessages(self.__Mailbox(targetAccount)["id"])
+        return {
+            "folder": [
+                {
+                    "id": INBOX_ID,
+                    "name": "Inbox",
+                    "l": "1",
+                    "n": len(messages),
+                    "u": sum("u" in message["f"] for message in messages),
+                }
+            ]
+        }
+
+    def __Search(self, content: dict, targetAccount: str) -> dict:
+        # understands in:inbox, is:unread and item:{id,...}
+        messages = self.__InboxMessages(self.__Mailbox(targetAccount)["id"])
+        query = Text(content, "query")
+
+        items = re.search(r"item:\{([^}]*)\}", query)
+        if items:
+            ids = set(items.group(1).split(","))
+            messages = [message for message in messages if message["id"] in ids]
+        if "is:unread" in query:
+            messages = [message for message in messages if "u" in message["f"]]
+        if content.get("sortBy", "dateDesc") == "dateDesc":
+            messages = messages[::-1]
+
+        offset = int(content.get("offset", 0))
+        limit = int(content.get("limit", 10))
+        page = messages[offset : offset + limit]
+        return {
+            "m": page,
+            "more": offset + len(page) < len(messages),
+            "offset": offset,
+            "sortBy": content.get("sortBy", "dateDesc"),
+        }
+
+    def __Sync(self, content: dict, targetAccount: str) -> dict:
+        # Messages are only added here, the token is the inbox size
+        messages = self.__InboxMessages(self.__Mailbox(targetAccount)["id"])
+        token = int(content.get("token") or 0)
+        if token > len(messages):
+            raise SoapFault("mail.MUST_RESYNC", "mailbox must resync: token is too new")
+
+        result = {"token": len(messages)}
+        if token:
+            result["m"] = [{"id": message["id"]} for message in messages[token:]]
+        return result
+
+    def __SendMsg(self, content: dict, targetAccount: str) -> dict:
+        # delivered to the recipients found in the directory, others are dropped
+        message = Nodes(content, "m")[0]
+        part = Nodes(message, "mp")[0] if Nodes(message, "mp") else {}
+        emails = Nodes(message, "e")
+        senders = [email for email in emails if email.get("t") == "f"]
+        sender = senders[0] if senders else {"a": ADMIN_USERNAME, "t": "f"}
+
+        messageID = str(self.__NextMessageID)
+        self.__NextMessageID += 1
+
+        for email in emails:
+            if email.get("t") not in ("t", "c", "b"):
+                continue
+            accountID = self.__AccountIDs.get(str(email.get("a", "")).lower())
+            if accountID is None:
+                continue
+
+            self.__Inboxes.setdefault(accountID, []).append(
+                {
+                    "id": messageID,
+                    "l": INBOX_ID,
+                    "d": MESSAGES_START + (self.__NextMessageID - FIRST_MESSAGE_ID) * 60000,
+                    "f": "u",
+                    "e": [{**sender, "t": "f"}],
+                    "su": Text(message, "su"),
+                    "fr": Text(part, "content")[:100],
+                }
+            )
+            self.__ChangeSeq += 1
+            self.__ChangeLog.append((self.__ChangeSeq, accountID))
+
+        self.__Changed.notify_all()
+        return {"m": [{"id": messageID}]}
+
+    ################################################## WAITSETS ##################################################
+
+    @staticmethod
+    def __WaitSetAccounts(content: dict, key: str) -> set:
+        return {
+            str(account.get("id"))
+            for node in Nodes(content, key)
+            for account in Nodes(node, "a")
+        }
+
+    def __CreateWaitSet(self, content: dict, targetAccount: str) -> dict:
+        waitSetID = f"WaitSet{uuid.uuid4()}"
+        self.__WaitSets[waitSetID] = self.__WaitSetAccounts(content, "add")
+        return {"waitSet": waitSetID, "defTypes": content.get("defTypes", "m"), "seq": self.__ChangeSeq}
+
+    def __WaitSet(self, content: dict, targetAccount: str) -> dict:
+        # Accounts with messages delivered after seq. A blocking request waits
+        # for one up to timeout seconds, the lock is released meanwhile. As in
+        # Zimbra, a request still waiting when the next one for its WaitSet
+        # comes in, or when the WaitSet is destroyed, is answered with canceled
+        waitSetID = str(content.get("waitSet", ""))
+        if waitSetID not in self.__WaitSets:
+            raise SoapFault("admin.NO_SUCH_WAITSET", f"no such waitset: {waitSetID}")
+
+        request = self.__WaitSetRequests.get(waitSetID, 0) + 1
+        self.__WaitSetRequests[waitSetID] = request
+        self.__Changed.notify_all()
+
+        def canceled() -> bool:
+            return self.__WaitSetRequests.get(waitSetID) != request
+
+        watched = self.__WaitSets[waitSetID]
+        watched |= self.__WaitSetAccounts(content, "add")
+        watched -= self.__WaitSetAccounts(content, "remove")
+        seq = int(content.get("seq") or 0)
+
+        def changed() -> set:
+            return {accountID for s, accountID in self.__ChangeLog if s > seq and accountID in watched}
+
+        accounts = changed()
+        if not accounts and Flag(content, "block"):
+            self.__Changed.wait_for(
+                lambda: changed() or canceled(), float(content.get("timeout") or 0)
+            )
+            if canceled():
+                return {"waitSet": waitSetID, "canceled": True}
+            accounts = changed()
+
+        result = {"waitSet": waitSetID, "seq": self.__ChangeSeq}
+        if accounts:
+            result["a"] = [{"id": accountID} for accountID in sorted(accounts)]
+        return result
+
+    def __DestroyWaitSet(self, content: dict, targetAccount: str) -> dict:
+        waitSetID = str(content.get("waitSet", ""))
+        if self.__WaitSets.pop(waitSetID, None) is None:
+            raise SoapFault("admin.NO_SUCH_WAITSET", f"no such waitset: {waitSetID}")
+        self.__WaitSetRequests.pop(waitSetID, None)
+        self.__Changed.notify_all()
+        return {"waitSet": waitSetID}
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the client pools connections
+
+    def setup(self) -> None:
+        super().setup()
+        # headers and body are separate writes, with Nagle's algorithm the body
+        # would wait for the client's delayed ACK of the headers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def __Answer(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        status, headers, payload = self.server.Simulator.Handle(
+            method, self.path, self.headers, body
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # a long-poll whose client exited before it was answered
+            self.close_connection = True
+
+    def do_GET(self) -> None:
+        self.__Answer("GET")
+
+    def do_POST(self) -> None:
+        self.__Answer("POST")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def InstallAppConfig(host: str) -> None:
+    # app.py imports its settings from config.py, which belongs to a deployment
+    # and is not in the repository. A module with the simulator's admin and a
+    # random HMAC key stands in for it, installed before app.py is imported
+    config = types.ModuleType("config")
+    config.host = host
+    config.adminUsername = ADMIN_USERNAME
+    config.adminPassword = ADMIN_PASSWORD
+    config.hmac_key = uuid.uuid4().hex.encode()
+    sys.modules["config"] = config
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class ZimbraSimulator:
+    def __init__(
+        self,
+        directory: SimulatedDirectory,
+        address: str = "127.0.0.1",
+        port: int = ADMIN_PORT,
+        adminUsername: str = ADMIN_USERNAME,
+        adminPassword: str = ADMIN_PASSWORD,
+        tokenLifetime: float = 43200,
+        latency: float = 0,
+        jitter: float = 0,
+        faultRate: float = 0,
+        unavailableRate: float = 0,
+        seed: int = None,
+    ) -> None:
+        # tokenLifetime   - seconds an admin token is accepted, service.AUTH_EXPIRED after
+        # latency         - seconds every answer is delayed by, plus up to jitter
+        # faultRate       - share of requests answered with a service.FAILURE fault
+        # unavailableRate - share of requests answered with a bare 503
+        # seed            - makes the jitter and the injected failures repeatable
+        self.__Directory = directory
+        self.__Address = address
+        self.__AdminUsername = adminUsername
+        self.__AdminPassword = adminPassword
+        self.__TokenLifetime = tokenLifetime
+        self.__Latency = latency
+        self.__Jitter = jitter
+        self.__FaultRate = faultRate
+        self.__UnavailableRate = unavailableRate
+        self.__UnavailableFor = None
+        self.__Random = random.Random(seed)
+        self.__Lock = threading.Lock()
+        self.__Tokens = dict()  # auth token -> (CSRF token, expires at)
+        self.__Stats = {"requests": dict(), "faults": 0, "injectedFaults": 0, "unavailable": 0}
+
+        self.__Server = SimulatorServer((address, port), SimulatorHandler)
+        self.__Server.Simulator = self
+        self.__Thread = None
+
+    def GetHost(self) -> str:
+        # the host argument of ZimbraAPI, with the port bound, port=0 picks a free one
+        return f"http://{self.__Address}:{self.__Server.server_address[1]}"
+
+    def SetFailures(
+        self, faultRate: float = 0, unavailableRate: float = 0, unavailableFor: str = None
+    ) -> None:
+        # changes the injected failures of a running simulator, unavailableFor
+        # answers every request whose body contains it with a bare 503
+        with self.__Lock:
+            self.__FaultRate = faultRate
+            self.__UnavailableRate = unavailableRate
+            self.__UnavailableFor = unavailableFor.encode() if unavailableFor else None
+
+    def Start(self) -> None:
+        self.__Thread = threading.Thread(target=self.__Server.serve_forever, daemon=True)
+        self.__Thread.start()
+
+    def ServeForever(self) -> None:
+        self.__Server.serve_forever()
+
+    def Stop(self) -> None:
+        self.__Server.shutdown()
+        self.__Server.server_close()
+
+    def GetStats(self) -> dict:
+        with self.__Lock:
+            return {
+                **self.__Stats,
+                "requests": dict(self.__Stats["requests"]),
+                "total": sum(self.__Stats["requests"].values()),
+                **self.__Directory.GetSize(),
+            }
+
+    def __Count(self, key: str, requestName: str = None) -> None:
+        with self.__Lock:
+            if requestName is not None:
+                requests = self.__Stats["requests"]
+                requests[requestName] = requests.get(requestName, 0) + 1
+            if key:
+                self.__Stats[key] += 1
+
+    def __Roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.__Lock:
+            return self.__Random.random() < rate
+
+    def __Delay(self) -> None:
+        delay = self.__Latency
+        if self.__Jitter > 0:
+            with self.__Lock:
+                delay += self.__Random.random() * self.__Jitter
+        if delay > 0:
+            sleep(delay)
+
+    @staticmethod
+    def __Json(status: int, data, headers: list = None) -> tuple:
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        return status, [("Content-Type", "application/json; charset=utf-8")] + (headers or []), body
+
+    def __Soap(self, status: int, body: dict, headers: list = None) -> tuple:
+        envelope = {"Header": {"context": {"_jsns": "urn:zimbra"}}, "Body": body, "_jsns": "urn:zimbraSoap"}
+        return self.__Json(status, envelope, headers)
+
+    def __Fault(self, fault: SoapFault) -> tuple:
+        self.__Count("faults")
+        return self.__Soap(500, {"Fault": fault.asdict()})
+
+    def Handle(self, method: str, path: str, headers, body: bytes) -> tuple:
+        # (status, [(header, value)], body) of one HTTP request
+        url = urlsplit(path)
+        if url.path == "/simulator/stats":
+            return self.__Json(200, self.GetStats())
+
+        self.__Delay()
+        unavailableFor = self.__UnavailableFor
+        if self.__Roll(self.__UnavailableRate) or (unavailableFor and unavailableFor in body):
+            self.__Count("unavailable")
+            return 503, [], b""
+
+        try:
+            if method == "GET":
+                return self.__Rest(url, headers)
+            if not url.path.startswith(SOAP_PATHS):
+                return 404, [], b""
+            return self.__HandleSoap(headers, body)
+        except SoapFault as fault:
+            return self.__Fault(fault)
+        except Exception as e:  # a simulator bug must not look like a dropped connection
+            return self.__Fault(SoapFault("service.FAILURE", f"system failure: {e!r}"))
+
+    def __HandleSoap(self, headers, body: bytes) -> tuple:
+        try:
+            requestName, content, context = ParseEnvelope(body)
+        except (ValueError, KeyError, IndexError, StopIteration, ElementTree.ParseError) as e:
+            self.__Count(None, "unparsed")
+            raise SoapFault("service.PARSE_ERROR", f"parse error: {e}")
+
+        self.__Count(None, requestName)
+        if requestName == "AuthRequest":
+            return self.__Auth(content)
+
+        self.__CheckAuth(headers, Text(context, "csrfToken", None))
+        if self.__Roll(self.__FaultRate):
+            self.__Count("injectedFaults")
+            raise SoapFault("service.FAILURE", "system failure: injected by the simulator")
+
+        targetAccount = Text(context, "account")
+        if requestName == "BatchRequest":
+            answer = self.__Batch(content, targetAccount)
+        else:
+            answer = self.__Directory.Handle(requestName, content, targetAccount)
+        return self.__Soap(200, {requestName[: -len("Request")] + "Response": answer})
+
+    def __Batch(self, content: dict, targetAccount: str) -> dict:
+        # sub-requests are answered in order, their requestId copied to the answer
+        stop = content.get("onerror", "continue") == "stop"
+        answers = dict()
+        for requestName, items in content.items():
+            if not requestName.endswith("Request"):
+                continue
+
+            for item in items if isinstance(items, list) else [items]:
+                try:
+                    answer = self.__Directory.Handle(requestName, item, targetAccount)
+                    key = requestName[: -len("Request")] + "Response"
+                except SoapFault as fault:
+                    answer, key = fault.asdict(), "Fault"
+
+                if "requestId" in item:
+                    answer["requestId"] = item["requestId"]
+                answers.setdefault(key, []).append(answer)
+                if key == "Fault" and stop:
+                    return answers
+        return answers
+
+    def __Auth(self, content: dict) -> tuple:
+        name, password = Text(content, "name"), Text(content, "password")
+        if (name, password) != (self.__AdminUsername, self.__AdminPassword):
+            raise SoapFault("account.AUTH_FAILED", f"authentication failed for [{name}]")
+
+        authToken, CSRFToken = uuid.uuid4().hex, uuid.uuid4().hex
+        now = monotonic()
+        with self.__Lock:
+            self.__Tokens = {k: v for k, v in self.__Tokens.items() if v[1] > now}
+            self.__Tokens[authToken] = (CSRFToken, now + self.__TokenLifetime)
+
+        return self.__Soap(
+            200,
+            {
+                "AuthResponse": {
+                    "authToken": [{"_content": authToken}],
+                    "lifetime": int(self.__TokenLifetime * 1000),
+                    "csrfToken": {"_content": CSRFToken},
+                }
+            },
+            [
+                ("Set-Cookie", f"ZM_ADMIN_AUTH_TOKEN={authToken};Path=/;HttpOnly"),
+                ("X-Zimbra-Csrf-Token", CSRFToken),
+            ],
+        )
+
+    def __CheckAuth(self, headers, CSRFToken: str = None) -> None:
+        cookie = SimpleCookie(headers.get("Cookie", ""))
+        authToken = cookie["ZM_ADMIN_AUTH_TOKEN"].value if "ZM_ADMIN_AUTH_TOKEN" in cookie else ""
+        if not authToken:
+            raise SoapFault("service.AUTH_REQUIRED", "no valid authtoken present")
+
+        with self.__Lock:
+            token = self.__Tokens.get(authToken)
+        if token is None or token[1] <= monotonic():
+            raise SoapFault("service.AUTH_EXPIRED", "auth credentials have expired")
+        if CSRFToken is not None and CSRFToken != token[0]:
+            raise SoapFault("service.AUTH_REQUIRED", "invalid CSRF token")
+
+    def __Rest(self, url, headers) -> tuple:
+        # GET /home/<account>/inbox?fmt=json[&query=is:unread]
+        match = INBOX_PATH.match(url.path)
+        if match is None:
+            return 404, [], b""
+
+        try:
+            self.__CheckAuth(headers)
+        except SoapFault:
+            return 401, [], b""
+
+        query = parse_qs(url.query)
+        messages = self.__Directory.GetInbox(
+            unquote(match.group(1)), "is:unread" in query.get("query", [""])[0]
+        )
+        if messages is None:
+            return 404, [], b""
+        return self.__Json(200, {"m": messages} if messages else {})
+
+
+def ParseArgs():
+    parser = argparse.ArgumentParser(description="Local Zimbra SOAP simulator")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=ADMIN_PORT)
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--members", type=int, default=1000, help="members of every list")
+    parser.add_argument("--messages", type=int, default=20, help="messages of every inbox")
+    parser.add_argument("--latency", type=float, default=0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0, help="seconds")
+    parser.add_argument("--fault-rate", type=float, default=0)
+    parser.add_argument("--unavailable-rate", type=float, default=0)
+    parser.add_argument("--token-lifetime", type=float, default=43200, help="seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--admin-username", default=ADMIN_USERNAME)
+    parser.add_argument("--admin-password", default=ADMIN_PASSWORD)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = ParseArgs()
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(args.accounts, args.lists, args.members, args.messages),
+        args.address,
+        args.port,
+        args.admin_username,
+        args.admin_password,
+        args.token_lifetime,
+        args.latency,
+        args.jitter,
+        args.fault_rate,
+        args.unavailable_rate,
+        args.seed,
+    )
+    print(
+        f"{args.accounts} accounts, {args.lists} lists of {args.members} members "
+        f"on {simulator.GetHost()}",
+        flush=True,
+    )
+    try:
+        simulator.ServeForever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,74 @@
+# The tests run ZimbraAPI and app.py against benchmarks/ZimbraSimulator.py on a
+# free port, failures are injected with ZimbraSimulator.SetFailures
+import os
+import sys
+import json
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from ZimbraAPI import ZimbraAPI
+from HTTPSession import HTTPSession
+from WaitSetListener import WaitSetListener
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory, InstallAppConfig
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD
+
+
+def TestSession() -> HTTPSession:
+    # retries without the production backoff, the circuit stays closed
+    return HTTPSession(backoffBase=0.001, backoffMax=0.01, failureThreshold=1000)
+
+
+@pytest.fixture
+def simulator():
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(accounts=20, lists=2, members=5, messages=4), port=0, seed=1
+    )
+    simulator.Start()
+    yield simulator
+    simulator.Stop()
+
+
+@pytest.fixture
+def zimbra(simulator) -> ZimbraAPI:
+    return ZimbraAPI(
+        simulator.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD, session=TestSession()
+    )
+
+
+@pytest.fixture
+def app(simulator, zimbra, monkeypatch):
+    # app.py with the simulator's settings, its ZimbraAPI replaced by the
+    # uncached one of the test and its WaitSetListener by one using it
+    InstallAppConfig(simulator.GetHost())
+    import app
+
+    listener = WaitSetListener(zimbra, timeout=1, maxWaiters=app.WAIT_MAX_WAITERS)
+    monkeypatch.setattr(app, "Zimbra", zimbra)
+    monkeypatch.setattr(app, "Listener", listener)
+    yield app
+    listener.Stop()
+
+
+@pytest.fixture
+def post(app):
+    # posts data signed the way clients of app.py sign it, returns the JSON answer
+    client = app.app.test_client()
+
+    def post(route: str, data: dict) -> dict:
+        data = {**data, "timestamp": int(time.time())}
+        datastr = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        data["hmac_sign"] = app.calculate_HMAC(datastr.encode("utf-8"))
+        # sent as dumped, the test client's json= would sort the keys
+        response = client.post(
+            route,
+            data=json.dumps(data, ensure_ascii=False),
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        return response.get_json()
+
+    return post
@@ -0,0 +1,58 @@
+from ZimbraSimulator import DOMAIN
+
+
+def test_failed_operation_keeps_its_neighbours(simulator, post):
+    # user3 is answered with a 503, the reads around it run in the same
+    # BatchRequest and the write after it on its own
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+
+    answer = post(
+        "/batch",
+        {
+            "operations": [
+                {"op": "getAccount", "accountName": f"user2@{DOMAIN}"},
+                {"op": "getAccount", "accountName": f"user3@{DOMAIN}"},
+                {"op": "getAccount", "accountName": f"user4@{DOMAIN}"},
+                {
+                    "op": "modifyAccount",
+                    "accountName": f"user3@{DOMAIN}",
+                    "params": {"displayName": "x"},
+                },
+                {
+                    "op": "modifyAccount",
+                    "accountName": f"user4@{DOMAIN}",
+                    "params": {"displayName": "x"},
+                },
+            ]
+        },
+    )
+    results = answer["data"]
+
+    assert results[0]["data"]["name"] == f"user2@{DOMAIN}"
+    assert results[1]["error"]["code"] == "http.503"
+    assert results[2]["data"]["name"] == f"user4@{DOMAIN}"
+    assert results[3]["error"]["code"] == "http.503"
+    assert "data" in results[4]
+
+
+def test_operation_raising_is_an_error_item(post):
+    # fields of the wrong type make the call itself raise
+    answer = post(
+        "/batch",
+        {
+            "operations": [
+                {"op": "getAccount", "accountName": f"user2@{DOMAIN}"},
+                {
+                    "op": "addDistributionListMembers",
+                    "userEmails": 5,
+                    "distrListName": f"list0@{DOMAIN}",
+                },
+                {"op": "getAccount", "accountName": f"user4@{DOMAIN}"},
+            ]
+        },
+    )
+    results = answer["data"]
+
+    assert "data" in results[0]
+    assert "TypeError" in results[1]["error"]["code"]
+    assert "data" in results[2]
@@ -0,0 +1,72 @@
+import pytest
+from ZimbraAPI import ZimbraAPI
+from ResponseCache import ResponseCache
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+# list0 holds user0 ... user4, list1 user5 ... user9
+LISTS = [f"list0@{DOMAIN}", f"list1@{DOMAIN}"]
+
+
+@pytest.fixture
+def zimbra(simulator) -> ZimbraAPI:
+    return ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=TestSession(),
+        cache=ResponseCache(),
+    )
+
+
+def Requests(simulator, requestName: str) -> int:
+    return simulator.GetStats()["requests"].get(requestName, 0)
+
+
+def AccountID(zimbra, i: int) -> str:
+    return zimbra.GetAccount(accountName=f"user{i}@{DOMAIN}").GetData()["id"]
+
+
+def test_member_change_keeps_other_entries(simulator, zimbra):
+    added, other = AccountID(zimbra, 12), AccountID(zimbra, 13)
+    for name in LISTS:
+        zimbra.GetDistributionList(distrListName=name)
+    for accountID in [added, other]:
+        assert zimbra.GetAccountMembership(accountID=accountID).GetData() == {}
+
+    zimbra.AddDistributionListMembers([f"user12@{DOMAIN}"], distrListName=LISTS[0])
+
+    lists = Requests(simulator, "GetDistributionListRequest")
+    memberships = Requests(simulator, "GetAccountMembershipRequest")
+    zimbra.GetDistributionList(distrListName=LISTS[1])
+    assert zimbra.GetAccountMembership(accountID=other).GetData() == {}
+    assert Requests(simulator, "GetDistributionListRequest") == lists
+    assert Requests(simulator, "GetAccountMembershipRequest") == memberships
+
+    members = zimbra.GetDistributionList(distrListName=LISTS[0]).GetData()["members"]
+    assert f"user12@{DOMAIN}" in members
+    assert LISTS[0] in zimbra.GetAccountMembership(accountID=added).GetData()
+
+
+def test_membership_by_id_of_unknown_name_is_dropped(zimbra):
+    # the id is not looked up by name here, only a member change of any list
+    # reaches the entry
+    accountID = zimbra.GetAccounts(limit=20).GetData()[f"user14@{DOMAIN}"]["id"]
+    assert zimbra.GetAccountMembership(accountID=accountID).GetData() == {}
+
+    zimbra.AddDistributionListMembers([f"user14@{DOMAIN}"], distrListName=LISTS[1])
+    assert LISTS[1] in zimbra.GetAccountMembership(accountID=accountID).GetData()
+
+
+def test_delete_drops_only_lists_of_the_account(simulator, zimbra):
+    for name in LISTS:
+        zimbra.GetDistributionList(distrListName=name)
+
+    assert not zimbra.DeleteAccount(accountName=f"user1@{DOMAIN}").IsError()
+
+    lists = Requests(simulator, "GetDistributionListRequest")
+    zimbra.GetDistributionList(distrListName=LISTS[1])
+    assert Requests(simulator, "GetDistributionListRequest") == lists
+
+    members = zimbra.GetDistributionList(distrListName=LISTS[0]).GetData()["members"]
+    assert f"user1@{DOMAIN}" not in members
@@ -0,0 +1,131 @@
+import gzip
+import os
+import subprocess
+import sys
+from time import monotonic
+from ZimbraAPI import ZimbraAPI
+from CassetteSession import RecordingSession, ReplaySession, Cassette, SCRUBBED
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import ROOT, TestSession
+
+REPLAY_BENCHMARK = os.path.join(ROOT, "benchmarks", "ReplayBenchmark.py")
+
+
+def Calls(zimbra: ZimbraAPI) -> list:
+    return [
+        zimbra.GetAccount(accountName=f"user3@{DOMAIN}").asdict(),
+        zimbra.GetAccounts().asdict(),
+        zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}").asdict(),
+        zimbra.GetAccountMembership(accountName=f"user3@{DOMAIN}").asdict(),
+        zimbra.GetMessages(accountName=f"user3@{DOMAIN}").asdict(),
+    ]
+
+
+def Replayer(path: str, timing: str = "none") -> ZimbraAPI:
+    # no server behind the host, and the password is not recorded
+    return ZimbraAPI(
+        "http://replay", ADMIN_USERNAME, "", session=ReplaySession(path, timing)
+    )
+
+
+def test_replay_answers_as_recorded(simulator, tmp_path):
+    path = str(tmp_path / "calls.cassette.gz")
+    recorder = ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=RecordingSession(path, TestSession()),
+    )
+    recorded = Calls(recorder)
+    assert not any("error" in result for result in recorded)
+
+    simulator.SetFailures(unavailableRate=1)  # a request reaching it would fail
+    assert Calls(Replayer(path)) == recorded
+
+
+def test_secrets_are_scrubbed(simulator, tmp_path):
+    path = str(tmp_path / "secrets.cassette.gz")
+    recorder = ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=RecordingSession(path, TestSession()),
+    )
+    assert not recorder.SetPassword("N3w-Secret!", accountName=f"user3@{DOMAIN}").IsError()
+
+    with gzip.open(path, "rt") as file:
+        text = file.read()
+    assert "N3w-Secret!" not in text
+    assert f">{ADMIN_PASSWORD}<" not in text
+
+    _, exchanges = Cassette(path).Load()
+    auth = next(e for e in exchanges if "AuthRequest" in e["request"])
+    assert auth["headers"]["X-Zimbra-Csrf-Token"] == SCRUBBED
+    assert auth["cookies"] == {"ZM_ADMIN_AUTH_TOKEN": SCRUBBED}
+    assert f'"authToken":[{{"_content":"{SCRUBBED}"}}]' in auth["body"]
+
+
+def test_failures_and_misses(simulator, tmp_path):
+    path = str(tmp_path / "failures.cassette.gz")
+    recorder = ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=RecordingSession(path, TestSession()),
+    )
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+    assert recorder.GetAccount(accountName=f"user3@{DOMAIN}").GetErrorCode() == "http.503"
+
+    replayer = Replayer(path)
+    assert replayer.GetAccount(accountName=f"user3@{DOMAIN}").GetErrorCode() == "http.503"
+
+    # a request not in the cassette is a connection error
+    result = replayer.GetAccount(accountName=f"user4@{DOMAIN}")
+    assert "CassetteMissError" in result.GetErrorCode()
+
+
+def test_original_timing(tmp_path):
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(accounts=5, lists=1, members=5, messages=1), port=0, latency=0.05
+    )
+    simulator.Start()
+    path = str(tmp_path / "slow.cassette.gz")
+    try:
+        recorder = ZimbraAPI(
+            simulator.GetHost(),
+            ADMIN_USERNAME,
+            ADMIN_PASSWORD,
+            session=RecordingSession(path, TestSession()),
+        )
+        assert not recorder.GetAccount(accountName=f"user1@{DOMAIN}").IsError()
+    finally:
+        simulator.Stop()
+
+    replayer = Replayer(path, "original")
+    started = monotonic()
+    assert not replayer.GetAccount(accountName=f"user1@{DOMAIN}").IsError()
+    # the AuthRequest and the GetAccountRequest, each recorded after the latency
+    assert monotonic() - started >= 0.1
+
+
+def test_replay_benchmark(simulator, tmp_path):
+    path = str(tmp_path / "benchmark.cassette.gz")
+    output = str(tmp_path / "baseline.json")
+
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, REPLAY_BENCHMARK, *args], capture_output=True, text=True
+        )
+
+    recorded = run(
+        "--record", path, "--host", simulator.GetHost(), "--account", f"user3@{DOMAIN}"
+    )
+    assert recorded.returncode == 0, recorded.stderr
+    assert "ok" in recorded.stdout
+
+    replay = ["--repeat", "2", "--rounds", "1"]
+    baseline = run(path, *replay, "--output", output)
+    assert baseline.returncode == 0, baseline.stdout + baseline.stderr
+    compared = run(path, *replay, "--baseline", output, "--tolerance", "1000")
+    assert compared.returncode == 0, compared.stdout + compared.stderr
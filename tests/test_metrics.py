@@ -0,0 +1,54 @@
+import os
+import shutil
+import subprocess
+import sys
+from Metrics import Metrics, ARCHIVE_FILE
+
+NAME = "zimbra_api_auth_refreshes_total"
+
+
+def Written(directory: str, count: int) -> str:
+    # the file a process that counted count refreshes leaves behind
+    metrics = Metrics(directory)
+    metrics.Count(NAME, value=count)
+    metrics.Flush()
+    return os.path.join(directory, f"{os.getpid()}.json")
+
+
+def Total(metrics: Metrics) -> float:
+    line = next(line for line in metrics.Export().splitlines() if line.startswith(NAME))
+    return float(line.split()[-1])
+
+
+def ExitedPID() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_files_of_exited_processes_are_archived(tmp_path):
+    directory = str(tmp_path)
+    exited = os.path.join(directory, f"{ExitedPID()}.json")
+    shutil.move(Written(directory, 3), exited)
+    running = os.path.join(directory, f"{os.getppid()}.json")
+    shutil.copy(exited, running)
+
+    metrics = Metrics(directory)
+    metrics.Count(NAME)
+    assert Total(metrics) == 3 + 3 + 1
+    assert not os.path.exists(exited)
+    assert os.path.exists(running)
+    assert os.path.exists(os.path.join(directory, ARCHIVE_FILE))
+
+
+def test_reused_pid_keeps_the_counts(tmp_path):
+    directory = str(tmp_path)
+    Written(directory, 5)
+
+    # a new process of the same pid starts from 0 without losing the 5
+    metrics = Metrics(directory)
+    metrics.Count(NAME)
+    assert Total(metrics) == 6
+
+    again = Metrics(directory)
+    assert Total(again) == 6
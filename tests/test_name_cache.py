@@ -0,0 +1,85 @@
+import pytest
+from ZimbraAPI import ZimbraAPI
+from ResponseCache import SQLiteResponseCache
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+
+@pytest.fixture
+def workers(simulator, tmp_path):
+    # two processes' ZimbraAPI sharing one cache file, as the app's workers do
+    path = str(tmp_path / "cache.sqlite")
+    return [
+        ZimbraAPI(
+            simulator.GetHost(),
+            ADMIN_USERNAME,
+            ADMIN_PASSWORD,
+            session=TestSession(),
+            cache=SQLiteResponseCache(path),
+            singleFlight=False,
+        )
+        for _ in range(2)
+    ]
+
+
+def Lookups(simulator) -> int:
+    return simulator.GetStats()["requests"].get("GetAccountRequest", 0)
+
+
+def test_write_by_name_uses_cached_id(simulator, workers):
+    a, _ = workers
+    assert not a.GetAccount(accountName=f"user2@{DOMAIN}").IsError()
+
+    lookups = Lookups(simulator)
+    result = a.ModifyAccount({"displayName": "x"}, accountName=f"user2@{DOMAIN}")
+    assert not result.IsError()
+    assert not a.SetPassword("Passw0rd!", accountName=f"user2@{DOMAIN}").IsError()
+    assert Lookups(simulator) == lookups
+
+
+def test_other_writes_keep_cached_names(simulator, workers):
+    a, b = workers
+    assert not a.SetPassword("Passw0rd!", accountName=f"user2@{DOMAIN}").IsError()
+
+    b.RenameAccount(f"renamed5@{DOMAIN}", accountName=f"user5@{DOMAIN}")
+    b.ModifyAccount({"displayName": "x"}, accountName=f"user6@{DOMAIN}")
+
+    lookups = Lookups(simulator)
+    assert not a.SetPassword("Passw0rd!", accountName=f"user2@{DOMAIN}").IsError()
+    assert Lookups(simulator) == lookups
+
+
+def test_rename_in_other_worker(workers):
+    # the name cached by a is given to a new account by b, a's delete by
+    # name removes the new account and not the renamed one
+    a, b = workers
+    name = f"user3@{DOMAIN}"
+    renamedID = a.GetAccount(accountName=name).GetData()["id"]
+
+    b.RenameAccount(f"renamed3@{DOMAIN}", accountName=name)
+    newID = b.CreateAccount(name, "Passw0rd!", "N", "S").GetData()["id"]
+
+    assert not a.DeleteAccount(accountName=name).IsError()
+    assert not b.GetAccount(accountID=renamedID).IsError()
+    assert b.GetAccount(accountID=newID).GetErrorCode() == "account.NO_SUCH_ACCOUNT"
+
+
+def test_deleted_in_other_worker_is_retried(simulator):
+    # without a shared cache a's id of the list is stale, the NO_SUCH fault
+    # drops it and the change goes to the list now called by the name
+    a, b = [
+        ZimbraAPI(
+            simulator.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD, session=TestSession()
+        )
+        for _ in range(2)
+    ]
+    name = f"list1@{DOMAIN}"
+    assert not a.GetDistributionList(distrListName=name).IsError()
+
+    b.DeleteDistributionList(distrListName=name)
+    newID = b.CreateDistributionList(name).GetData()["id"]
+
+    result = a.AddDistributionListMembers([f"user13@{DOMAIN}"], distrListName=name)
+    assert result.GetData()["succeeded"] == [f"user13@{DOMAIN}"]
+    members = b.GetDistributionList(distrListID=newID).GetData()["members"]
+    assert members == [f"user13@{DOMAIN}"]
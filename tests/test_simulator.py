@@ -0,0 +1,90 @@
+import requests
+import pytest
+from time import monotonic
+from ZimbraAPI import ZimbraAPI
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+
+def test_injected_faults(simulator, zimbra):
+    simulator.SetFailures(faultRate=1)
+
+    result = zimbra.GetAccount(accountName=f"user3@{DOMAIN}")
+    assert result.GetErrorCode() == "service.FAILURE"
+    assert simulator.GetStats()["injectedFaults"] == 1
+
+    # a fault is an answer of Zimbra, it is not retried
+    assert zimbra.GetResilienceStats().GetData()["retries"] == 0
+
+    simulator.SetFailures()
+    assert not zimbra.GetAccount(accountName=f"user3@{DOMAIN}").IsError()
+
+
+def test_transient_503_is_retried(simulator, zimbra):
+    assert not zimbra.GetAccount(accountName=f"user3@{DOMAIN}").IsError()
+    simulator.SetFailures(unavailableRate=0.3)
+
+    results = [zimbra.GetAccount(accountName=f"user{i}@{DOMAIN}") for i in range(20)]
+    simulator.SetFailures()
+
+    # every 503 is either retried or the answer of a call that ran out of retries
+    failed = [result for result in results if result.GetErrorCode() == "http.503"]
+    retries = zimbra.GetResilienceStats().GetData()["retries"]
+    assert retries > 0
+    assert simulator.GetStats()["unavailable"] == retries + len(failed)
+    assert len(failed) < len(results)
+
+
+def test_writes_are_not_retried(simulator, zimbra):
+    assert not zimbra.GetAccount(accountName=f"user3@{DOMAIN}").IsError()
+    simulator.SetFailures(unavailableRate=1)
+
+    result = zimbra.ModifyAccount({"displayName": "x"}, accountName=f"user3@{DOMAIN}")
+    assert result.GetErrorCode() == "http.503"
+    assert simulator.GetStats()["unavailable"] == 1
+
+
+def test_latency():
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(accounts=5, lists=1, members=5, messages=1), port=0, latency=0.05
+    )
+    simulator.Start()
+    try:
+        zimbra = ZimbraAPI(
+            simulator.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD, session=TestSession()
+        )
+        assert not zimbra.GetAccounts().IsError()  # authenticates
+
+        started = monotonic()
+        assert not zimbra.GetAccount(accountName=f"user1@{DOMAIN}").IsError()
+        assert monotonic() - started >= 0.05
+    finally:
+        simulator.Stop()
+
+
+def test_stats_route(simulator, zimbra):
+    zimbra.GetAccount(accountName=f"user3@{DOMAIN}")
+    zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}")
+
+    stats = requests.get(simulator.GetHost() + "/simulator/stats").json()
+    assert stats["requests"]["AuthRequest"] == 1
+    assert stats["requests"]["GetAccountRequest"] == 1
+    assert stats["requests"]["GetDistributionListRequest"] == 1
+    assert stats["total"] == 3
+
+
+@pytest.mark.parametrize("transport", ["xml", "json"])
+def test_transports(simulator, transport):
+    zimbra = ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=TestSession(),
+        transport=transport,
+    )
+    account = zimbra.GetAccount(accountName=f"user3@{DOMAIN}").GetData()
+    assert account["name"] == f"user3@{DOMAIN}"
+
+    members = zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}").GetData()
+    assert members["members"] == [f"user{i}@{DOMAIN}" for i in range(5)]
@@ -0,0 +1,81 @@
+import asyncio
+import aiohttp
+import pytest
+from ZimbraAPI import ZimbraAPI, STREAM_CHUNK_SIZE
+from AsyncZimbraAPI import AsyncZimbraAPI
+from AsyncHTTPSession import AsyncHTTPSession
+from AsyncCassetteSession import AsyncRecordingSession, AsyncReplaySession
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+
+@pytest.fixture(scope="module")
+def large():
+    # one list of 20000 members, its GetDistributionListResponse is about 1 MB
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(accounts=20000, lists=1, members=20000, messages=1), port=0
+    )
+    simulator.Start()
+    yield simulator
+    simulator.Stop()
+
+
+def RunAsync(simulator, call, session=None):
+    async def run():
+        async with AsyncZimbraAPI(
+            simulator.GetHost(),
+            ADMIN_USERNAME,
+            ADMIN_PASSWORD,
+            session=session if session else AsyncHTTPSession(),
+        ) as zimbra:
+            return await call(zimbra)
+
+    return asyncio.run(run())
+
+
+def test_async_stream_is_not_read_whole(large, monkeypatch):
+    expected = ZimbraAPI(
+        large.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD, session=TestSession()
+    ).GetDistributionList(distrListName=f"list0@{DOMAIN}")
+
+    # small bodies, such as the AuthResponse, are still read whole
+    readWhole = aiohttp.ClientResponse.read
+
+    async def read(self):
+        assert (self.content_length or 0) < STREAM_CHUNK_SIZE, "streamed body read whole"
+        return await readWhole(self)
+
+    monkeypatch.setattr(aiohttp.ClientResponse, "read", read)
+    result = RunAsync(
+        large, lambda zimbra: zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}")
+    )
+
+    assert len(result.GetData()["members"]) == 20000
+    assert result.GetData() == expected.GetData()
+
+
+def test_async_streams_run_concurrently(large):
+    async def call(zimbra):
+        return await asyncio.gather(
+            zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}"),
+            zimbra.GetAccounts(limit=5000),
+            zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}", countOnly=True),
+        )
+
+    members, accounts, count = RunAsync(large, call)
+    assert len(members.GetData()["members"]) == 20000
+    assert len(accounts.GetData()) == 5000
+    assert count.GetData()["membersCount"] == 20000
+
+
+def test_async_recording_keeps_streamed_body(large, tmp_path):
+    path = str(tmp_path / "list.cassette.gz")
+
+    def call(zimbra):
+        return zimbra.GetDistributionList(distrListName=f"list0@{DOMAIN}")
+
+    recorded = RunAsync(large, call, AsyncRecordingSession(path))
+    replayed = RunAsync(large, call, AsyncReplaySession(path))
+    assert len(recorded.GetData()["members"]) == 20000
+    assert replayed.GetData() == recorded.GetData()
@@ -0,0 +1,74 @@
+import pytest
+from ZimbraAPI import ZimbraAPI
+from ResponseCache import ResponseCache
+from ZimbraSimulator import ZimbraSimulator, SimulatedDirectory
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+LIST = f"list0@{DOMAIN}"
+
+
+@pytest.fixture
+def simulator():
+    # list0 holds user0 ... user99
+    simulator = ZimbraSimulator(
+        SimulatedDirectory(accounts=200, lists=1, members=100, messages=1), port=0
+    )
+    simulator.Start()
+    yield simulator
+    simulator.Stop()
+
+
+@pytest.fixture
+def zimbra(simulator) -> ZimbraAPI:
+    return ZimbraAPI(
+        simulator.GetHost(),
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=TestSession(),
+        cache=ResponseCache(),
+    )
+
+
+def Members(start: int, stop: int) -> list:
+    return [f"user{i}@{DOMAIN}" for i in range(start, stop)]
+
+
+def Sync(zimbra, desired: list) -> dict:
+    result = zimbra.SyncDistributionListMembers(desired, distrListName=LIST, pageSize=10)
+    assert not result.IsError()
+    return result.GetData()
+
+
+def test_unchanged_list_is_not_paged(zimbra):
+    first = Sync(zimbra, Members(50, 150))
+    assert (first["added"], first["removed"]) == (50, 50)
+
+    again = Sync(zimbra, Members(50, 150))
+    assert again["requests"] == 1
+    assert (again["added"], again["removed"], again["unchanged"]) == (0, 0, 100)
+
+
+def test_member_change_pages_again(zimbra):
+    Sync(zimbra, Members(0, 100))
+    zimbra.AddDistributionListMembers(Members(100, 101), distrListName=LIST)
+
+    again = Sync(zimbra, Members(0, 100))
+    assert again["requests"] > 1
+    assert (again["added"], again["removed"]) == (0, 1)
+
+
+def test_other_members_page_again(zimbra):
+    Sync(zimbra, Members(0, 100))
+
+    again = Sync(zimbra, Members(0, 99))
+    assert again["requests"] > 1
+    assert again["removed"] == 1
+
+
+def test_without_cache_always_pages(simulator):
+    zimbra = ZimbraAPI(
+        simulator.GetHost(), ADMIN_USERNAME, ADMIN_PASSWORD, session=TestSession()
+    )
+    Sync(zimbra, Members(0, 100))
+    assert Sync(zimbra, Members(0, 100))["requests"] == 10
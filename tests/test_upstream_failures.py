@@ -0,0 +1,88 @@
+import socket
+import asyncio
+from ZimbraAPI import ZimbraAPI
+from AsyncZimbraAPI import AsyncZimbraAPI
+from AsyncHTTPSession import AsyncHTTPSession
+from ZimbraSimulator import ADMIN_USERNAME, ADMIN_PASSWORD, DOMAIN
+from conftest import TestSession
+
+
+def test_503_is_an_error_result(simulator, zimbra):
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+
+    result = zimbra.GetAccount(accountName=f"user3@{DOMAIN}")
+    assert result.IsError()
+    assert result.GetErrorCode() == "http.503"
+
+    assert not zimbra.GetAccount(accountName=f"user4@{DOMAIN}").IsError()
+
+
+def test_503_on_writes_by_name(simulator, zimbra):
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+
+    result = zimbra.ModifyAccount({"displayName": "x"}, accountName=f"user3@{DOMAIN}")
+    assert result.GetErrorCode() == "http.503"
+
+    # a 503 is no address fault, the chunk is reported failed and not split
+    result = zimbra.AddDistributionListMembers(
+        [f"user3@{DOMAIN}", f"user9@{DOMAIN}"], distrListName=f"list0@{DOMAIN}"
+    )
+    assert result.GetData()["succeeded"] == []
+    assert {failed["code"] for failed in result.GetData()["failed"]} == {"http.503"}
+
+
+def test_503_of_every_request(simulator, zimbra):
+    # also the auth request is answered with a bare 503
+    simulator.SetFailures(unavailableRate=1)
+
+    result = zimbra.GetAccounts()
+    assert result.GetErrorCode() == "http.503"
+
+
+def test_connection_error_is_an_error_result():
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+
+    zimbra = ZimbraAPI(
+        f"http://127.0.0.1:{port}",
+        ADMIN_USERNAME,
+        ADMIN_PASSWORD,
+        session=TestSession(),
+    )
+    result = zimbra.GetAccount(accountName=f"user3@{DOMAIN}")
+    assert result.IsError()
+    assert "ConnectionError" in result.GetErrorCode()
+
+
+def test_503_in_async_api(simulator):
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+
+    async def run():
+        zimbra = AsyncZimbraAPI(
+            simulator.GetHost(),
+            ADMIN_USERNAME,
+            ADMIN_PASSWORD,
+            session=AsyncHTTPSession(backoffBase=0.001, backoffMax=0.01),
+        )
+        try:
+            return await asyncio.gather(
+                zimbra.GetAccount(accountName=f"user3@{DOMAIN}"),
+                zimbra.GetAccount(accountName=f"user4@{DOMAIN}"),
+            )
+        finally:
+            await zimbra.Close()
+
+    failed, succeeded = asyncio.run(run())
+    assert failed.GetErrorCode() == "http.503"
+    assert not succeeded.IsError()
+
+
+def test_503_through_endpoint(simulator, post):
+    simulator.SetFailures(unavailableFor=f"user3@{DOMAIN}")
+
+    answer = post("/getAccount", {"accountName": f"user3@{DOMAIN}"})
+    assert answer["error"]["code"] == "http.503"
+
+    answer = post("/getAccount", {"accountName": f"user4@{DOMAIN}"})
+    assert "data" in answer
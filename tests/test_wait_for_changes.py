@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from WaitSetListener import WaitSetListener
+from ZimbraSimulator import DOMAIN
+
+
+@pytest.fixture
+def listener(zimbra):
+    listener = WaitSetListener(zimbra, timeout=1, maxWaiters=1)
+    listener.Start()
+    yield listener
+    listener.Stop()
+
+
+def AccountID(zimbra, i: int) -> str:
+    return zimbra.GetAccount(accountName=f"user{i}@{DOMAIN}").GetData()["id"]
+
+
+def test_delivery_is_reported_after_seq(zimbra, listener):
+    accountID = AccountID(zimbra, 1)
+    listener.Watch([accountID])
+
+    covered = listener.WaitForChanges([accountID], "0", 10).GetData()
+    assert covered["accounts"] == [accountID] and not covered["reset"]
+
+    zimbra.SendMessage(f"user2@{DOMAIN}", f"user1@{DOMAIN}", "Test", "Test message")
+    changed = listener.WaitForChanges([accountID], covered["seq"], 10).GetData()
+    assert changed["accounts"] == [accountID] and not changed["reset"]
+
+    # nothing changed since
+    unchanged = listener.WaitForChanges([accountID], changed["seq"], 0.2).GetData()
+    assert unchanged["accounts"] == [] and unchanged["seq"] == changed["seq"]
+
+
+def test_seq_of_another_listener_resets(zimbra, listener):
+    other = WaitSetListener(zimbra)
+    seq = other.GetState().GetData()["seq"]
+    accountIDs = [AccountID(zimbra, 1), AccountID(zimbra, 2)]
+
+    result = listener.WaitForChanges(accountIDs, seq, 10).GetData()
+    assert result["reset"] and result["accounts"] == accountIDs
+    assert result["seq"] != seq
+
+
+def test_waiters_are_capped(zimbra, listener):
+    accountID = AccountID(zimbra, 1)
+    listener.Watch([accountID])
+    seq = listener.WaitForChanges([accountID], "0", 10).GetData()["seq"]
+
+    waiter = threading.Thread(target=listener.WaitForChanges, args=([accountID], seq, 2))
+    waiter.start()
+    while listener.GetState().GetData()["waiters"] == 0:
+        time.sleep(0.01)
+
+    result = listener.WaitForChanges([accountID], seq, 2)
+    assert result.GetErrorCode() == "TOO_MANY_WAITERS"
+    waiter.join()
+
+
+def test_route_seq_from_a_restarted_worker(zimbra, post):
+    accountID = AccountID(zimbra, 3)
+
+    answer = post(
+        "/waitForChanges",
+        {"accountIDs": [accountID], "seq": "0123456789ab:42", "timeout": 5},
+    )
+    assert answer["data"]["reset"]
+    assert answer["data"]["accounts"] == [accountID]